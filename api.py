@@ -1,19 +1,76 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
 import json
 import base64
 import tempfile
+import hashlib
+import threading
+from collections import OrderedDict
 from speech_to_scratch.speech_recognition import SpeechRecognizer
 from speech_to_scratch.text_to_scratch import TextToScratchConverter
-from speech_to_scratch.examples import load_example
-from code_visualization.code_animator import CodeAnimator
+from speech_to_scratch.model_registry import get_model_registry
+from speech_to_scratch.result_cache import get_description_cache
+from speech_to_scratch.examples import load_example, get_example_catalog
+from speech_to_scratch import serializer
+from speech_to_scratch.project_store import get_project_store, project_metadata
+from speech_to_scratch.bulk import BulkGenerator
+from speech_to_scratch.asset_store import get_asset_store
+from speech_to_scratch.headless_vm import smoke_run
+from code_visualization.code_animator import CodeAnimator, manim_available
+from code_visualization.render_pool import get_render_pool, resolve_quality
+from code_visualization.render_cache import get_render_cache
+from code_visualization.render_jobs import get_render_job_manager, RenderQueueFullError
+from utils import json_patch
 
 app = Flask(__name__)
 
-# 初始化组件
-speech_recognizer = SpeechRecognizer()
-text_to_scratch_converter = TextToScratchConverter(use_gpu=False)
-code_animator = CodeAnimator()
+# 组件由 create_app 创建。渲染进程池和批量构建进程池以spawn方式启动，工作进程会以 __mp_main__
+# 重新导入本模块，导入时不能创建转换器、进程池等组件
+speech_recognizer = None
+text_to_scratch_converter = None
+code_animator = None
+project_store = None
+bulk_generator = None
+_components_lock = threading.Lock()
+MAX_BATCH_TEXTS = 100
+
+# 项目内容由哈希决定，永远不会变化
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# TurboWarp在浏览器中跨域读取sb3
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+
+# 本地播放器外壳：静态页面，进程内只读取一次
+PLAYER_SHELL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'player', 'index.html')
+_player_shell = None
+
+# 预览轨迹：由项目哈希决定，在无界面虚拟机中运行一次后缓存
+PREVIEW_SECONDS = 10
+MAX_CACHED_TRACES = 128
+_trace_cache = OrderedDict()
+_trace_cache_lock = threading.Lock()
+
+# 渐进渲染时同步接口等待预览视频的最长秒数
+PREVIEW_WAIT_SECONDS = 60
+
+def create_app():
+    """
+    创建应用组件并返回Flask应用，重复调用时沿用已创建的组件
+
+    Returns:
+        Flask: 应用
+    """
+    global speech_recognizer, text_to_scratch_converter, code_animator, project_store, bulk_generator
+    with _components_lock:
+        if text_to_scratch_converter is None:
+            speech_recognizer = SpeechRecognizer()
+            # 模型由进程级注册表共享，首次生成时才加载
+            text_to_scratch_converter = TextToScratchConverter(use_gpu=False, registry=get_model_registry())
+            code_animator = CodeAnimator()
+            # 生成的项目按内容哈希保存一次，响应中只返回哈希
+            project_store = get_project_store()
+            # 批量生成：描述阶段共享上面的模型，构建阶段使用进程池
+            bulk_generator = BulkGenerator(text_to_scratch_converter)
+    return app
 
 @app.route('/api/recognize_speech', methods=['POST'])
 def recognize_speech():
@@ -49,60 +106,281 @@ def generate_scratch():
             
         text = data['text']
         
+        # 快速模式：立即返回模板项目，LLM精修结果通过 /api/generate_scratch/refined/<job_id> 获取
+        if data.get('mode') == 'fast':
+            job = text_to_scratch_converter.convert_fast(text)
+            return _json_response(_refinement_response(job, _wants_project(data)))
+        
         # 生成项目
-        project = text_to_scratch_converter.convert(text)
+        project, description = text_to_scratch_converter.convert_with_description(text)
         
-        # 保存到临时文件
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.json')
-        success = text_to_scratch_converter.save_project(project, temp_file.name)
+        # sb3格式：直接把zip流式写入响应
+        if data.get('format') == 'sb3':
+            return Response(
+                stream_with_context(serializer.iter_sb3(project)),
+                mimetype=serializer.SB3_MIMETYPE,
+                headers={'Content-Disposition': 'attachment; filename="scratch_project.sb3"'}
+            )
         
-        if not success:
-            return jsonify({'error': 'Failed to save project'}), 500
-            
-        # 读取文件内容并编码
-        with open(temp_file.name, 'r', encoding='utf-8') as f:
-            project_json = json.load(f)
-            
-        # 删除临时文件
-        os.unlink(temp_file.name)
+        return _json_response(_project_response(project, _wants_project(data), description))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/generate_scratch/batch', methods=['POST'])
+def generate_scratch_batch():
+    """批量生成Scratch项目，每完成一个就以一行JSON（NDJSON）返回"""
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'error': 'No texts provided'}), 400
+    if len(texts) > MAX_BATCH_TEXTS:
+        return jsonify({'error': f'At most {MAX_BATCH_TEXTS} texts per batch'}), 400
+    include_project = _wants_project(data)
+    
+    def result_stream():
+        for result in bulk_generator.generate(str(text) for text in texts):
+            if 'error' in result:
+                line = result
+            else:
+                line = _project_response(result['project'], include_project, result['description'])
+                line.update({'index': result['index'], 'text': result['text'], 'seconds': result['seconds']})
+            yield serializer.dumps(line) + b'\n'
+    
+    return Response(
+        stream_with_context(result_stream()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/generate_scratch/edit', methods=['POST'])
+def edit_scratch():
+    """根据修改后的描述更新已有项目，只重新生成变化的角色，返回RFC 6902 JSON Patch"""
+    try:
+        data = request.json
+        if not data or 'text' not in data or 'project_hash' not in data:
+            return jsonify({'error': 'project_hash and text are required'}), 400
         
-        # 提取项目元数据
-        sprite_count = sum(1 for target in project_json["targets"] if not target.get("isStage", False))
+        base_hash = data['project_hash']
+        previous_project = project_store.get(base_hash)
+        if previous_project is None:
+            return jsonify({'error': 'Project not found'}), 404
         
-        return jsonify({
-            'project': project_json,
-            'metadata': {
-                'sprite_count': sprite_count
-            }
+        project, description, changes = text_to_scratch_converter.update_project(
+            previous_project, data['text'], project_store.get_description(base_hash)
+        )
+        response = _project_response(project, _wants_project(data), description)
+        response.update({
+            'base_hash': base_hash,
+            'patch': json_patch.diff(previous_project, project),
+            'changes': changes
         })
+        return _json_response(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _json_response(payload, status=200):
+    """使用紧凑序列化（可用时为orjson）生成JSON响应"""
+    return Response(serializer.dumps(payload), status=status, mimetype='application/json')
+
+def _wants_project(data=None):
+    """客户端是否要求在响应中附带完整项目（默认只返回哈希）"""
+    value = (data or {}).get('include_project', request.args.get('include_project'))
+    return value in (True, 1, '1', 'true', 'True')
+
+def _project_response(project, include_project=False, description=None):
+    """保存项目并返回哈希、获取地址和元数据"""
+    digest = project_store.put(project, description)
+    response = {
+        'project_hash': digest,
+        'project_url': f'/api/project/{digest}',
+        'metadata': project_metadata(project)
+    }
+    if include_project:
+        response['project'] = project
+    return response
+
+def _refinement_response(job, include_project=False):
+    """把快速生成任务快照转换为响应数据"""
+    response = _project_response(job['project'], include_project)
+    response.update({
+        'job_id': job['job_id'],
+        'version': job['version'],
+        'version_token': job['version_token'],
+        'status': job['status'],
+        'refined': job['refined']
+    })
+    return response
+
+@app.route('/api/project/<project_hash>', methods=['GET'])
+def get_project(project_hash):
+    """按内容哈希获取项目；内容不可变，支持ETag/304和长期缓存"""
+    sb3 = request.args.get('format') == 'sb3'
+    etag = f'{project_hash}.sb3' if sb3 else project_hash
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': IMMUTABLE_CACHE_CONTROL, **CORS_HEADERS}
+    # 项目可能已被存储淘汰，确认仍然存在后才返回304
+    if request.if_none_match.contains(etag) and project_store.contains(project_hash):
+        return Response(status=304, headers=headers)
+    
+    data = project_store.get_bytes(project_hash)
+    if data is None:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    if sb3:
+        headers['Content-Disposition'] = f'attachment; filename="{project_hash[:12]}.sb3"'
+        return Response(
+            stream_with_context(serializer.iter_sb3(serializer.loads(data), asset_key=project_hash)),
+            mimetype=serializer.SB3_MIMETYPE,
+            headers=headers
+        )
+    return Response(data, mimetype='application/json', headers=headers)
+
+@app.route('/api/project/<project_hash>/trace', methods=['GET'])
+def get_project_trace(project_hash):
+    """在无界面虚拟机中运行项目，返回供离线预览回放的状态轨迹"""
+    etag = f'{project_hash}.trace'
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': IMMUTABLE_CACHE_CONTROL}
+    if request.if_none_match.contains(etag) and project_store.contains(project_hash):
+        return Response(status=304, headers=headers)
+    
+    with _trace_cache_lock:
+        data = _trace_cache.get(project_hash)
+        if data is not None:
+            _trace_cache.move_to_end(project_hash)
+    if data is None:
+        project = project_store.get(project_hash)
+        if project is None:
+            return jsonify({'error': 'Project not found'}), 404
+        data = serializer.dumps(smoke_run(project, seconds=PREVIEW_SECONDS, record_trace=True))
+        with _trace_cache_lock:
+            _trace_cache[project_hash] = data
+            while len(_trace_cache) > MAX_CACHED_TRACES:
+                _trace_cache.popitem(last=False)
+    return Response(data, mimetype='application/json', headers=headers)
+
+@app.route('/api/asset/<md5ext>', methods=['GET'])
+def get_asset(md5ext):
+    """按md5获取造型资源；内容不可变"""
+    headers = {'ETag': f'"{md5ext}"', 'Cache-Control': IMMUTABLE_CACHE_CONTROL}
+    if request.if_none_match.contains(md5ext) and get_asset_store().contains(md5ext):
+        return Response(status=304, headers=headers)
+    
+    data = get_asset_store().get(md5ext)
+    if data is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    mimetype = 'image/svg+xml' if md5ext.endswith('.svg') else 'application/octet-stream'
+    return Response(data, mimetype=mimetype, headers=headers)
+
+@app.route('/player', methods=['GET'])
+def player():
+    """本地播放器外壳，通过 ?project=<哈希> 加载项目"""
+    global _player_shell
+    if _player_shell is None:
+        with open(PLAYER_SHELL_PATH, 'rb') as f:
+            data = f.read()
+        _player_shell = (data, hashlib.md5(data).hexdigest())
+    data, etag = _player_shell
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'public, max-age=86400'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    return Response(data, mimetype='text/html', headers=headers)
+
+@app.route('/api/generate_scratch/refined/<job_id>', methods=['GET'])
+def get_refined_scratch(job_id):
+    """查询快速生成任务的最新版本；传入after时长轮询等待更新的版本"""
+    after = request.args.get('after')
+    if after is None:
+        job = text_to_scratch_converter.refiner.get(job_id)
+    else:
+        try:
+            timeout = float(request.args.get('timeout', 30))
+        except ValueError:
+            return jsonify({'error': 'timeout must be a number'}), 400
+        # 限制在 [0, 60] 秒内（NaN按0处理）
+        timeout = max(0.0, min(timeout, 60.0))
+        job = text_to_scratch_converter.refiner.wait(job_id, after, timeout)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return _json_response(_refinement_response(job, _wants_project()))
+
+def _format_sse(event, payload):
+    """格式化一条server-sent event消息"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.route('/api/generate_scratch/stream', methods=['GET', 'POST'])
+def generate_scratch_stream():
+    """流式生成Scratch项目，通过server-sent events推送部分项目"""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text') or request.args.get('text')
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    def event_stream():
+        try:
+            for update in text_to_scratch_converter.convert_stream(text):
+                project = update['project']
+                sprite_count = sum(1 for target in project["targets"] if not target.get("isStage", False))
+                yield _format_sse(update['event'], {
+                    'project': project,
+                    'metadata': {
+                        'sprite_count': sprite_count
+                    }
+                })
+        except Exception as e:
+            yield _format_sse('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/models', methods=['GET'])
+def get_models():
+    """查看已注册模型的加载状态"""
+    return jsonify({'models': get_model_registry().stats()})
+
+@app.route('/api/description_cache', methods=['GET'])
+def get_description_cache_stats():
+    """查看项目描述缓存的命中统计"""
+    return jsonify(get_description_cache().stats())
+
 @app.route('/api/load_example', methods=['GET'])
 def get_example():
     """加载示例项目"""
     try:
-        example_number = request.args.get('number', '1')
-        project = load_example(int(example_number))
+        example_number = int(request.args.get('number', '1'))
+        entry = get_example_catalog().entry(example_number)
         
-        if not project:
-            return jsonify({'error': 'Example not found'}), 404
-            
-        # 提取项目元数据
-        sprite_count = sum(1 for target in project["targets"] if not target.get("isStage", False))
+        # 索引中没有时由load_example创建默认示例
+        if entry is None:
+            project = load_example(example_number)
+            if not project:
+                return jsonify({'error': 'Example not found'}), 404
+            return _json_response(_project_response(project, _wants_project()))
         
-        return jsonify({
-            'project': project,
-            'metadata': {
-                'sprite_count': sprite_count
-            }
-        })
+        # 示例的哈希和元数据已在索引中算好，只有存储中还没有时才保存
+        if entry.hash not in project_store:
+            project_store.put(entry.project)
+        response = {
+            'project_hash': entry.hash,
+            'project_url': f'/api/project/{entry.hash}',
+            'metadata': entry.metadata()
+        }
+        if _wants_project():
+            response['project'] = entry.project
+        return _json_response(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/examples', methods=['GET'])
+def list_examples():
+    """列出所有示例项目的元数据"""
+    return _json_response({'examples': get_example_catalog().list()})
+
 @app.route('/api/generate_visualization', methods=['POST'])
 def generate_visualization():
-    """生成代码可视化"""
+    """生成代码可视化；progressive为真时先返回预览画质的视频，目标画质在后台渲染"""
     try:
         data = request.json
         if not data or 'code' not in data:
@@ -110,33 +388,180 @@ def generate_visualization():
             
         code = data['code']
         show_code = data.get('show_code', True)
-        
+        try:
+            quality = resolve_quality(data.get('quality'), data.get('resolution'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # 相同代码和设置已经渲染过时直接返回缓存的视频
+        cached_path = code_animator.cached_animation(code, show_code=show_code, quality=quality)
+        cached_data = None
+        if cached_path:
+            try:
+                with open(cached_path, 'rb') as f:
+                    cached_data = f.read()
+            except OSError:
+                # 缓存文件可能刚被其它进程淘汰，按未命中处理，继续渲染
+                cached_data = None
+        if cached_data is not None:
+            video_base64 = base64.b64encode(cached_data).decode('utf-8')
+            return jsonify({
+                'video': video_base64,
+                'analysis': code_animator.analyze_code(code),
+                'quality': quality,
+                'cached': True
+            })
+
+        if data.get('progressive'):
+            return _progressive_visualization(code, show_code, quality)
+
         # 创建临时输出文件
         temp_output = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-        
-        # 生成动画
-        animation_path = code_animator.create_animation(
-            code, 
-            output_path=temp_output.name
+        temp_output.close()
+
+        # 生成动画；耗时信息随结果返回，不经过多个请求线程共用的实例
+        animation_path, timing = code_animator.render_animation(
+            code,
+            output_path=temp_output.name,
+            show_code=show_code,
+            quality=quality,
+            check_cache=False
         )
-        
+
         if not animation_path:
             return jsonify({'error': 'Failed to generate animation'}), 500
-            
+
         # 读取视频文件并进行Base64编码
         with open(animation_path, 'rb') as f:
             video_data = f.read()
             video_base64 = base64.b64encode(video_data).decode('utf-8')
-            
+
         # 删除临时文件
         os.unlink(animation_path)
-        
+
         return jsonify({
             'video': video_base64,
-            'analysis': code_animator.analyze_code(code)
+            'analysis': code_animator.analyze_code(code),
+            'quality': quality,
+            'cached': False,
+            'fallback': bool(timing.get('fallback'))
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _progressive_visualization(code, show_code, quality):
+    """提交渐进渲染任务，等到预览可用后返回预览视频和任务地址"""
+    manager = get_render_job_manager()
+    try:
+        # 调用方已经查询过目标画质的缓存
+        job = manager.submit(code, show_code=show_code, quality=quality, progressive=True, check_cache=False)
+    except RenderQueueFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '30'}
+
+    job = manager.wait_for_result(job['job_id'], timeout=PREVIEW_WAIT_SECONDS)
+    response = _visualization_job_response(job)
+    _, data, result_quality = _read_visualization_result(manager, job['job_id'])
+    if data is not None:
+        response['video'] = base64.b64encode(data).decode('utf-8')
+    response['video_quality'] = result_quality
+    return jsonify(response)
+
+def _read_visualization_result(manager, job_id):
+    """
+    读取渲染任务当前可用的视频（渐进任务在目标画质完成前为预览）
+
+    读取前预览可能刚好被目标画质替换，或任务已被淘汰，此时重新查询一次。
+
+    Returns:
+        tuple: (任务快照, 视频数据, 画质)；任务不存在时任务快照为None，尚无视频时视频数据为None
+    """
+    for _ in range(2):
+        job = manager.get(job_id)
+        if job is None:
+            return None, None, None
+        path, quality = manager.result(job_id)
+        if path is None:
+            return job, None, None
+        try:
+            with open(path, 'rb') as f:
+                return job, f.read(), quality
+        except FileNotFoundError:
+            continue
+    return None, None, None
+
+def _visualization_job_response(job):
+    """在任务快照中加入状态和结果地址"""
+    job['status_url'] = f"/api/visualizations/{job['job_id']}"
+    job['result_url'] = f"/api/visualizations/{job['job_id']}/result"
+    return job
+
+@app.route('/api/visualizations', methods=['POST'])
+def submit_visualization():
+    """提交异步代码动画渲染任务，立即返回任务ID"""
+    data = request.get_json(silent=True)
+    if not data or 'code' not in data:
+        return jsonify({'error': 'No code provided'}), 400
+
+    try:
+        job = get_render_job_manager().submit(
+            data['code'],
+            show_code=data.get('show_code', True),
+            quality=data.get('quality'),
+            resolution=data.get('resolution'),
+            progressive=bool(data.get('progressive', False))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RenderQueueFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '30'}
+
+    job = _visualization_job_response(job)
+    return jsonify(job), 202, {'Location': job['status_url']}
+
+@app.route('/api/visualizations', methods=['GET'])
+def get_visualization_queue():
+    """查看渲染任务队列的状态"""
+    return jsonify(get_render_job_manager().stats())
+
+@app.route('/api/visualizations/<job_id>', methods=['GET'])
+def get_visualization(job_id):
+    """查询渲染任务的状态和进度"""
+    job = get_render_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/visualizations/<job_id>/result', methods=['GET'])
+def get_visualization_result(job_id):
+    """获取渲染任务当前可用的视频（渐进任务先返回预览）"""
+    # 渐进任务在目标画质完成前返回预览；目标画质渲染失败时仍可获取预览
+    job, data, quality = _read_visualization_result(get_render_job_manager(), job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if data is None:
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error'], 'status': job['status']}), 500
+        return jsonify({'error': 'Job not finished', 'status': job['status'], 'progress': job['progress']}), 409
+
+    final = quality == job['quality'] and job['status'] == 'done'
+    headers = {
+        'X-Render-Quality': quality,
+        'X-Render-Final': 'true' if final else 'false',
+        # 预览之后会被目标画质替换，不能缓存
+        'Cache-Control': 'private, max-age=3600' if final else 'no-store'
+    }
+    return Response(data, mimetype='video/mp4', headers=headers)
+
+@app.route('/api/render_cache', methods=['GET'])
+def get_render_cache_stats():
+    """查看代码动画渲染缓存的命中统计"""
+    return jsonify(get_render_cache().stats())
+
 if __name__ == '__main__':
+    create_app()
+    if manim_available:
+        # 在后台启动渲染工作进程，第一个可视化请求不再等待manim导入
+        threading.Thread(target=get_render_pool().warm_up, daemon=True).start()
+    # 批量生成的构建进程也在启动时创建，而不是在请求处理线程的回调中按需启动
+    threading.Thread(target=bulk_generator.warm_up, daemon=True).start()
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
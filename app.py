@@ -5,7 +5,6 @@ import time
 import json
 from pathlib import Path
 
-import av
 import streamlit as st
 try:
     from streamlit_webrtc import webrtc_streamer, WebRtcMode
@@ -22,6 +21,7 @@ from speech_to_scratch.speech_recognition import SpeechRecognizer
 from speech_to_scratch.text_to_scratch import TextToScratchConverter
 from speech_to_scratch.examples import load_example as load_scratch_example
 from code_visualization.code_animator import CodeAnimator
+from code_visualization.render_pool import QUALITY_PRESETS, DEFAULT_QUALITY
 from scratch_player import ScratchPlayer  # 导入Scratch播放器模块
 
 # 确保存在assets目录
@@ -178,8 +178,8 @@ elif app_mode == "语音转Scratch项目":
         if submit_button and user_input:
             with st.spinner("正在生成Scratch项目..."):
                 try:
-                    # 初始化转换器
-                    converter = TextToScratchConverter(use_gpu=False)
+                    # 使用共享转换器（模型由注册表在进程内共享）
+                    converter = text_to_scratch_converter or TextToScratchConverter(use_gpu=False)
                     
                     # 生成项目
                     project = converter.convert(user_input)
@@ -240,7 +240,7 @@ elif app_mode == "语音转Scratch项目":
                         
                         # 转换为Scratch项目
                         with st.spinner("正在生成Scratch项目..."):
-                            converter = TextToScratchConverter(use_gpu=False)
+                            converter = text_to_scratch_converter or TextToScratchConverter(use_gpu=False)
                             project = converter.convert(text)
                             
                             # 保存项目
@@ -373,13 +373,20 @@ print("排序后:", sorted_data)
 """)
         
         show_code = st.checkbox("在动画中显示代码", value=True)
+        quality_options = list(QUALITY_PRESETS)
+        quality = st.selectbox(
+            "画质",
+            quality_options,
+            index=quality_options.index(DEFAULT_QUALITY),
+            format_func=lambda q: f"{QUALITY_PRESETS[q]['resolution']} {QUALITY_PRESETS[q]['fps']}fps"
+        )
         
         if st.button("生成可视化"):
             if code:
                 with st.spinner("正在生成可视化动画..."):
                     try:
                         # 初始化动画生成器
-                        animator = CodeAnimator(show_code=show_code)
+                        animator = CodeAnimator(show_code=show_code, quality=quality)
                         
                         # 创建临时文件
                         output_file = os.path.join(temp_dir, "code_animation.mp4")
@@ -1,46 +1,180 @@
 import ast
+import importlib.util
+import io
 import logging
 import os
 import tempfile
 import sys
 import shutil
+import threading
+import time
 from pathlib import Path
 
-# 添加manim导入的错误处理
+# 只检查manim是否安装：渲染在渲染进程池的工作进程中进行，本进程不需要导入manim
+manim_available = importlib.util.find_spec("manim") is not None
+if not manim_available:
+    logging.warning("无法导入manim库，将使用模拟模式")
+
 try:
-    from manim import *
-    manim_available = True
+    from code_visualization.render_pool import get_render_pool, resolve_quality, QUALITY_PRESETS, DEFAULT_QUALITY
+    from code_visualization.render_cache import get_render_cache, render_key
 except ImportError:
-    logging.warning("无法导入manim库，将使用模拟模式")
-    manim_available = False
+    from render_pool import get_render_pool, resolve_quality, QUALITY_PRESETS, DEFAULT_QUALITY
+    from render_cache import get_render_cache, render_key
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 模拟视频的尺寸、帧率和时长
+FALLBACK_WIDTH = 640
+FALLBACK_HEIGHT = 480
+FALLBACK_FPS = 24
+FALLBACK_SECONDS = 5
+
+# 模拟视频的内容固定，进程内只合成和编码一次
+_fallback_video = None
+_fallback_video_lock = threading.Lock()
+
+
+def _fallback_background():
+    """
+    绘制模拟视频中不变的部分（背景、文字和进度条边框）
+
+    Returns:
+        tuple: (RGB数组, 是否绘制动态元素)，字体渲染失败时只有静态图形
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (FALLBACK_WIDTH, FALLBACK_HEIGHT), color=(245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    try:
+        draw.text((50, 30), "代码可视化动画", fill=(0, 0, 0))
+        draw.text((50, 80), "此为模拟视频", fill=(0, 0, 0))
+        draw.text((50, 130), "未安装Manim库或渲染失败", fill=(0, 0, 0))
+        draw.rectangle([50, 200, 590, 230], outline=(0, 0, 0))
+        animated = True
+    except Exception:
+        # 如果字体渲染失败，使用简单的图形
+        draw.rectangle([50, 50, 590, 430], outline=(0, 0, 0))
+        draw.ellipse([200, 150, 440, 350], fill=(0, 120, 255))
+        animated = False
+    return np.asarray(img, dtype=np.uint8), animated
+
+
+def _fallback_frames():
+    """
+    逐帧生成模拟视频：在预渲染的背景上用数组运算绘制进度条和圆
+
+    Yields:
+        numpy.ndarray: RGB帧（复用同一缓冲区，调用方需在下一帧前用完）
+    """
+    import numpy as np
+
+    background, animated = _fallback_background()
+    total_frames = FALLBACK_FPS * FALLBACK_SECONDS
+    frame = background.copy()
+    # 各半径的圆形掩码只计算一次
+    disk_masks = {}
+    for i in range(total_frames):
+        if not animated:
+            yield frame
+            continue
+        np.copyto(frame, background)
+
+        # 进度条
+        progress = i / total_frames
+        bar_width = int(540 * progress)
+        frame[200:231, 50:51 + bar_width] = (0, 120, 255)
+
+        # 五个上下浮动的圆，同一帧中半径和颜色相同
+        size = 30 + int(10 * np.cos(i / 24))
+        mask = disk_masks.get(size)
+        if mask is None:
+            offsets = np.arange(-size, size + 1)
+            mask = disk_masks[size] = offsets[:, None] ** 2 + offsets[None, :] ** 2 <= size * size
+        color = (255, int(255 * (1 - progress)), 0)
+        for j in range(5):
+            x = 100 + j * 100
+            y = 300 + int(50 * np.sin((i / 12 + j) * 0.5))
+            frame[y - size:y + size + 1, x - size:x + size + 1][mask] = color
+        yield frame
+
+
+def _encode_fallback_video():
+    """
+    编码模拟视频
+
+    Returns:
+        bytes: mp4数据
+    """
+    import av
+
+    buffer = io.BytesIO()
+    container = av.open(buffer, mode='w', format='mp4')
+    stream = container.add_stream('h264', rate=FALLBACK_FPS)
+    stream.width = FALLBACK_WIDTH
+    stream.height = FALLBACK_HEIGHT
+    stream.pix_fmt = 'yuv420p'
+    # 画面简单，使用最快的编码预设
+    stream.options = {'preset': 'ultrafast'}
+
+    for frame in _fallback_frames():
+        for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format='rgb24')):
+            container.mux(packet)
+
+    # 刷新剩余帧
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    return buffer.getvalue()
+
+
+def get_fallback_video():
+    """
+    获取模拟视频的mp4数据（进程内只生成一次）
+
+    Returns:
+        bytes: mp4数据
+
+    Raises:
+        ImportError: 缺少av、numpy或PIL
+    """
+    global _fallback_video
+    with _fallback_video_lock:
+        if _fallback_video is None:
+            start_time = time.perf_counter()
+            _fallback_video = _encode_fallback_video()
+            logger.info(f"模拟视频生成完成: {len(_fallback_video)} 字节，耗时 {time.perf_counter() - start_time:.2f} 秒")
+        return _fallback_video
+
+
 class CodeAnimator:
     """Python代码可视化动画生成器"""
     
-    def __init__(self, resolution="1080p", show_code=True):
+    def __init__(self, resolution="1080p", show_code=True, render_pool=None, render_cache=None, quality=None):
         """
         初始化代码动画生成器
-        
+
         Args:
-            resolution (str): 输出视频分辨率
+            resolution (str): 输出视频分辨率，未指定画质时按分辨率选择画质档位
             show_code (bool): 是否在动画中显示代码
+            render_pool (RenderPool): 渲染进程池，默认使用进程级共享的进程池
+            render_cache (RenderCache): 渲染缓存，默认使用进程级共享的磁盘缓存
+            quality (str): 默认画质档位 "l"/"m"/"h"/"p"/"k"
         """
-        self.resolution = resolution
+        try:
+            self.quality = resolve_quality(quality, resolution)
+        except ValueError as e:
+            # 构造时不因未知的分辨率失败，严格校验只在API和渲染任务的入口进行
+            logger.warning(f"{str(e)}，使用默认画质 {DEFAULT_QUALITY}")
+            self.quality = DEFAULT_QUALITY
+        self.resolution = QUALITY_PRESETS[self.quality]["resolution"]
         self.show_code = show_code
         self.using_simulation = not manim_available
-        
-        # 动画配置
-        if manim_available:
-            try:
-                config.pixel_height = 1080 if resolution == "1080p" else 720
-                config.pixel_width = 1920 if resolution == "1080p" else 1280
-            except Exception as e:
-                logger.error(f"manim配置失败: {str(e)}")
-                self.using_simulation = True
+        self.render_pool = render_pool
+        self.render_cache = render_cache
         
     def analyze_code(self, code_str):
         """
@@ -91,76 +225,165 @@ class CodeAnimator:
             logger.error(f"代码分析失败: {str(e)}")
             return None
     
-    def create_animation(self, code_str, output_path=None):
+    def cache_key(self, code_str, show_code=None, quality=None):
+        """
+        计算代码动画的渲染缓存键
+
+        Args:
+            code_str (str): Python代码字符串
+            show_code (bool): 是否显示代码，默认使用初始化时的设置
+            quality (str): 画质档位，默认使用初始化时的设置
+
+        Returns:
+            str: 缓存键
+        """
+        if show_code is None:
+            show_code = self.show_code
+        quality = quality or self.quality
+        return render_key(code_str, show_code, QUALITY_PRESETS[quality]["resolution"], quality)
+
+    def cached_animation(self, code_str, show_code=None, quality=None):
+        """
+        查询已缓存的代码动画
+
+        Args:
+            code_str (str): Python代码字符串
+            show_code (bool): 是否显示代码，默认使用初始化时的设置
+            quality (str): 画质档位，默认使用初始化时的设置
+
+        Returns:
+            str: 缓存中的视频路径（只读，调用方不应删除），未命中或模拟模式时为None
+        """
+        if self.using_simulation:
+            return None
+        cache = self.render_cache or get_render_cache()
+        return cache.get_path(self.cache_key(code_str, show_code, quality))
+
+    def is_cached(self, code_str, show_code=None, quality=None):
+        """
+        检查代码动画是否已缓存（不计入缓存命中统计）
+
+        Args:
+            code_str (str): Python代码字符串
+            show_code (bool): 是否显示代码，默认使用初始化时的设置
+            quality (str): 画质档位，默认使用初始化时的设置
+
+        Returns:
+            bool: 是否已缓存，模拟模式时为False
+        """
+        if self.using_simulation:
+            return False
+        cache = self.render_cache or get_render_cache()
+        return cache.contains(self.cache_key(code_str, show_code, quality))
+
+    def create_animation(self, code_str, output_path=None, show_code=None, quality=None, resolution=None,
+                         check_cache=True):
         """
         为Python代码创建可视化动画
-        
+
         Args:
             code_str (str): Python代码字符串
             output_path (str): 输出文件路径
-            
+            show_code (bool): 是否显示代码，默认使用初始化时的设置
+            quality (str): 画质档位 "l"/"m"/"h"/"p"/"k"，默认使用初始化时的设置
+            resolution (str): 分辨率，未指定画质时按分辨率选择画质档位
+            check_cache (bool): 是否先查询渲染缓存；调用方已经用 cached_animation 查询过时传False，避免重复计数
+
         Returns:
             str: 生成的动画文件路径
         """
+        return self.render_animation(code_str, output_path, show_code, quality, resolution, check_cache)[0]
+
+    def render_animation(self, code_str, output_path=None, show_code=None, quality=None, resolution=None,
+                         check_cache=True):
+        """
+        为Python代码创建可视化动画，同时返回本次渲染的耗时信息
+
+        耗时信息随结果返回而不保存在实例上，同一个实例可以在多个请求线程中共用。参数同 create_animation。
+
+        Returns:
+            tuple: (动画文件路径, 耗时信息)，耗时信息包含 startup_seconds、render_seconds、
+                   cached（是否命中缓存）、fallback（是否为模拟视频）和 quality
+        """
         logger.info("开始创建代码动画...")
-        
+        if show_code is None:
+            show_code = self.show_code
+        quality = resolve_quality(quality, resolution) if (quality or resolution) else self.quality
+
         # 分析代码
         analysis = self.analyze_code(code_str)
         if not analysis:
-            return self._create_dummy_animation(output_path)
-        
+            return self._fallback_animation(output_path)
+
         # 如果使用模拟模式，返回模拟动画
         if self.using_simulation:
             logger.info("使用模拟模式生成动画")
-            return self._create_dummy_animation(output_path)
-        
-        try:
-            # 创建临时目录用于生成动画
-            temp_dir = tempfile.mkdtemp()
-            
-            # 创建动画类
-            class_code = self._generate_animation_class(code_str, analysis)
-            
-            # 保存动画类到临时文件
-            script_path = os.path.join(temp_dir, "animation_script.py")
-            with open(script_path, "w") as f:
-                f.write(class_code)
-                
-            # 生成输出路径
+            return self._fallback_animation(output_path)
+
+        # 相同的代码和设置已经渲染过时直接复制缓存
+        cache = self.render_cache or get_render_cache()
+        key = self.cache_key(code_str, show_code, quality)
+        cached_path = cache.get_path(key) if check_cache else None
+        if cached_path:
+            timing = {"startup_seconds": 0.0, "render_seconds": 0.0, "cached": True, "fallback": False,
+                      "quality": quality}
             if not output_path:
-                output_path = os.path.join(temp_dir, "code_animation.mp4")
-            
-            # 运行manim生成动画
-            logger.info(f"开始渲染动画...")
-            os.system(f"manim {script_path} CodeAnimation -o code_animation.mp4 -q h")
-            
-            # 检查生成的文件
-            media_dir = os.path.join(temp_dir, "media", "videos", "animation_script", "1080p60")
-            video_path = os.path.join(media_dir, "CodeAnimation.mp4")
-            
-            if os.path.exists(video_path):
-                logger.info(f"动画生成成功: {video_path}")
-                
-                # 复制到目标路径
+                output_path = os.path.join(tempfile.mkdtemp(), "code_animation.mp4")
+            try:
                 os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-                shutil.copy2(video_path, output_path)
-                
-                # 清理临时目录
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
-                
-                return output_path
-            else:
+                shutil.copyfile(cached_path, output_path)
+                logger.info(f"使用缓存的动画: {output_path}")
+                return output_path, timing
+            except OSError as e:
+                # 缓存文件可能刚被其它进程淘汰，按未命中处理，继续渲染
+                logger.warning(f"读取缓存的动画失败，重新渲染: {str(e)}")
+
+        media_dir = tempfile.mkdtemp(prefix="manim_")
+        try:
+            # 在常驻的渲染进程中直接渲染场景类，不再生成脚本文件
+            scene_name = self._select_scene(code_str, analysis)
+            params = {"code_text": code_str, "show_code": show_code}
+            pool = self.render_pool or get_render_pool()
+            logger.info(f"开始渲染动画: {scene_name}（画质 {quality}）")
+            result = pool.render(scene_name, params, quality=quality, media_dir=media_dir)
+            timing = {
+                "startup_seconds": result["startup_seconds"],
+                "render_seconds": result["render_seconds"],
+                "cached": False,
+                "fallback": False,
+                "quality": quality,
+            }
+            logger.info(f"动画渲染完成: 启动 {result['startup_seconds']:.2f} 秒，渲染 {result['render_seconds']:.2f} 秒")
+            
+            video_path = result["path"]
+            if not os.path.exists(video_path):
                 logger.error("动画生成失败")
-                return self._create_dummy_animation(output_path)
+                return self._fallback_animation(output_path)
+
+            # 只缓存真实的渲染结果，模拟视频不进缓存
+            cache.put_file(key, video_path)
+
+            # 生成输出路径并复制
+            if not output_path:
+                output_path = os.path.join(tempfile.mkdtemp(), "code_animation.mp4")
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            shutil.copy2(video_path, output_path)
+            logger.info(f"动画生成成功: {output_path}")
+            return output_path, timing
         except Exception as e:
             logger.error(f"创建动画时出错: {str(e)}")
-            return self._create_dummy_animation(output_path)
+            return self._fallback_animation(output_path)
+        finally:
+            # 清理渲染目录
+            shutil.rmtree(media_dir, ignore_errors=True)
     
+    def _fallback_animation(self, output_path):
+        """创建模拟视频，返回 (路径, 耗时信息)；耗时信息标记为模拟视频，调用方据此区分渲染失败"""
+        timing = {"startup_seconds": 0.0, "render_seconds": 0.0, "cached": False, "fallback": True, "quality": None}
+        return self._create_dummy_animation(output_path), timing
+
     def _create_dummy_animation(self, output_path):
-        """创建一个简单的可播放视频文件"""
+        """创建一个简单的可播放视频文件（视频只在进程内第一次调用时合成）"""
         if not output_path:
             # 创建临时输出路径
             temp_dir = tempfile.mkdtemp()
@@ -170,60 +393,10 @@ class CodeAnimator:
         os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
         
         try:
-            # 尝试导入av库
-            import av
-            import numpy as np
-            from PIL import Image, ImageDraw, ImageFont
-            
-            # 创建一个可播放的视频
-            container = av.open(output_path, mode='w')
-            stream = container.add_stream('h264', rate=24)
-            stream.width = 640
-            stream.height = 480
-            stream.pix_fmt = 'yuv420p'
-            
-            # 创建一张简单的图片作为视频帧
-            duration_sec = 5
-            for i in range(duration_sec * 24):  # 5秒视频，24fps
-                img = Image.new('RGB', (640, 480), color=(245, 245, 245))
-                draw = ImageDraw.Draw(img)
-                
-                # 添加文本
-                try:
-                    # 尝试使用默认字体
-                    draw.text((50, 30), "代码可视化动画", fill=(0, 0, 0))
-                    draw.text((50, 80), "此为模拟视频", fill=(0, 0, 0))
-                    draw.text((50, 130), f"未安装Manim库或渲染失败", fill=(0, 0, 0))
-                    
-                    # 绘制进度条
-                    progress = i / (duration_sec * 24)
-                    bar_width = int(540 * progress)
-                    draw.rectangle([50, 200, 590, 230], outline=(0, 0, 0))
-                    draw.rectangle([50, 200, 50 + bar_width, 230], fill=(0, 120, 255))
-                    
-                    # 添加一些变化的元素
-                    for j in range(5):
-                        x = 100 + j * 100
-                        y = 300 + int(50 * np.sin((i/12 + j) * 0.5))
-                        size = 30 + int(10 * np.cos(i/24))
-                        draw.ellipse([x-size, y-size, x+size, y+size], 
-                                      fill=(255, int(255*(1-progress)), 0))
-                except Exception as font_error:
-                    # 如果字体渲染失败，使用简单的图形
-                    draw.rectangle([50, 50, 590, 430], outline=(0, 0, 0))
-                    draw.ellipse([200, 150, 440, 350], fill=(0, 120, 255))
-                
-                # PIL图像转换为视频帧
-                frame = av.VideoFrame.from_image(img)
-                packet = stream.encode(frame)
-                container.mux(packet)
-            
-            # 刷新剩余帧
-            for packet in stream.encode():
-                container.mux(packet)
-            
-            # 关闭容器
-            container.close()
+            # 模拟视频内容固定，直接写出进程内缓存的mp4数据
+            video_data = get_fallback_video()
+            with open(output_path, 'wb') as f:
+                f.write(video_data)
             logger.info(f"创建了模拟视频: {output_path}")
             return output_path
         
@@ -269,330 +442,26 @@ class CodeAnimator:
                 f.write(b'dummy video')
             return output_path
     
-    def _generate_animation_class(self, code_str, analysis):
+    def _select_scene(self, code_str, analysis):
         """
-        生成Manim动画类代码
+        根据代码类型选择可视化场景
         
         Args:
             code_str (str): Python代码
             analysis (dict): 代码分析结果
             
         Returns:
-            str: 动画类代码
+            str: scenes.SCENES 中的场景名
         """
-        # 判断代码类型，选择适当的可视化方法
         if "sort" in code_str.lower() or any(var for var in analysis["variables"] if "list" in var.lower() or "arr" in var.lower()):
             # 排序算法可视化
-            return self._generate_sorting_animation(code_str, analysis)
+            return "sorting"
         elif any(func for func in analysis["functions"] if "search" in func.lower()):
             # 搜索算法可视化
-            return self._generate_search_animation(code_str, analysis)
+            return "search"
         else:
             # 通用代码执行可视化
-            return self._generate_general_animation(code_str, analysis)
-    
-    def _generate_sorting_animation(self, code_str, analysis):
-        """生成排序算法动画类代码"""
-        return """
-from manim import *
-import random
-
-class CodeAnimation(Scene):
-    def construct(self):
-        # 标题
-        title = Text("排序算法可视化", font_size=40)
-        title.to_edge(UP)
-        self.play(Write(title))
-        
-        # 创建代码文本
-        code_text = '''{}'''
-        code = Code(code=code_text, tab_width=4, background="window",
-                    language="Python", font="Monospace")
-        code.next_to(title, DOWN)
-        code.scale(0.6)
-        
-        # 生成随机数据
-        data = [random.randint(10, 100) for _ in range(10)]
-        
-        # 创建条形图
-        bars = VGroup()
-        for i, val in enumerate(data):
-            bar = Rectangle(height=val/20, width=0.6)
-            bar.set_fill(BLUE, opacity=1)
-            bar.move_to(i*0.8*RIGHT + DOWN*2 + bar.height/2*UP)
-            bars.add(bar)
-        
-        # 添加值标签
-        labels = VGroup()
-        for i, bar in enumerate(bars):
-            label = Text(str(data[i]), font_size=20)
-            label.next_to(bar, DOWN, buff=0.1)
-            labels.add(label)
-        
-        # 显示条形图和标签
-        self.play(FadeIn(bars), FadeIn(labels))
-        
-        if {}:
-            # 显示代码
-            self.play(Write(code))
-            self.wait(1)
-        
-        # 模拟冒泡排序过程
-        for i in range(len(data)-1):
-            for j in range(len(data)-i-1):
-                # 高亮当前比较的元素
-                self.play(
-                    bars[j].animate.set_fill(RED),
-                    bars[j+1].animate.set_fill(RED),
-                    run_time=0.5
-                )
-                
-                if data[j] > data[j+1]:
-                    # 交换元素
-                    data[j], data[j+1] = data[j+1], data[j]
-                    
-                    # 更新标签
-                    new_labels = VGroup()
-                    for k, val in enumerate(data):
-                        label = Text(str(val), font_size=20)
-                        label.next_to(bars[k], DOWN, buff=0.1)
-                        new_labels.add(label)
-                    
-                    # 交换条形图和标签
-                    self.play(
-                        bars[j].animate.move_to(bars[j+1].get_center()),
-                        bars[j+1].animate.move_to(bars[j].get_center()),
-                        FadeOut(labels),
-                        FadeIn(new_labels),
-                        run_time=1
-                    )
-                    
-                    # 更新条形图和标签的引用
-                    bars[j], bars[j+1] = bars[j+1], bars[j]
-                    labels = new_labels
-                
-                # 恢复颜色
-                self.play(
-                    bars[j].animate.set_fill(BLUE),
-                    bars[j+1].animate.set_fill(BLUE),
-                    run_time=0.5
-                )
-        
-        # 结束动画
-        self.play(
-            bars.animate.set_fill(GREEN),
-            run_time=1
-        )
-        self.wait(2)
-""".format(code_str, str(self.show_code))
-    
-    def _generate_search_animation(self, code_str, analysis):
-        """生成搜索算法动画类代码"""
-        return """
-from manim import *
-import random
-
-class CodeAnimation(Scene):
-    def construct(self):
-        # 标题
-        title = Text("搜索算法可视化", font_size=40)
-        title.to_edge(UP)
-        self.play(Write(title))
-        
-        # 创建代码文本
-        code_text = '''{}'''
-        code = Code(code=code_text, tab_width=4, background="window",
-                    language="Python", font="Monospace")
-        code.next_to(title, DOWN)
-        code.scale(0.6)
-        
-        # 生成有序数据
-        data = [i*5 + random.randint(1, 3) for i in range(10)]
-        data.sort()
-        
-        # 创建方块表示数组元素
-        squares = VGroup()
-        labels = VGroup()
-        
-        for i, val in enumerate(data):
-            square = Square(side_length=0.8)
-            square.set_fill(BLUE, opacity=0.5)
-            square.move_to(i*1.0*RIGHT + DOWN*2)
-            
-            label = Text(str(val), font_size=24)
-            label.move_to(square.get_center())
-            
-            squares.add(square)
-            labels.add(label)
-        
-        # 显示数组
-        self.play(FadeIn(squares), FadeIn(labels))
-        
-        if {}:
-            # 显示代码
-            self.play(Write(code))
-            self.wait(1)
-        
-        # 要搜索的目标值（选择数组中的随机值）
-        target = random.choice(data)
-        target_text = Text(f"搜索目标: {target}", font_size=30)
-        target_text.next_to(squares, UP, buff=0.5)
-        self.play(Write(target_text))
-        
-        # 模拟二分搜索
-        left, right = 0, len(data) - 1
-        found = False
-        
-        # 二分搜索箭头
-        left_arrow = Arrow(start=LEFT, end=ORIGIN).scale(0.5)
-        right_arrow = Arrow(start=RIGHT, end=ORIGIN).scale(0.5)
-        
-        left_arrow.next_to(squares[left], DOWN, buff=0.3)
-        right_arrow.next_to(squares[right], DOWN, buff=0.3)
-        
-        self.play(FadeIn(left_arrow), FadeIn(right_arrow))
-        
-        while left <= right and not found:
-            mid = (left + right) // 2
-            
-            # 中间指针
-            mid_arrow = Arrow(start=UP, end=ORIGIN).scale(0.5)
-            mid_arrow.next_to(squares[mid], UP, buff=0.1)
-            self.play(FadeIn(mid_arrow))
-            
-            # 高亮当前检查的元素
-            self.play(squares[mid].animate.set_fill(YELLOW, opacity=0.8))
-            
-            if data[mid] == target:
-                # 找到目标
-                found = True
-                result_text = Text("找到目标!", font_size=30, color=GREEN)
-                result_text.next_to(target_text, DOWN, buff=0.3)
-                self.play(
-                    squares[mid].animate.set_fill(GREEN, opacity=0.8),
-                    Write(result_text)
-                )
-            elif data[mid] < target:
-                # 目标在右半部分
-                left = mid + 1
-                self.play(
-                    squares[mid].animate.set_fill(RED, opacity=0.5),
-                    left_arrow.animate.next_to(squares[left], DOWN, buff=0.3),
-                    FadeOut(mid_arrow)
-                )
-            else:
-                # 目标在左半部分
-                right = mid - 1
-                self.play(
-                    squares[mid].animate.set_fill(RED, opacity=0.5),
-                    right_arrow.animate.next_to(squares[right], DOWN, buff=0.3),
-                    FadeOut(mid_arrow)
-                )
-        
-        if not found:
-            result_text = Text("未找到目标!", font_size=30, color=RED)
-            result_text.next_to(target_text, DOWN, buff=0.3)
-            self.play(Write(result_text))
-        
-        self.wait(2)
-""".format(code_str, str(self.show_code))
-    
-    def _generate_general_animation(self, code_str, analysis):
-        """生成通用代码执行动画类代码"""
-        return """
-from manim import *
-
-class CodeAnimation(Scene):
-    def construct(self):
-        # 标题
-        title = Text("代码执行可视化", font_size=40)
-        title.to_edge(UP)
-        self.play(Write(title))
-        
-        # 创建代码文本
-        code_text = '''{}'''
-        code = Code(code=code_text, tab_width=4, background="window",
-                    language="Python", font="Monospace")
-        
-        # 获取代码行
-        code_lines = code_text.strip().split('\\n')
-        
-        # 缩放代码以适应屏幕
-        code.scale(0.7)
-        code.to_edge(LEFT)
-        
-        # 变量跟踪区域
-        var_tracker = VGroup()
-        var_title = Text("变量状态", font_size=30)
-        var_title.next_to(code, RIGHT, buff=1)
-        var_title.to_edge(UP)
-        var_tracker.add(var_title)
-        
-        # 显示代码
-        self.play(Write(code))
-        self.play(Write(var_title))
-        
-        # 变量和状态
-        variables = {}
-        
-        # 模拟执行代码
-        line_highlight = None
-        variable_texts = {}
-        
-        for line_num, line in enumerate(code_lines):
-            # 高亮当前行
-            if line_highlight:
-                self.play(FadeOut(line_highlight))
-            
-            line_highlight = SurroundingRectangle(code.line_numbers[line_num], color=YELLOW)
-            self.play(Create(line_highlight))
-            
-            # 分析当前行，处理变量赋值
-            line = line.strip()
-            if '=' in line and not '==' in line:
-                var_name = line.split('=')[0].strip()
-                
-                # 模拟执行赋值
-                try:
-                    # 这只是一个简单的模拟，实际上应该更安全地执行
-                    value = eval(line.split('=')[1].strip())
-                    variables[var_name] = value
-                    
-                    # 更新或创建变量显示
-                    var_text = Text(f"{var_name} = {value}", font_size=24)
-                    
-                    if var_name in variable_texts:
-                        self.play(
-                            ReplacementTransform(variable_texts[var_name], var_text)
-                        )
-                    else:
-                        y_pos = -0.8 * len(variable_texts)
-                        var_text.next_to(var_title, DOWN, buff=0.5)
-                        var_text.shift(y_pos * UP)
-                        self.play(FadeIn(var_text))
-                    
-                    variable_texts[var_name] = var_text
-                    
-                except:
-                    pass
-            
-            # 暂停一下以便观察
-            self.wait(0.5)
-        
-        if line_highlight:
-            self.play(FadeOut(line_highlight))
-        
-        # 显示最终结果
-        result_box = SurroundingRectangle(VGroup(*variable_texts.values()), color=GREEN)
-        self.play(Create(result_box))
-        
-        # 结束动画
-        conclusion = Text("代码执行完成", font_size=36, color=GREEN)
-        conclusion.next_to(result_box, DOWN, buff=0.5)
-        self.play(Write(conclusion))
-        
-        self.wait(2)
-""".format(code_str)
+            return "general"
 
 # 测试代码
 if __name__ == "__main__":
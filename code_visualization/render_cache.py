@@ -0,0 +1,277 @@
+"""
+代码动画渲染缓存
+
+同样的代码（如 examples.py 中的冒泡排序、二分查找）会被反复渲染，每次都要花费几分钟CPU。
+渲染结果按 (规范化代码, 是否显示代码, 分辨率, 场景模板版本, 画质) 的哈希保存在磁盘上，
+总大小超过上限时按最近使用时间淘汰。写入使用临时文件加原子替换，多个进程可以共享同一个目录。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    from code_visualization.render_pool import SCENE_TEMPLATE_VERSION
+except ImportError:
+    from render_pool import SCENE_TEMPLATE_VERSION
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 默认缓存目录和大小上限
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp", "render_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_SUFFIX = ".mp4"
+
+
+def normalize_code(code_str):
+    """
+    规范化代码：统一换行符，去掉行尾空白和首尾空行，只有空白差异的代码得到相同的缓存键
+
+    Args:
+        code_str (str): Python代码
+
+    Returns:
+        str: 规范化后的代码
+    """
+    lines = [line.rstrip() for line in code_str.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+
+def render_key(code_str, show_code=True, resolution="1080p", quality="h", template_version=SCENE_TEMPLATE_VERSION):
+    """
+    计算渲染结果的缓存键
+
+    Args:
+        code_str (str): Python代码
+        show_code (bool): 是否在动画中显示代码
+        resolution (str): 分辨率
+        quality (str): 画质
+        template_version (str): 场景模板版本
+
+    Returns:
+        str: 十六进制SHA-256
+    """
+    payload = json.dumps([normalize_code(code_str), bool(show_code), resolution, template_version, quality],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """按大小淘汰的磁盘LRU渲染缓存"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        初始化渲染缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_bytes (int): 缓存总大小上限
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 键 -> 文件大小，按最近使用时间排序（最旧的在前）
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间（即最近使用时间）重建索引"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            items = []
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    if item.name.endswith(_SUFFIX) and item.is_file():
+                        stat = item.stat()
+                        items.append((stat.st_mtime_ns, item.name[:-len(_SUFFIX)], stat.st_size))
+        except OSError as e:
+            logger.error(f"读取渲染缓存目录失败: {str(e)}")
+            return
+        for _, key, size in sorted(items):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def path_for(self, key):
+        """缓存文件路径"""
+        return os.path.join(self.cache_dir, f"{key}{_SUFFIX}")
+
+    def get_path(self, key):
+        """
+        查询缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            str: 缓存的视频路径，未命中时为None
+        """
+        path = self.path_for(key)
+        try:
+            # 更新修改时间，作为其它进程重建索引时的最近使用时间
+            os.utime(path)
+            size = os.path.getsize(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                self._forget(key)
+            return None
+        with self._lock:
+            self.hits += 1
+            if key not in self._entries:
+                # 由其它进程写入
+                self._entries[key] = size
+                self._total_bytes += size
+            self._entries.move_to_end(key)
+        return path
+
+    def contains(self, key):
+        """
+        检查缓存中是否有该键（不计入命中统计，也不更新最近使用时间）
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            bool: 是否已缓存
+        """
+        return os.path.exists(self.path_for(key))
+
+    def get_bytes(self, key):
+        """
+        读取缓存的视频
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            bytes: 视频数据，未命中时为None
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_file(self, key, source_path):
+        """
+        把渲染结果复制到缓存（原子写入）
+
+        Args:
+            key (str): 缓存键
+            source_path (str): 视频文件
+
+        Returns:
+            str: 缓存的视频路径，失败时为None
+        """
+        path = self.path_for(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as dst, open(source_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.error(f"写入渲染缓存失败: {str(e)}")
+            return None
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict_locked()
+        return path
+
+    def put_bytes(self, key, data):
+        """
+        把视频数据写入缓存（原子写入）
+
+        Returns:
+            str: 缓存的视频路径，失败时为None
+        """
+        fd, temp_path = tempfile.mkstemp(suffix=_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return self.put_file(key, temp_path)
+        finally:
+            os.unlink(temp_path)
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict_locked(self):
+        """淘汰最久未使用的条目，直到总大小不超过上限（至少保留最新的一个）"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self.path_for(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """
+        获取缓存状态
+
+        Returns:
+            dict: 命中、未命中、淘汰次数，条目数和占用大小
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# 进程级默认渲染缓存
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """
+    获取进程级默认渲染缓存
+
+    Returns:
+        RenderCache: 默认渲染缓存
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+        return _default_cache
@@ -0,0 +1,387 @@
+"""
+异步代码动画渲染任务
+
+/api/generate_visualization 在整个Manim渲染期间占住一个请求线程，客户端经常超时。
+这里把渲染放进有界的任务队列：提交后立即返回任务ID，客户端轮询状态
+（queued/running/done/failed 和进度百分比），完成后再单独获取视频。
+
+渐进模式下任务先以预览画质（480p15）渲染，几秒内即可获取预览视频；
+随后在同一任务中以目标画质渲染，完成后替换预览。
+
+渲染在渲染进程池的工作进程中进行，无法得到逐帧进度；运行中的进度按各画质最近渲染的平均耗时估算，
+完成时为100。队列已满时提交会抛出 RenderQueueFullError。
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from code_visualization.code_animator import CodeAnimator
+    from code_visualization.render_pool import DEFAULT_POOL_SIZE, PREVIEW_QUALITY, resolve_quality
+except ImportError:
+    from code_animator import CodeAnimator
+    from render_pool import DEFAULT_POOL_SIZE, PREVIEW_QUALITY, resolve_quality
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 渲染阶段
+STAGE_PREVIEW = "preview"
+STAGE_FINAL = "final"
+
+# 同时执行的任务数（默认与渲染进程数相同）和最多排队的任务数，可通过环境变量配置
+DEFAULT_JOB_WORKERS = int(os.environ.get("VISUALIZATION_WORKERS", str(DEFAULT_POOL_SIZE)))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("VISUALIZATION_QUEUE_DEPTH", "16"))
+# 还没有渲染记录时估算进度所用的各画质渲染耗时（秒）
+DEFAULT_EXPECTED_SECONDS = {"l": 10.0, "m": 25.0, "h": 60.0, "p": 90.0, "k": 180.0}
+
+
+class RenderQueueFullError(RuntimeError):
+    """渲染队列已满"""
+
+
+class RenderJob:
+    """一个代码动画渲染任务"""
+
+    __slots__ = ("job_id", "code", "show_code", "quality", "preview_quality", "status", "stage", "analysis",
+                 "result_path", "result_quality", "cached", "simulated", "error", "created_at", "started_at",
+                 "stage_started_at", "updated_at")
+
+    def __init__(self, job_id, code, show_code, quality, preview_quality, analysis):
+        self.job_id = job_id
+        self.code = code
+        self.show_code = show_code
+        self.quality = quality
+        self.preview_quality = preview_quality
+        self.status = STATUS_QUEUED
+        self.stage = None
+        self.analysis = analysis
+        self.result_path = None
+        self.result_quality = None
+        self.cached = False
+        self.simulated = False
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.stage_started_at = None
+        self.updated_at = self.created_at
+
+    def progress(self, expected_seconds):
+        """
+        估算进度百分比
+
+        Args:
+            expected_seconds (dict): 各画质的预计渲染耗时
+
+        Returns:
+            int: 0-100
+        """
+        if self.status in (STATUS_DONE, STATUS_FAILED):
+            return 100
+        if self.status == STATUS_QUEUED or not self.stage_started_at:
+            return 0
+        final_seconds = expected_seconds[self.quality]
+        preview_seconds = expected_seconds[self.preview_quality] if self.preview_quality else 0.0
+        elapsed = time.time() - self.stage_started_at
+        if self.stage == STAGE_FINAL:
+            elapsed += preview_seconds
+        # 运行中的任务最多报告99，完成后才是100
+        return min(99, int(elapsed / max(preview_seconds + final_seconds, 1e-6) * 100))
+
+    def snapshot(self, expected_seconds):
+        """
+        获取任务当前状态
+
+        Returns:
+            dict: 任务状态、进度、画质和代码分析
+        """
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress(expected_seconds),
+            "progress_estimated": self.status == STATUS_RUNNING,
+            "quality": self.quality,
+            "preview_quality": self.preview_quality,
+            "result_quality": self.result_quality,
+            "cached": self.cached,
+            "simulated": self.simulated,
+            "error": self.error,
+            "analysis": self.analysis,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class RenderJobManager:
+    """管理异步渲染任务：有界队列加固定数量的执行线程"""
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_queue=DEFAULT_QUEUE_DEPTH, max_jobs=1000):
+        """
+        初始化任务管理器
+
+        Args:
+            max_workers (int): 同时执行的渲染任务数
+            max_queue (int): 最多排队等待的任务数，超出时拒绝提交
+            max_jobs (int): 最多保留的任务数，超出时丢弃最早的已结束任务及其视频
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="visualize")
+        self._jobs = OrderedDict()
+        self._condition = threading.Condition()
+        self._result_dir = tempfile.mkdtemp(prefix="render_jobs_")
+        self._expected_seconds = dict(DEFAULT_EXPECTED_SECONDS)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _pending_locked(self):
+        return sum(1 for job in self._jobs.values() if job.status in (STATUS_QUEUED, STATUS_RUNNING))
+
+    def submit(self, code, show_code=True, quality=None, resolution=None, progressive=False, check_cache=True):
+        """
+        提交渲染任务
+
+        Args:
+            code (str): Python代码
+            show_code (bool): 是否在动画中显示代码
+            quality (str): 画质档位 "l"/"m"/"h"/"p"/"k"
+            resolution (str): 分辨率，未指定画质时按分辨率选择画质档位
+            progressive (bool): 是否先渲染预览画质，再渲染目标画质替换预览
+            check_cache (bool): 目标画质渲染前是否查询渲染缓存；调用方已经查询过时传False，避免重复计数
+
+        Returns:
+            dict: 任务快照
+
+        Raises:
+            ValueError: 未知的画质或分辨率
+            RenderQueueFullError: 排队和执行中的任务已达上限
+        """
+        quality = resolve_quality(quality, resolution)
+        animator = CodeAnimator(show_code=show_code, quality=quality)
+        preview_quality = None
+        # 目标画质已缓存时不需要预览
+        if progressive and quality != PREVIEW_QUALITY and not animator.is_cached(code, show_code, quality):
+            preview_quality = PREVIEW_QUALITY
+        job = RenderJob(uuid.uuid4().hex[:12], code, show_code, quality, preview_quality, animator.analyze_code(code))
+
+        with self._condition:
+            if self._pending_locked() >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise RenderQueueFullError(f"渲染队列已满（{self.max_workers + self.max_queue} 个任务）")
+            self._add_job_locked(job)
+
+        self._executor.submit(self._run, job, animator, check_cache)
+        return self.get(job.job_id)
+
+    def _add_job_locked(self, job):
+        """登记任务并淘汰多余的已结束任务"""
+        self._jobs[job.job_id] = job
+        if len(self._jobs) > self.max_jobs:
+            for old_id in [k for k, v in self._jobs.items() if v.status in (STATUS_DONE, STATUS_FAILED)]:
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                old_job = self._jobs.pop(old_id)
+                if old_job.result_path:
+                    try:
+                        os.remove(old_job.result_path)
+                    except OSError:
+                        pass
+
+    def _render_stage(self, job, animator, stage, quality, output_path, check_cache=True):
+        """
+        渲染任务的一个阶段
+
+        Returns:
+            tuple: (视频路径, 错误信息)
+        """
+        with self._condition:
+            job.stage = stage
+            job.stage_started_at = job.updated_at = time.time()
+            self._condition.notify_all()
+        try:
+            path, timing = animator.render_animation(job.code, output_path=output_path, show_code=job.show_code,
+                                                     quality=quality, check_cache=check_cache)
+            error = None if path and os.path.exists(path) else "Failed to generate animation"
+        except Exception as e:
+            logger.error(f"渲染任务 {job.job_id} 的{stage}阶段失败: {str(e)}")
+            path, timing, error = None, {}, str(e)
+
+        if error is None and timing.get("fallback") and not animator.using_simulation:
+            # render_animation 在渲染失败时返回模拟视频，不能当作该阶段的结果，也不能替换已有的预览
+            logger.error(f"渲染任务 {job.job_id} 的{stage}阶段失败，只生成了模拟视频")
+            error = "Render failed, only a placeholder video was produced"
+            if path != job.result_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            path = None
+
+        with self._condition:
+            job.updated_at = time.time()
+            if error is None:
+                previous_path = job.result_path
+                job.result_path = path
+                job.result_quality = quality
+                job.cached = bool(timing.get("cached"))
+                job.simulated = animator.using_simulation
+                if previous_path and previous_path != path:
+                    # 目标画质的视频替换预览
+                    try:
+                        os.remove(previous_path)
+                    except OSError:
+                        pass
+                if not job.cached and not job.simulated:
+                    # 按该画质最近的渲染耗时更新进度估算
+                    elapsed = job.updated_at - job.stage_started_at
+                    self._expected_seconds[quality] = 0.7 * self._expected_seconds[quality] + 0.3 * elapsed
+            self._condition.notify_all()
+        return path, error
+
+    def _run(self, job, animator, check_cache=True):
+        """在执行线程中渲染任务"""
+        with self._condition:
+            job.status = STATUS_RUNNING
+            job.started_at = job.updated_at = time.time()
+
+        if job.preview_quality:
+            preview_path = os.path.join(self._result_dir, f"{job.job_id}.{job.preview_quality}.mp4")
+            # 预览失败不影响目标画质的渲染
+            self._render_stage(job, animator, STAGE_PREVIEW, job.preview_quality, preview_path)
+
+        output_path = os.path.join(self._result_dir, f"{job.job_id}.{job.quality}.mp4")
+        _, error = self._render_stage(job, animator, STAGE_FINAL, job.quality, output_path, check_cache)
+
+        with self._condition:
+            job.updated_at = time.time()
+            if error:
+                job.status = STATUS_FAILED
+                job.error = error
+                self.failed += 1
+            else:
+                job.status = STATUS_DONE
+                self.completed += 1
+            self._condition.notify_all()
+        logger.info(f"渲染任务 {job.job_id} 结束（{job.status}），耗时 {job.updated_at - job.started_at:.1f} 秒")
+
+    def get(self, job_id):
+        """
+        获取任务当前状态
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            dict: 任务快照，不存在时为None
+        """
+        with self._condition:
+            return self._snapshot_locked(job_id)
+
+    def _snapshot_locked(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = job.snapshot(self._expected_seconds)
+        if job.status == STATUS_QUEUED:
+            queued = [k for k, v in self._jobs.items() if v.status == STATUS_QUEUED]
+            snapshot["queue_position"] = queued.index(job_id) + 1
+        return snapshot
+
+    def wait_for_result(self, job_id, timeout=60):
+        """
+        等待任务有可用的视频（预览或目标画质）或结束
+
+        Args:
+            job_id (str): 任务ID
+            timeout (float): 最长等待秒数
+
+        Returns:
+            dict: 任务快照，不存在时为None
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job.result_path or job.status in (STATUS_DONE, STATUS_FAILED) or remaining <= 0:
+                    return self._snapshot_locked(job_id)
+                self._condition.wait(remaining)
+
+    def result(self, job_id):
+        """
+        获取任务当前可用的视频；渐进任务在目标画质完成前返回预览
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            tuple: (视频路径, 画质档位)，任务不存在或还没有视频时为 (None, None)
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or not job.result_path:
+                return None, None
+            return job.result_path, job.result_quality
+
+    def stats(self):
+        """
+        获取队列状态
+
+        Returns:
+            dict: 执行线程数、队列容量、排队和执行中的任务数、累计完成/失败/拒绝数和各画质的预计耗时
+        """
+        with self._condition:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": statuses.count(STATUS_QUEUED),
+                "running": statuses.count(STATUS_RUNNING),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "expected_seconds": {k: round(v, 1) for k, v in self._expected_seconds.items()},
+            }
+
+    def shutdown(self):
+        """等待执行中的任务结束并删除结果视频"""
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(self._result_dir, ignore_errors=True)
+
+
+# 进程级默认任务管理器
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_render_job_manager():
+    """
+    获取进程级默认渲染任务管理器
+
+    Returns:
+        RenderJobManager: 默认任务管理器
+    """
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = RenderJobManager()
+        return _default_manager
@@ -0,0 +1,369 @@
+"""
+Manim渲染进程池
+
+原来每个请求都用 os.system 启动一次manim命令行：新的解释器、完整导入manim、加载字体，
+之后才开始画第一帧。这里维护一组常驻的渲染工作进程，进程启动时导入manim和场景模块并预热字体，
+之后的任务直接实例化 scenes.py 中以数据为参数的场景类渲染，不再生成脚本文件。
+
+每个任务分别报告启动耗时（工作进程导入和预热，只计入该进程的第一个任务）和渲染耗时。
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 工作进程数，可通过环境变量配置
+DEFAULT_POOL_SIZE = int(os.environ.get("MANIM_RENDER_WORKERS", "2"))
+# 单个渲染任务的超时（秒）
+DEFAULT_TIMEOUT = 600
+# 每个工作进程最多执行的任务数，之后换成新进程，避免一次渲染留下的状态影响后续任务（需要Python 3.11+）
+DEFAULT_TASKS_PER_WORKER = int(os.environ.get("MANIM_RENDER_TASKS_PER_WORKER", "50"))
+# 场景模板版本，计入渲染缓存的键；修改 scenes.py 中的场景后需要递增
+SCENE_TEMPLATE_VERSION = "2"
+
+# 画质档位：manim命令行 -q 参数 -> 配置中的quality名称、分辨率和帧率
+# 输出视频位于 media_dir/videos/<场景>/<分辨率><帧率>/ 下，路径由工作进程按实际配置返回
+QUALITY_PRESETS = {
+    "l": {"name": "low_quality", "resolution": "480p", "fps": 15},
+    "m": {"name": "medium_quality", "resolution": "720p", "fps": 30},
+    "h": {"name": "high_quality", "resolution": "1080p", "fps": 60},
+    "p": {"name": "production_quality", "resolution": "1440p", "fps": 60},
+    "k": {"name": "fourk_quality", "resolution": "2160p", "fps": 60},
+}
+QUALITY_NAMES = {code: preset["name"] for code, preset in QUALITY_PRESETS.items()}
+# 默认画质和渐进渲染时的预览画质
+DEFAULT_QUALITY = "h"
+PREVIEW_QUALITY = "l"
+
+
+def resolve_quality(quality=None, resolution=None):
+    """
+    确定画质档位
+
+    Args:
+        quality (str): 画质档位 "l"/"m"/"h"/"p"/"k"，优先使用
+        resolution (str): 分辨率，如 "480p"、"1080p"，未指定画质时按分辨率选择档位
+
+    Returns:
+        str: 画质档位
+
+    Raises:
+        ValueError: 未知的画质或分辨率
+    """
+    if quality:
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"未知的画质: {quality}，可选 {'/'.join(QUALITY_PRESETS)}")
+        return quality
+    if resolution:
+        for code, preset in QUALITY_PRESETS.items():
+            if preset["resolution"] == resolution:
+                return code
+        resolutions = "/".join(preset["resolution"] for preset in QUALITY_PRESETS.values())
+        raise ValueError(f"未知的分辨率: {resolution}，可选 {resolutions}")
+    return DEFAULT_QUALITY
+
+
+# 工作进程内的状态
+_worker_state = {"startup_seconds": None, "startup_reported": False}
+
+
+def _init_worker():
+    """工作进程初始化：导入manim和场景模块，预热字体"""
+    start_time = time.perf_counter()
+    import manim
+    try:
+        from code_visualization import scenes  # noqa: F401
+    except ImportError:
+        import scenes  # noqa: F401
+    # 第一次创建Text时才会加载字体，提前做掉
+    manim.Text("预热")
+    _worker_state["startup_seconds"] = time.perf_counter() - start_time
+
+
+def _worker_info():
+    """返回工作进程的PID和启动耗时（用于预热）"""
+    return os.getpid(), _worker_state["startup_seconds"]
+
+
+def _render_scene(scene_name, params, quality, media_dir):
+    """
+    在工作进程中渲染一个场景
+
+    Args:
+        scene_name (str): scenes.SCENES 中的场景名
+        params (dict): 场景参数
+        quality (str): 画质档位 "l"/"m"/"h"/"p"/"k" 或manim的quality名称
+        media_dir (str): 输出目录
+
+    Returns:
+        dict: 视频路径、启动耗时、渲染耗时和工作进程PID
+    """
+    from manim import tempconfig
+    try:
+        from code_visualization.scenes import SCENES
+    except ImportError:
+        from scenes import SCENES
+
+    startup_seconds = 0.0
+    if not _worker_state["startup_reported"]:
+        startup_seconds = _worker_state["startup_seconds"] or 0.0
+        _worker_state["startup_reported"] = True
+
+    start_time = time.perf_counter()
+    options = {
+        "quality": QUALITY_NAMES.get(quality, quality),
+        "media_dir": media_dir,
+        "output_file": scene_name,
+        "disable_caching": True,
+        "progress_bar": "none",
+        "verbosity": "WARNING",
+    }
+    with tempconfig(options):
+        scene = SCENES[scene_name](**params)
+        scene.render()
+        video_path = str(scene.renderer.file_writer.movie_file_path)
+    return {
+        "path": video_path,
+        "startup_seconds": round(startup_seconds, 3),
+        "render_seconds": round(time.perf_counter() - start_time, 3),
+        "worker_pid": os.getpid(),
+    }
+
+
+class RenderPool:
+    """常驻的Manim渲染进程池"""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, tasks_per_worker=DEFAULT_TASKS_PER_WORKER):
+        """
+        初始化渲染进程池（工作进程在第一次使用或warm_up时启动）
+
+        Args:
+            size (int): 工作进程数
+            timeout (float): 单个任务的超时（秒），超时后终止并重建整个进程池
+            tasks_per_worker (int): 每个工作进程最多执行的任务数，0表示不限制
+        """
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.tasks_per_worker = max(0, tasks_per_worker)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.failures = 0
+        self.total_startup_seconds = 0.0
+        self.total_render_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn：不从可能持有线程和锁的Web服务进程fork
+                kwargs = {}
+                if self.tasks_per_worker and sys.version_info >= (3, 11):
+                    kwargs["max_tasks_per_child"] = self.tasks_per_worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    **kwargs
+                )
+            return self._executor
+
+    def _discard(self, executor, terminate=False):
+        """
+        丢弃进程池，下次使用时重建
+
+        Args:
+            executor (ProcessPoolExecutor): 要丢弃的进程池；已经被替换时只关闭它
+            terminate (bool): 是否终止仍在运行的工作进程（如卡住的渲染）
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        if terminate:
+            terminate_workers = getattr(executor, "terminate_workers", None)
+            if terminate_workers is not None:
+                terminate_workers()
+            else:
+                for process in list((getattr(executor, "_processes", None) or {}).values()):
+                    process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """
+        启动所有工作进程并完成导入和预热
+
+        Returns:
+            list: (工作进程PID, 启动耗时) 列表
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(_worker_info) for _ in range(self.size)]
+        return [future.result(timeout=self.timeout) for future in futures]
+
+    def submit(self, scene_name, params, quality=DEFAULT_QUALITY, media_dir=None):
+        """
+        提交渲染任务
+
+        Args:
+            scene_name (str): 场景名
+            params (dict): 场景参数（如 code_text、show_code）
+            quality (str): 画质
+            media_dir (str): 输出目录，默认新建临时目录
+
+        Returns:
+            Future: 结果为 _render_scene 返回的字典
+        """
+        media_dir = media_dir or tempfile.mkdtemp(prefix="manim_")
+        return self._get_executor().submit(_render_scene, scene_name, params, quality, media_dir)
+
+    def render(self, scene_name, params, quality=DEFAULT_QUALITY, media_dir=None):
+        """
+        渲染场景并等待结果
+
+        超时的任务会一直占住一个工作进程，因此超时后终止该进程池的所有工作进程并重建，
+        同一进程池中其它正在执行的任务会以 BrokenProcessPool 失败。
+
+        Returns:
+            dict: 视频路径、启动耗时、渲染耗时和工作进程PID
+        """
+        executor = self._get_executor()
+        media_dir = media_dir or tempfile.mkdtemp(prefix="manim_")
+        try:
+            result = executor.submit(_render_scene, scene_name, params, quality, media_dir).result(timeout=self.timeout)
+        except BrokenProcessPool as e:
+            # 工作进程崩溃后进程池不可再用，下次使用时重建
+            logger.error(f"渲染进程池已损坏，将重建: {str(e)}")
+            self._discard(executor)
+            with self._lock:
+                self.failures += 1
+            raise
+        except FutureTimeoutError:
+            logger.error(f"渲染超时（{self.timeout} 秒），终止工作进程并重建进程池")
+            self._discard(executor, terminate=True)
+            with self._lock:
+                self.failures += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        with self._lock:
+            self.jobs += 1
+            self.total_startup_seconds += result["startup_seconds"]
+            self.total_render_seconds += result["render_seconds"]
+        return result
+
+    def stats(self):
+        """
+        获取进程池状态
+
+        Returns:
+            dict: 进程数、完成任务数、失败数、累计启动和渲染耗时
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "tasks_per_worker": self.tasks_per_worker,
+                "started": self._executor is not None,
+                "jobs": self.jobs,
+                "failures": self.failures,
+                "startup_seconds": round(self.total_startup_seconds, 3),
+                "render_seconds": round(self.total_render_seconds, 3),
+            }
+
+    def shutdown(self):
+        """关闭工作进程"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# 进程级默认渲染进程池
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    """
+    获取进程级默认渲染进程池
+
+    Returns:
+        RenderPool: 默认渲染进程池
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = RenderPool()
+        return _default_pool
+
+
+def benchmark(num_jobs=4, quality="l", size=DEFAULT_POOL_SIZE):
+    """
+    比较每次启动manim命令行与使用常驻进程池的耗时
+
+    Args:
+        num_jobs (int): 渲染任务数
+        quality (str): 画质
+        size (int): 进程池大小
+
+    Returns:
+        dict: 两种方式的总耗时，以及进程池任务的启动/渲染耗时
+    """
+    import subprocess
+    import sys
+
+    params = {"code_text": "x = 1\ny = x + 2\n", "show_code": True, "seed": 0}
+    results = {"jobs": num_jobs, "quality": quality}
+
+    # 原来的方式：每个任务一个manim命令行进程
+    script = (
+        "from code_visualization.scenes import GeneralScene\n"
+        "class CodeAnimation(GeneralScene):\n"
+        f"    def __init__(self, **kwargs):\n        super().__init__(**{params!r}, **kwargs)\n"
+    )
+    temp_dir = tempfile.mkdtemp(prefix="manim_cli_")
+    script_path = os.path.join(temp_dir, "animation_script.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(script)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    start_time = time.perf_counter()
+    for _ in range(num_jobs):
+        subprocess.run([sys.executable, "-m", "manim", script_path, "CodeAnimation", "-q", quality,
+                        "--media_dir", temp_dir, "--progress_bar", "none"],
+                       check=True, env=env, capture_output=True)
+    results["cli_seconds"] = round(time.perf_counter() - start_time, 2)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+    pool = RenderPool(size=size)
+    media_dir = tempfile.mkdtemp(prefix="manim_pool_")
+    start_time = time.perf_counter()
+    jobs = [pool.render("general", params, quality, os.path.join(media_dir, str(i))) for i in range(num_jobs)]
+    results["pool_seconds"] = round(time.perf_counter() - start_time, 2)
+    results["pool_startup_seconds"] = round(sum(job["startup_seconds"] for job in jobs), 2)
+    results["pool_render_seconds"] = round(sum(job["render_seconds"] for job in jobs), 2)
+    pool.shutdown()
+    shutil.rmtree(media_dir, ignore_errors=True)
+    return results
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="比较manim命令行与常驻渲染进程池的耗时")
+    parser.add_argument("--jobs", type=int, default=4, help="渲染任务数")
+    parser.add_argument("--quality", default="l", help="画质 l/m/h/p/k")
+    parser.add_argument("--workers", type=int, default=DEFAULT_POOL_SIZE, help="进程池大小")
+    args = parser.parse_args()
+
+    print(benchmark(args.jobs, args.quality, args.workers))
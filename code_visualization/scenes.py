@@ -0,0 +1,325 @@
+"""
+代码可视化的Manim场景
+
+原来每次渲染都要把代码拼进一段脚本模板、写成文件再交给manim命令行。这里把模板改为
+以数据为参数的Scene类，由渲染进程池中已经导入manim的工作进程直接实例化并渲染。
+
+本模块在导入时就会导入manim，只应在渲染工作进程中导入。
+"""
+
+import ast
+import random
+
+from manim import (DOWN, GREEN, LEFT, ORIGIN, RED, RIGHT, UP, YELLOW, BLUE, Arrow, Code, Create, FadeIn,
+                   FadeOut, Rectangle, ReplacementTransform, Scene, Square, SurroundingRectangle, Text, VGroup,
+                   Write)
+
+
+class CodeScene(Scene):
+    """带代码参数的场景基类"""
+
+    def __init__(self, code_text="", show_code=True, seed=None, **kwargs):
+        """
+        初始化场景
+
+        Args:
+            code_text (str): 要展示的Python代码
+            show_code (bool): 是否在动画中显示代码
+            seed (int): 随机数据的种子，相同的种子生成相同的动画
+        """
+        self.code_text = code_text
+        self.show_code = show_code
+        self.random = random.Random(seed)
+        super().__init__(**kwargs)
+
+    def make_code(self):
+        return Code(code=self.code_text, tab_width=4, background="window",
+                    language="Python", font="Monospace")
+
+
+class SortingScene(CodeScene):
+    """排序算法可视化（冒泡排序过程）"""
+
+    def construct(self):
+        # 标题
+        title = Text("排序算法可视化", font_size=40)
+        title.to_edge(UP)
+        self.play(Write(title))
+
+        # 创建代码文本
+        code = self.make_code()
+        code.next_to(title, DOWN)
+        code.scale(0.6)
+
+        # 生成随机数据
+        data = [self.random.randint(10, 100) for _ in range(10)]
+
+        # 创建条形图
+        bars = VGroup()
+        for i, val in enumerate(data):
+            bar = Rectangle(height=val / 20, width=0.6)
+            bar.set_fill(BLUE, opacity=1)
+            bar.move_to(i * 0.8 * RIGHT + DOWN * 2 + bar.height / 2 * UP)
+            bars.add(bar)
+
+        # 添加值标签
+        labels = VGroup()
+        for i, bar in enumerate(bars):
+            label = Text(str(data[i]), font_size=20)
+            label.next_to(bar, DOWN, buff=0.1)
+            labels.add(label)
+
+        # 显示条形图和标签
+        self.play(FadeIn(bars), FadeIn(labels))
+
+        if self.show_code:
+            # 显示代码
+            self.play(Write(code))
+            self.wait(1)
+
+        # 模拟冒泡排序过程
+        for i in range(len(data) - 1):
+            for j in range(len(data) - i - 1):
+                # 高亮当前比较的元素
+                self.play(
+                    bars[j].animate.set_fill(RED),
+                    bars[j + 1].animate.set_fill(RED),
+                    run_time=0.5
+                )
+
+                if data[j] > data[j + 1]:
+                    # 交换元素
+                    data[j], data[j + 1] = data[j + 1], data[j]
+
+                    # 更新标签
+                    new_labels = VGroup()
+                    for k, val in enumerate(data):
+                        label = Text(str(val), font_size=20)
+                        label.next_to(bars[k], DOWN, buff=0.1)
+                        new_labels.add(label)
+
+                    # 交换条形图和标签
+                    self.play(
+                        bars[j].animate.move_to(bars[j + 1].get_center()),
+                        bars[j + 1].animate.move_to(bars[j].get_center()),
+                        FadeOut(labels),
+                        FadeIn(new_labels),
+                        run_time=1
+                    )
+
+                    # 更新条形图和标签的引用
+                    bars[j], bars[j + 1] = bars[j + 1], bars[j]
+                    labels = new_labels
+
+                # 恢复颜色
+                self.play(
+                    bars[j].animate.set_fill(BLUE),
+                    bars[j + 1].animate.set_fill(BLUE),
+                    run_time=0.5
+                )
+
+        # 结束动画
+        self.play(
+            bars.animate.set_fill(GREEN),
+            run_time=1
+        )
+        self.wait(2)
+
+
+class SearchScene(CodeScene):
+    """搜索算法可视化（二分查找过程）"""
+
+    def construct(self):
+        # 标题
+        title = Text("搜索算法可视化", font_size=40)
+        title.to_edge(UP)
+        self.play(Write(title))
+
+        # 创建代码文本
+        code = self.make_code()
+        code.next_to(title, DOWN)
+        code.scale(0.6)
+
+        # 生成有序数据
+        data = [i * 5 + self.random.randint(1, 3) for i in range(10)]
+        data.sort()
+
+        # 创建方块表示数组元素
+        squares = VGroup()
+        labels = VGroup()
+
+        for i, val in enumerate(data):
+            square = Square(side_length=0.8)
+            square.set_fill(BLUE, opacity=0.5)
+            square.move_to(i * 1.0 * RIGHT + DOWN * 2)
+
+            label = Text(str(val), font_size=24)
+            label.move_to(square.get_center())
+
+            squares.add(square)
+            labels.add(label)
+
+        # 显示数组
+        self.play(FadeIn(squares), FadeIn(labels))
+
+        if self.show_code:
+            # 显示代码
+            self.play(Write(code))
+            self.wait(1)
+
+        # 要搜索的目标值（选择数组中的随机值）
+        target = self.random.choice(data)
+        target_text = Text(f"搜索目标: {target}", font_size=30)
+        target_text.next_to(squares, UP, buff=0.5)
+        self.play(Write(target_text))
+
+        # 模拟二分搜索
+        left, right = 0, len(data) - 1
+        found = False
+
+        # 二分搜索箭头
+        left_arrow = Arrow(start=LEFT, end=ORIGIN).scale(0.5)
+        right_arrow = Arrow(start=RIGHT, end=ORIGIN).scale(0.5)
+
+        left_arrow.next_to(squares[left], DOWN, buff=0.3)
+        right_arrow.next_to(squares[right], DOWN, buff=0.3)
+
+        self.play(FadeIn(left_arrow), FadeIn(right_arrow))
+
+        while left <= right and not found:
+            mid = (left + right) // 2
+
+            # 中间指针
+            mid_arrow = Arrow(start=UP, end=ORIGIN).scale(0.5)
+            mid_arrow.next_to(squares[mid], UP, buff=0.1)
+            self.play(FadeIn(mid_arrow))
+
+            # 高亮当前检查的元素
+            self.play(squares[mid].animate.set_fill(YELLOW, opacity=0.8))
+
+            if data[mid] == target:
+                # 找到目标
+                found = True
+                result_text = Text("找到目标!", font_size=30, color=GREEN)
+                result_text.next_to(target_text, DOWN, buff=0.3)
+                self.play(
+                    squares[mid].animate.set_fill(GREEN, opacity=0.8),
+                    Write(result_text)
+                )
+            elif data[mid] < target:
+                # 目标在右半部分
+                left = mid + 1
+                self.play(
+                    squares[mid].animate.set_fill(RED, opacity=0.5),
+                    left_arrow.animate.next_to(squares[left], DOWN, buff=0.3),
+                    FadeOut(mid_arrow)
+                )
+            else:
+                # 目标在左半部分
+                right = mid - 1
+                self.play(
+                    squares[mid].animate.set_fill(RED, opacity=0.5),
+                    right_arrow.animate.next_to(squares[right], DOWN, buff=0.3),
+                    FadeOut(mid_arrow)
+                )
+
+        if not found:
+            result_text = Text("未找到目标!", font_size=30, color=RED)
+            result_text.next_to(target_text, DOWN, buff=0.3)
+            self.play(Write(result_text))
+
+        self.wait(2)
+
+
+class GeneralScene(CodeScene):
+    """通用代码执行可视化（逐行高亮并跟踪变量赋值）"""
+
+    def construct(self):
+        # 标题
+        title = Text("代码执行可视化", font_size=40)
+        title.to_edge(UP)
+        self.play(Write(title))
+
+        # 创建代码文本
+        code = self.make_code()
+
+        # 获取代码行
+        code_lines = self.code_text.strip().split('\n')
+
+        # 缩放代码以适应屏幕
+        code.scale(0.7)
+        code.to_edge(LEFT)
+
+        # 变量跟踪区域
+        var_title = Text("变量状态", font_size=30)
+        var_title.next_to(code, RIGHT, buff=1)
+        var_title.to_edge(UP)
+
+        # 显示代码
+        self.play(Write(code))
+        self.play(Write(var_title))
+
+        # 模拟执行代码
+        line_highlight = None
+        variable_texts = {}
+
+        for line_num, line in enumerate(code_lines):
+            # 高亮当前行
+            if line_highlight:
+                self.play(FadeOut(line_highlight))
+
+            line_highlight = SurroundingRectangle(code.line_numbers[line_num], color=YELLOW)
+            self.play(Create(line_highlight))
+
+            # 分析当前行，处理变量赋值
+            line = line.strip()
+            if '=' in line and '==' not in line:
+                var_name = line.split('=')[0].strip()
+
+                # 模拟执行赋值
+                try:
+                    # 只显示字面量的值：场景在常驻的渲染工作进程中执行，不能对用户代码调用eval
+                    value = ast.literal_eval(line.split('=')[1].strip())
+
+                    # 更新或创建变量显示
+                    var_text = Text(f"{var_name} = {value}", font_size=24)
+
+                    if var_name in variable_texts:
+                        self.play(
+                            ReplacementTransform(variable_texts[var_name], var_text)
+                        )
+                    else:
+                        y_pos = -0.8 * len(variable_texts)
+                        var_text.next_to(var_title, DOWN, buff=0.5)
+                        var_text.shift(y_pos * UP)
+                        self.play(FadeIn(var_text))
+
+                    variable_texts[var_name] = var_text
+
+                except Exception:
+                    pass
+
+            # 暂停一下以便观察
+            self.wait(0.5)
+
+        if line_highlight:
+            self.play(FadeOut(line_highlight))
+
+        # 显示最终结果
+        result_box = SurroundingRectangle(VGroup(*variable_texts.values()), color=GREEN)
+        self.play(Create(result_box))
+
+        # 结束动画
+        conclusion = Text("代码执行完成", font_size=36, color=GREEN)
+        conclusion.next_to(result_box, DOWN, buff=0.5)
+        self.play(Write(conclusion))
+
+        self.wait(2)
+
+
+# 场景名 -> 场景类，渲染任务只传场景名和参数
+SCENES = {
+    "sorting": SortingScene,
+    "search": SearchScene,
+    "general": GeneralScene,
+}
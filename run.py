@@ -112,14 +112,67 @@ def run_api():
     except KeyboardInterrupt:
         print("\nAPI服务已关闭")
 
+def run_batch(input_path, output_dir):
+    """批量生成Scratch项目，每完成一个输出一行JSON"""
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import json
+    from speech_to_scratch.text_to_scratch import TextToScratchConverter
+    from speech_to_scratch.bulk import BulkGenerator
+    from speech_to_scratch.project_store import project_hash
+    
+    # 每行一段描述，"-"表示从标准输入读取
+    if input_path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    texts = [line.strip() for line in lines if line.strip()]
+    if not texts:
+        print("没有需要生成的描述", file=sys.stderr)
+        return
+    
+    os.makedirs(output_dir, exist_ok=True)
+    converter = TextToScratchConverter(use_gpu=False)
+    generator = BulkGenerator(converter)
+    failed = 0
+    try:
+        for result in generator.generate(texts):
+            if "error" in result:
+                failed += 1
+            else:
+                digest = project_hash(result["project"])
+                file_path = os.path.join(output_dir, f"{result['index'] + 1}_{digest[:12]}.sb3")
+                converter.save_project(result["project"], file_path, compact=True)
+                result = {
+                    "index": result["index"],
+                    "text": result["text"],
+                    "project_hash": digest,
+                    "file": file_path,
+                    "metadata": result["metadata"],
+                    "seconds": result["seconds"]
+                }
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    finally:
+        generator.shutdown()
+    
+    if failed:
+        sys.exit(1)
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="智能教育辅助平台启动脚本")
     parser.add_argument("--skip-deps", action="store_true", help="跳过依赖安装")
     parser.add_argument("--skip-examples", action="store_true", help="跳过示例生成")
     parser.add_argument("--api", action="store_true", help="启动API服务（供Android应用调用）")
+    parser.add_argument("--batch", metavar="FILE", help="批量生成：FILE中每行一段描述（- 表示标准输入），结果以NDJSON输出")
+    parser.add_argument("--batch-output", default=os.path.join("temp", "batch"), help="批量生成的sb3保存目录")
     args = parser.parse_args()
     
+    # 批量生成模式：标准输出只有NDJSON，不打印欢迎信息也不安装依赖，生成完成后直接退出
+    if args.batch:
+        run_batch(args.batch, args.batch_output)
+        return
+    
     # 打印欢迎信息
     print("=" * 60)
     print("             智能教育辅助平台 - AIGC创新赛             ")
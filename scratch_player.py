@@ -2,16 +2,19 @@
 Scratch项目嵌入播放器模块
 
 此模块提供在Streamlit应用中嵌入和运行Scratch项目的功能，
-使用iframe嵌入Scratch在线编辑器或播放器，实现项目预览和交互功能。
+使用iframe嵌入API服务提供的本地播放器（/player）或Scratch在线编辑器，实现项目预览和交互功能。
+API服务不可访问时（例如只用 run.py 默认模式启动了Streamlit），退回到下载项目并在TurboWarp中打开的方式。
 """
 
 import os
 import json
-import base64
+import time
+import urllib.request
 import streamlit as st
-import uuid
 from pathlib import Path
 
+from speech_to_scratch.project_store import get_project_store
+
 class ScratchPlayer:
     """Scratch项目嵌入播放器"""
     
@@ -22,6 +25,45 @@ class ScratchPlayer:
         self.turbowarp_url = "https://turbowarp.org"
         self.turbowarp_embed_url = "https://turbowarp.org/embed"
         self.scratch_url = "https://scratch.mit.edu/projects/editor"
+        # 项目按内容哈希保存，同一项目重复渲染不会再写新文件
+        self.project_store = get_project_store()
+        # 提供 /player 路由的API服务地址
+        self.player_base_url = os.environ.get("SCRATCH_PLAYER_BASE_URL", "http://localhost:5000").rstrip("/")
+        # 播放器可用性的检查结果和检查时间，避免每次渲染都请求一次API服务
+        self._player_available = None
+        self._player_checked_at = 0.0
+        self.player_check_interval = 30.0
+    
+    def player_available(self):
+        """
+        检查API服务的 /player 页面是否可以访问（结果缓存 player_check_interval 秒）
+        
+        Returns:
+            bool: 是否可以访问
+        """
+        now = time.monotonic()
+        if self._player_available is None or now - self._player_checked_at > self.player_check_interval:
+            try:
+                with urllib.request.urlopen(f"{self.player_base_url}/player", timeout=1) as response:
+                    self._player_available = response.status == 200
+            except Exception:
+                self._player_available = False
+            self._player_checked_at = now
+        return self._player_available
+    
+    def player_url(self, project_hash, mode=None):
+        """
+        本地播放器页面的地址
+        
+        Args:
+            project_hash: 项目哈希
+            mode: "turbowarp"或"local"，默认在线时使用TurboWarp，离线时使用本地预览
+            
+        Returns:
+            播放器URL
+        """
+        url = f"{self.player_base_url}/player?project={project_hash}"
+        return f"{url}&mode={mode}" if mode else url
         
     def embed_project(self, project_json, height=500, project_id=None, mode="play", show_controls=True):
         """
@@ -30,7 +72,7 @@ class ScratchPlayer:
         Args:
             project_json: Scratch项目JSON数据或路径
             height: iframe高度
-            project_id: 项目ID（可选）
+            project_id: 项目ID（可选），默认使用项目内容哈希
             mode: 模式，"play"或"edit"
             show_controls: 是否显示控制按钮
             
@@ -44,19 +86,12 @@ class ScratchPlayer:
         if not project_data:
             return st.error("无法加载项目数据")
         
-        # 生成一个唯一的项目ID
+        # 项目只按内容哈希保存一次
+        project_hash = self.project_store.put(project_data)
         if not project_id:
-            project_id = str(uuid.uuid4())[:8]
-        
-        # 将项目保存到临时文件
-        temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        json_path = os.path.join(temp_dir, f"project_{project_id}.json")
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(project_data, f)
+            project_id = project_hash
+        project_bytes = self.project_store.get_bytes(project_hash)
             
-        # 使用st.components.v1.iframe而不是html
         st.markdown("### Scratch项目播放器")
         
         # 使用官方推荐的嵌入方式
@@ -70,73 +105,46 @@ class ScratchPlayer:
             
             # 提供加载说明
             st.info("点击'文件' → '从您的电脑加载'，然后上传以下项目文件")
-            with open(json_path, "r") as f:
-                st.download_button(
-                    label="下载项目文件以加载到编辑器",
-                    data=f,
-                    file_name=f"scratch_project_{project_id}.json",
-                    mime="application/json"
-                )
+            st.download_button(
+                label="下载项目文件以加载到编辑器",
+                data=project_bytes,
+                file_name=f"scratch_project_{project_id}.json",
+                mime="application/json"
+            )
                 
-        else:
-            # 生成一个简单的HTML页面，包含Scratch项目
-            html_path = os.path.join(temp_dir, f"scratch_player_{project_id}.html")
-            
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="UTF-8">
-                    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                    <title>Scratch项目播放器</title>
-                    <style>
-                        body {{ margin: 0; padding: 0; overflow: hidden; }}
-                        iframe {{ border: none; width: 100%; height: 100vh; }}
-                    </style>
-                </head>
-                <body>
-                    <iframe 
-                        src="https://turbowarp.org/embed?width=480&height=360&autoplay=true"
-                        width="482" 
-                        height="412"
-                        allowtransparency="true" 
-                        frameborder="0" 
-                        scrolling="no" 
-                        allowfullscreen
-                    ></iframe>
-                    <script>
-                        // 等待iframe加载完成
-                        document.querySelector('iframe').onload = function() {{
-                            setTimeout(function() {{
-                                // 将项目数据作为文件导入
-                                const projectData = {json.dumps(project_data)};
-                                // 在这里可以将数据发送到iframe
-                                // 但目前TurboWarp嵌入不支持直接通过JS注入项目数据
-                            }}, 1000);
-                        }};
-                    </script>
-                </body>
-                </html>
-                """)
-            
-            # 显示TurboWarp嵌入链接
-            st.info("由于浏览器安全限制，我们无法直接嵌入项目。请使用下面的方法之一运行项目:")
+        elif not self.player_available():
+            # API服务未启动时无法使用本地播放器，提供项目文件和在线打开方式
+            st.info(f"本地播放器不可用（{self.player_base_url} 无法访问，可用 `python run.py --api` 启动API服务）。"
+                    "请使用下面的方法之一运行项目:")
             
             # 提供选项1：下载并在TurboWarp中打开
             st.markdown("**选项1: 在TurboWarp中打开项目**")
-            with open(json_path, "r") as f:
+            st.download_button(
+                label="下载项目文件",
+                data=project_bytes,
+                file_name=f"scratch_project_{project_id}.json",
+                mime="application/json"
+            )
+            st.markdown(f"[在TurboWarp中打开]({self.turbowarp_url}/editor)")
+            
+            # 提供选项2：创建一个链接到官方Scratch
+            st.markdown("**选项2: 使用演示视频**")
+            st.video("https://www.youtube.com/watch?v=ypeFpU_V_AA")
+                
+        else:
+            # 播放器外壳由API服务提供并被浏览器缓存，项目按哈希加载，不再为每次渲染写HTML文件
+            st.components.v1.iframe(
+                src=self.player_url(project_hash),
+                height=self.iframe_height,
+                scrolling=False
+            )
+            if show_controls:
                 st.download_button(
                     label="下载项目文件",
-                    data=f,
+                    data=project_bytes,
                     file_name=f"scratch_project_{project_id}.json",
                     mime="application/json"
                 )
-            st.markdown(f"[在TurboWarp中打开](https://turbowarp.org/editor)")
-            
-            # 提供选项2：创建一个链接到官方Scratch
-            st.markdown("**选项2: 使用演示视频**")
-            st.video("https://www.youtube.com/watch?v=ypeFpU_V_AA")
         
         return project_id
     
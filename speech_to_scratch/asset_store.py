@@ -0,0 +1,314 @@
+"""
+Scratch资源存储模块
+
+造型和声音按内容的md5存储，与Scratch自身的 assetId / md5ext 规则一致：
+相同的字节只保存一份，项目中只引用哈希。打包.sb3时每个不同的资源只写入一次。
+内置一套默认SVG造型，生成的项目不再依赖Scratch资源服务器上的固定assetId。
+内置资源常驻内存；其它资源的内存和磁盘占用超过上限时按最近使用时间淘汰。
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 默认磁盘目录，保存运行时新增的资源
+DEFAULT_ASSET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp", "assets")
+DEFAULT_MAX_DISK_BYTES = int(os.environ.get("ASSET_STORE_MAX_MB", "256")) * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+# 内置默认资源
+DEFAULT_BACKDROP_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="480" height="360" viewBox="0 0 480 360">'
+    '<rect width="480" height="360" fill="#ffffff"/></svg>'
+).encode("utf-8")
+
+DEFAULT_COSTUME_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="96" height="100" viewBox="0 0 96 100">'
+    '<circle cx="48" cy="50" r="44" fill="#ffab19" stroke="#cf8b17" stroke-width="4"/>'
+    '<circle cx="34" cy="42" r="7" fill="#ffffff"/><circle cx="62" cy="42" r="7" fill="#ffffff"/>'
+    '<circle cx="35" cy="43" r="3" fill="#000000"/><circle cx="63" cy="43" r="3" fill="#000000"/>'
+    '<path d="M30 64 Q48 80 66 64" fill="none" stroke="#000000" stroke-width="4" stroke-linecap="round"/>'
+    '</svg>'
+).encode("utf-8")
+
+
+def md5_hex(data):
+    """计算资源内容的md5（即Scratch的assetId）"""
+    return hashlib.md5(data).hexdigest()
+
+
+class AssetStore:
+    """按md5去重的资源存储（内存 + 可选磁盘）"""
+
+    def __init__(self, asset_dir=DEFAULT_ASSET_DIR, max_asset_sets=1024, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        初始化资源存储
+
+        Args:
+            asset_dir (str): 磁盘目录，None表示只保存在内存中
+            max_asset_sets (int): 缓存的项目资源清单数量
+            max_memory_bytes (int): 内存中缓存的资源总大小上限（不含常驻资源）
+            max_disk_bytes (int): 磁盘上资源的总大小上限
+        """
+        self.asset_dir = asset_dir
+        self.max_asset_sets = max_asset_sets
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        # 内置资源和只在内存中的资源，不参与淘汰
+        self._pinned = {}
+        # md5ext -> 资源内容，按最近使用时间排序（最旧的在前）
+        self._assets = OrderedDict()
+        self._memory_bytes = 0
+        # md5ext -> 磁盘文件大小，按最近使用时间排序
+        self._disk_entries = OrderedDict()
+        self._disk_bytes = 0
+        self.evictions = 0
+        self._asset_sets = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_index()
+
+        self.default_backdrop = self.put(DEFAULT_BACKDROP_SVG, "svg", persist=False)
+        self.default_costume = self.put(DEFAULT_COSTUME_SVG, "svg", persist=False)
+
+    def put(self, data, data_format, persist=True):
+        """
+        保存资源
+
+        Args:
+            data (bytes): 资源内容
+            data_format (str): 文件格式，如"svg"、"png"、"wav"
+            persist (bool): 是否同时写入磁盘；不写入磁盘的资源常驻内存
+
+        Returns:
+            str: md5ext，如 "<md5>.svg"
+        """
+        md5ext = f"{md5_hex(data)}.{data_format}"
+        with self._lock:
+            if md5ext in self._pinned:
+                return md5ext
+            if md5ext in self._assets:
+                self._assets.move_to_end(md5ext)
+                return md5ext
+            if not persist or not self.asset_dir:
+                self._pinned[md5ext] = data
+                return md5ext
+            self._remember(md5ext, data)
+
+        path = os.path.join(self.asset_dir, md5ext)
+        if not os.path.exists(path):
+            try:
+                os.makedirs(self.asset_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=self.asset_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except Exception as e:
+                logger.error(f"写入资源失败: {str(e)}")
+                return md5ext
+        self._track(md5ext, len(data))
+        return md5ext
+
+    def _load_index(self):
+        """扫描磁盘目录，按修改时间（即最近使用时间）重建索引"""
+        if not self.asset_dir:
+            return
+        items = []
+        try:
+            with os.scandir(self.asset_dir) as it:
+                for item in it:
+                    if not item.name.endswith(".tmp") and item.is_file():
+                        stat = item.stat()
+                        items.append((stat.st_mtime_ns, item.name, stat.st_size))
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"读取资源目录失败: {str(e)}")
+            return
+        for _, md5ext, size in sorted(items):
+            self._disk_entries[md5ext] = size
+            self._disk_bytes += size
+
+    def _remember(self, md5ext, data):
+        """写入内存缓存并按大小淘汰最久未使用的资源（调用方需持有锁）"""
+        self._memory_bytes += len(data) - len(self._assets.pop(md5ext, b""))
+        self._assets[md5ext] = data
+        while self._memory_bytes > self.max_memory_bytes and len(self._assets) > 1:
+            _, old = self._assets.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _track(self, md5ext, size):
+        """更新资源在磁盘索引中的大小和最近使用时间，超出上限时淘汰最久未使用的资源"""
+        with self._lock:
+            self._disk_bytes += size - self._disk_entries.pop(md5ext, 0)
+            self._disk_entries[md5ext] = size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk_entries) > 1:
+                old, old_size = self._disk_entries.popitem(last=False)
+                self._disk_bytes -= old_size
+                self.evictions += 1
+                data = self._assets.pop(old, None)
+                if data is not None:
+                    self._memory_bytes -= len(data)
+                try:
+                    os.remove(os.path.join(self.asset_dir, old))
+                except OSError:
+                    pass
+
+    def get(self, md5ext):
+        """
+        读取资源
+
+        Args:
+            md5ext (str): 资源文件名
+
+        Returns:
+            bytes: 资源内容，不存在时为None
+        """
+        with self._lock:
+            data = self._pinned.get(md5ext)
+            if data is None:
+                data = self._assets.get(md5ext)
+                if data is not None:
+                    self._assets.move_to_end(md5ext)
+                    if md5ext in self._disk_entries:
+                        self._disk_entries.move_to_end(md5ext)
+        if data is not None or not self.asset_dir:
+            return data
+
+        md5ext = os.path.basename(md5ext)
+        path = os.path.join(self.asset_dir, md5ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 更新修改时间，作为其它进程重建索引时的最近使用时间
+            os.utime(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._remember(md5ext, data)
+        self._track(md5ext, len(data))
+        return data
+
+    def contains(self, md5ext):
+        """
+        检查资源是否存在（不读取内容）
+
+        Args:
+            md5ext (str): 资源文件名
+
+        Returns:
+            bool: 是否存在
+        """
+        with self._lock:
+            if md5ext in self._pinned or md5ext in self._assets:
+                return True
+        return bool(self.asset_dir) and os.path.exists(os.path.join(self.asset_dir, os.path.basename(md5ext)))
+
+    def __contains__(self, md5ext):
+        return self.get(md5ext) is not None
+
+    def costume(self, md5ext, name, rotation_center=None, bitmap_resolution=None):
+        """
+        生成引用某个资源的造型描述
+
+        Args:
+            md5ext (str): 资源文件名
+            name (str): 造型名称
+            rotation_center (tuple): 旋转中心，默认为SVG中心
+            bitmap_resolution (int): 位图分辨率
+
+        Returns:
+            dict: Scratch造型
+        """
+        asset_id, _, data_format = md5ext.partition(".")
+        if rotation_center is None:
+            rotation_center = (240, 180) if md5ext == self.default_backdrop else (48, 50)
+        costume = {
+            "assetId": asset_id,
+            "name": name,
+            "md5ext": md5ext,
+            "dataFormat": data_format,
+            "rotationCenterX": rotation_center[0],
+            "rotationCenterY": rotation_center[1],
+        }
+        if bitmap_resolution is not None:
+            costume["bitmapResolution"] = bitmap_resolution
+        return costume
+
+    def asset_set(self, project, key=None):
+        """
+        获取项目引用的资源清单（去重，保持出现顺序）
+
+        提供key（如项目内容哈希）时清单会被缓存，重复导出同一项目时无需再次遍历。
+
+        Args:
+            project (dict): Scratch项目
+            key (str): 缓存键
+
+        Returns:
+            tuple: md5ext 列表
+        """
+        if key is not None:
+            with self._lock:
+                cached = self._asset_sets.get(key)
+                if cached is not None:
+                    self._asset_sets.move_to_end(key)
+                    return cached
+
+        names = OrderedDict()
+        for target in project.get("targets", []):
+            for asset in target.get("costumes", []) + target.get("sounds", []):
+                md5ext = asset.get("md5ext") or f"{asset.get('assetId')}.{asset.get('dataFormat')}"
+                names[md5ext] = None
+        asset_set = tuple(names)
+
+        if key is not None:
+            with self._lock:
+                self._asset_sets[key] = asset_set
+                while len(self._asset_sets) > self.max_asset_sets:
+                    self._asset_sets.popitem(last=False)
+        return asset_set
+
+    def stats(self):
+        """
+        获取存储状态
+
+        Returns:
+            dict: 内存中的资源数、字节数，缓存的清单数和磁盘占用
+        """
+        with self._lock:
+            return {
+                "assets": len(self._pinned) + len(self._assets),
+                "bytes": sum(len(data) for data in self._pinned.values()) + self._memory_bytes,
+                "asset_sets": len(self._asset_sets),
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "evictions": self.evictions,
+            }
+
+
+# 进程级默认资源存储
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_asset_store():
+    """
+    获取进程级默认资源存储
+
+    Returns:
+        AssetStore: 默认资源存储
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = AssetStore()
+        return _default_store
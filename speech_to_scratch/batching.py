@@ -0,0 +1,249 @@
+"""
+LLM微批处理调度模块
+
+把同一时间窗口内的并发提示词合并成一次 ``model.generate`` 调用，
+再把每条结果分发回各自的调用方，提升多人同时提交时的吞吐量。
+"""
+
+import logging
+import queue
+import threading
+import time
+
+try:
+    from speech_to_scratch.decoding import json_generation_kwargs, count_generated_tokens, log_token_savings
+except ImportError:
+    from decoding import json_generation_kwargs, count_generated_tokens, log_token_savings
+
+try:
+    from speech_to_scratch.prefix_cache import build_generation_inputs
+except ImportError:
+    from prefix_cache import build_generation_inputs
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 默认生成参数
+DEFAULT_GENERATION_KWARGS = {
+    "max_new_tokens": 1024,
+    "do_sample": True,
+    "temperature": 0.7,
+    "top_p": 0.9,
+}
+
+
+class _GenerationRequest:
+    """批处理队列中的单个请求"""
+
+    __slots__ = ("prefix", "prompt", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, prompt, prefix=""):
+        self.prefix = prefix
+        self.prompt = prompt
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GenerationBatcher:
+    """收集并发提示词并批量生成的调度器"""
+
+    def __init__(self, model_handle, max_batch_size=8, max_wait_ms=50, generation_kwargs=None,
+                 json_mode=True, constrain_schema=True, use_prefix_cache=True):
+        """
+        初始化批处理调度器
+
+        Args:
+            model_handle (ModelHandle): 共享模型句柄
+            max_batch_size (int): 单批最大请求数
+            max_wait_ms (float): 收到第一个请求后最多等待多少毫秒以凑批
+            generation_kwargs (dict): 传给 model.generate 的参数
+            json_mode (bool): 顶层JSON对象闭合后是否立即停止生成
+            constrain_schema (bool): JSON模式下是否把键约束在项目描述模式之内
+            use_prefix_cache (bool): 同批提示词共享前缀时是否复用前缀KV缓存
+        """
+        self.model_handle = model_handle
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.generation_kwargs = dict(DEFAULT_GENERATION_KWARGS)
+        if generation_kwargs:
+            self.generation_kwargs.update(generation_kwargs)
+        self.json_mode = json_mode
+        self.constrain_schema = constrain_schema
+        self.use_prefix_cache = use_prefix_cache
+        # 凑批参数，get_batcher 据此提示与后续调用方的配置不一致
+        self.batch_config = (self.max_batch_size, self.max_wait_ms)
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batch_stats = []
+        self.max_stats_history = 100
+
+        self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt, prefix="", timeout=None):
+        """
+        提交提示词并等待生成结果
+
+        Args:
+            prompt (str): 提示词（给出prefix时为前缀之后的部分）
+            prefix (str): 可复用KV缓存的固定前缀
+            timeout (float): 最长等待秒数，None表示一直等待
+
+        Returns:
+            str: 模型新生成的文本（不含提示词）
+        """
+        request = _GenerationRequest(prompt, prefix)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("等待批量生成结果超时")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect_batch(self):
+        """阻塞等待第一个请求，然后在等待窗口内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """后台工作线程主循环"""
+        while True:
+            batch = self._collect_batch()
+            try:
+                self._generate_batch(batch)
+            except Exception as e:
+                logger.error(f"批量生成失败: {str(e)}")
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+    def _generate_batch(self, batch):
+        """对一批请求执行一次生成"""
+        tokenizer, model = self.model_handle.acquire()
+        if model is None or tokenizer is None:
+            raise RuntimeError("语言模型不可用")
+
+        # 解码器模型需要左侧填充，保证每条序列的生成位置对齐
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+        start_time = time.perf_counter()
+        prompts = [(request.prefix, request.prompt) for request in batch]
+        inputs = build_generation_inputs(self.model_handle, tokenizer, model, prompts, self.use_prefix_cache)
+
+        input_length = inputs["input_ids"].shape[1]
+        generation_kwargs = dict(self.generation_kwargs)
+        if self.json_mode:
+            generation_kwargs.update(json_generation_kwargs(tokenizer, input_length, len(batch), self.constrain_schema))
+
+        with self.model_handle.generate_lock:
+            outputs = model.generate(
+                **inputs,
+                pad_token_id=tokenizer.pad_token_id,
+                **generation_kwargs
+            )
+
+        # 只解码新生成的部分
+        new_tokens = outputs[:, input_length:]
+        generated_tokens = 0
+        saved_tokens = 0
+        max_new_tokens = generation_kwargs.get("max_new_tokens", 0)
+        for request, tokens in zip(batch, new_tokens):
+            request.result = tokenizer.decode(tokens, skip_special_tokens=True)
+            token_count = count_generated_tokens(tokens, tokenizer)
+            generated_tokens += token_count
+            if self.json_mode and max_new_tokens:
+                saved_tokens += log_token_savings(token_count, max_new_tokens)
+
+        self.model_handle.record_generation(generated_tokens, time.perf_counter() - start_time)
+        self._record_stats(batch, start_time, generated_tokens, saved_tokens)
+
+    def _record_stats(self, batch, start_time, generated_tokens, saved_tokens=0):
+        """记录并输出本批次的吞吐量和延迟"""
+        finished_at = time.perf_counter()
+        generate_seconds = finished_at - start_time
+        latencies = [finished_at - request.enqueued_at for request in batch]
+        stats = {
+            "batch_size": len(batch),
+            "generate_seconds": round(generate_seconds, 3),
+            "generated_tokens": generated_tokens,
+            "saved_tokens": saved_tokens,
+            "tokens_per_second": round(generated_tokens / generate_seconds, 2) if generate_seconds > 0 else None,
+            "requests_per_second": round(len(batch) / generate_seconds, 3) if generate_seconds > 0 else None,
+            "max_queue_wait_seconds": round(max(start_time - r.enqueued_at for r in batch), 3),
+            "mean_latency_seconds": round(sum(latencies) / len(latencies), 3),
+            "max_latency_seconds": round(max(latencies), 3),
+        }
+        with self._stats_lock:
+            self.batch_stats.append(stats)
+            del self.batch_stats[:-self.max_stats_history]
+
+        logger.info(
+            f"批量生成完成: {stats['batch_size']} 个请求, 耗时 {stats['generate_seconds']} 秒, "
+            f"{stats['tokens_per_second']} tokens/秒, 平均延迟 {stats['mean_latency_seconds']} 秒"
+        )
+
+    def stats(self):
+        """
+        获取最近批次的统计信息
+
+        Returns:
+            list: 每个批次的统计字典
+        """
+        with self._stats_lock:
+            return list(self.batch_stats)
+
+
+# 每个模型句柄和解码设置共享一个调度器
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_handle, max_batch_size=8, max_wait_ms=50, json_mode=True, constrain_schema=True,
+                use_prefix_cache=True):
+    """
+    获取模型句柄对应的共享批处理调度器
+
+    同一个模型句柄和解码设置（json_mode、constrain_schema、use_prefix_cache）只会创建一个调度器；
+    凑批参数沿用首次创建时的配置，与之不一致时输出警告。不同解码设置的调度器通过模型句柄的
+    generate_lock 依次生成。
+
+    Args:
+        model_handle (ModelHandle): 共享模型句柄
+        max_batch_size (int): 单批最大请求数
+        max_wait_ms (float): 凑批等待窗口（毫秒）
+        json_mode (bool): 顶层JSON对象闭合后是否立即停止生成
+        constrain_schema (bool): JSON模式下是否启用键约束
+        use_prefix_cache (bool): 是否复用前缀KV缓存
+
+    Returns:
+        GenerationBatcher: 批处理调度器
+    """
+    key = (model_handle.key, bool(json_mode), bool(constrain_schema), bool(use_prefix_cache))
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None or batcher.model_handle is not model_handle:
+            batcher = GenerationBatcher(model_handle, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                        json_mode=json_mode, constrain_schema=constrain_schema,
+                                        use_prefix_cache=use_prefix_cache)
+            _batchers[key] = batcher
+        elif batcher.batch_config != (max(1, int(max_batch_size)), max(0.0, float(max_wait_ms))):
+            logger.warning(f"批处理调度器已按 max_batch_size={batcher.max_batch_size}, max_wait_ms={batcher.max_wait_ms} "
+                           f"创建，忽略本次的 max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}")
+        return batcher
@@ -0,0 +1,644 @@
+"""
+脚本短语到Scratch积木的编译器
+
+把模板和LLM输出中的脚本短语（如 "当按下[空格键]，改变y坐标(10)"）
+编译为完整的Scratch 3积木链。所有短语模式在模块加载时合并成一个预编译的正则自动机，
+每条脚本只需从左到右扫描一遍，耗时与脚本长度成线性关系。
+
+支持的中英文短语覆盖事件、运动、外观、声音、控制、侦测和广播积木。
+"""
+
+import hashlib
+import logging
+import re
+import time
+
+try:
+    from speech_to_scratch.ir import ScriptIR, StatementIR, parse_script
+except ImportError:
+    from ir import ScriptIR, StatementIR, parse_script
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 短语中的参数：[文本] 与 (数字)
+_T = r"\s*[\[【]([^\[\]【】]*)[\]】]\s*"
+_N = r"\s*[\(（]?\s*(-?\d+(?:\.\d+)?)\s*[\)）]?\s*"
+# C型积木的可选左括号，出现时其后是子脚本
+_OPEN = r"\s*([\[【])?"
+
+# 事件（帽子积木）模式: (类型, 正则)
+HAT_PATTERNS = [
+    ("flag", r"当\s*(?:小?绿旗)\s*被\s*点击\s*时?"),
+    ("flag", r"当\s*点击\s*小?绿旗\s*时?"),
+    ("flag", r"when\s+(?:green\s+)?flag\s+clicked"),
+    ("key", r"当\s*按下" + _T + r"键?\s*时?"),
+    ("key", r"when" + _T + r"key\s+pressed"),
+    ("clicked", r"当\s*(?:角色|精灵)?\s*被\s*点击\s*时?"),
+    ("clicked", r"当\s*点击\s*(?:角色|精灵)\s*时?"),
+    ("clicked", r"when\s+this\s+sprite\s+clicked"),
+    ("receive", r"当\s*(?:接收到|收到)" + _T + r"(?:消息)?\s*时?"),
+    ("receive", r"when\s+I\s+receive" + _T),
+    ("backdrop", r"当\s*背景\s*切换到" + _T + r"时?"),
+    ("backdrop", r"when\s+backdrop\s+switches\s+to" + _T),
+    ("touching", r"当\s*碰到" + _T + r"时?"),
+    ("touching", r"when\s+touching" + _T),
+]
+
+# 语句模式: (类型, 正则)，按优先级排列，先匹配的先生效
+STATEMENT_PATTERNS = [
+    ("gotoxy", r"(?:移到|移动到|go\s+to)\s*x\s*[:：]" + _N + r"[,，]?\s*y\s*[:：]" + _N),
+    ("setx", r"(?:将\s*)?x坐标设为" + _N),
+    ("setx", r"set\s+x\s+to" + _N),
+    ("sety", r"(?:将\s*)?y坐标设为" + _N),
+    ("sety", r"set\s+y\s+to" + _N),
+    ("changex_neg", r"(?:将\s*)?x坐标减少" + _N),
+    ("changex", r"(?:将\s*)?x坐标增加" + _N),
+    ("changex", r"(?:改变|将)\s*x坐标(?:增加)?" + _N),
+    ("changex", r"change\s+x\s+by" + _N),
+    ("changey_neg", r"(?:将\s*)?y坐标减少" + _N),
+    ("changey", r"(?:将\s*)?y坐标增加" + _N),
+    ("changey", r"(?:改变|将)\s*y坐标(?:增加)?" + _N),
+    ("changey", r"change\s+y\s+by" + _N),
+    ("bounce", r"(?:如果)?碰到边缘就反弹"),
+    ("bounce", r"if\s+on\s+edge,?\s*bounce"),
+    ("movesteps", r"(?:移动|move)" + _N + r"(?:步|steps?)?"),
+    ("turnright", r"(?:向?右转|turn\s+right)" + _N + r"(?:度|degrees)?"),
+    ("turnleft", r"(?:向?左转|turn\s+left)" + _N + r"(?:度|degrees)?"),
+    ("pointdir", r"(?:面向|point\s+in\s+direction)" + _N + r"(?:方向|度)?"),
+    ("sayforsecs", r"(?:说|say)" + _T + r"(?:for)?" + _N + r"(?:秒|seconds?)"),
+    ("say", r"(?:说|say)" + _T),
+    ("thinkforsecs", r"(?:思考|think)" + _T + r"(?:for)?" + _N + r"(?:秒|seconds?)"),
+    ("think", r"(?:思考|think)" + _T),
+    ("nextcostume", r"(?:下一个造型|next\s+costume)"),
+    ("switchcostume", r"(?:换成|切换造型为|切换到造型|switch\s+costume\s+to)" + _T + r"(?:造型)?"),
+    ("changesize", r"(?:将?大小增加|change\s+size\s+by)" + _N),
+    ("setsize", r"(?:将?大小设为|set\s+size\s+to)" + _N + r"%?"),
+    ("show", r"(?:显示|show)"),
+    ("hide", r"(?:隐藏|hide)"),
+    ("wait", r"(?:等待|wait)" + _N + r"(?:秒|seconds?)?\s*后?"),
+    ("repeat", r"(?:重复执行|重复|repeat)" + _N + r"次?" + _OPEN),
+    ("forever", r"(?:重复执行|一直重复|永远重复|forever)" + _OPEN),
+    ("if_touching", r"如果\s*碰到" + _T + r"(?:那么|就|则)?" + _OPEN),
+    ("if_touching", r"if\s+touching" + _T + r"then" + _OPEN),
+    ("if_key", r"如果\s*按下" + _T + r"键?\s*(?:那么|就|则)?" + _OPEN),
+    ("if_key", r"if\s+key" + _T + r"pressed\s+then" + _OPEN),
+    ("broadcastandwait", r"(?:广播|broadcast)" + _T + r"(?:并等待|and\s+wait)"),
+    ("broadcast", r"(?:广播|broadcast)" + _T),
+    ("playuntildone", r"播放声音" + _T + r"(?:直到|等待)播放完毕"),
+    ("playuntildone", r"play\s+sound" + _T + r"until\s+done"),
+    ("startsound", r"(?:播放声音|start\s+sound|play\s+sound)" + _T),
+    ("stopall", r"(?:停止全部|停止所有|全部停止|stop\s+all)"),
+]
+
+# 可以带子脚本的C型积木
+C_BLOCK_KINDS = {"repeat", "forever", "if_touching", "if_key"}
+
+
+def _compile_alternation(patterns):
+    """把模式列表合并成一个正则，返回 (正则, 分组名->(类型, 单独编译的正则))"""
+    parts = []
+    lookup = {}
+    for i, (kind, pattern) in enumerate(patterns):
+        name = f"p{i}"
+        parts.append(f"(?P<{name}>{pattern})")
+        lookup[name] = (kind, re.compile(pattern, re.IGNORECASE))
+    return re.compile("|".join(parts), re.IGNORECASE), lookup
+
+
+_HAT_RE, _HAT_LOOKUP = _compile_alternation(HAT_PATTERNS)
+_STATEMENT_RE, _STATEMENT_LOOKUP = _compile_alternation(STATEMENT_PATTERNS)
+_SEPARATOR_RE = re.compile(r"(?:[\s，,、；;。]|然后|接着|and\s+then|then)+", re.IGNORECASE)
+
+# 按键名称映射到Scratch的按键选项
+KEY_NAMES = {
+    "空格": "space", "空格键": "space", "space": "space",
+    "上": "up arrow", "上箭头": "up arrow", "上移键": "up arrow", "up": "up arrow", "up arrow": "up arrow",
+    "下": "down arrow", "下箭头": "down arrow", "下移键": "down arrow", "down": "down arrow", "down arrow": "down arrow",
+    "左": "left arrow", "左箭头": "left arrow", "左移键": "left arrow", "left": "left arrow", "left arrow": "left arrow",
+    "右": "right arrow", "右箭头": "right arrow", "右移键": "right arrow", "right": "right arrow", "right arrow": "right arrow",
+    "任意": "any", "任意键": "any", "any": "any",
+}
+
+# 侦测对象映射到Scratch的特殊菜单值
+TOUCHING_OBJECTS = {
+    "边缘": "_edge_", "舞台边缘": "_edge_", "edge": "_edge_",
+    "鼠标": "_mouse_", "鼠标指针": "_mouse_", "mouse": "_mouse_", "mouse-pointer": "_mouse_",
+}
+
+
+def broadcast_id(name):
+    """根据广播名生成稳定的广播ID，使各角色引用同一条广播"""
+    return "broadcast_" + hashlib.md5(name.encode("utf-8")).hexdigest()[:12]
+
+
+def _key_option(name):
+    name = name.strip()
+    return KEY_NAMES.get(name.lower(), KEY_NAMES.get(name, name.lower()))
+
+
+def _touching_option(name):
+    name = name.strip()
+    return TOUCHING_OBJECTS.get(name.lower(), TOUCHING_OBJECTS.get(name, name))
+
+
+def _number(value):
+    """把数字字符串规范化为Scratch输入中的文本"""
+    return value[:-2] if value.endswith(".0") else value
+
+
+def _negate(value):
+    return value[1:] if value.startswith("-") else "-" + value
+
+
+class ScriptCompiler:
+    """把一个角色的脚本短语列表编译为Scratch积木字典"""
+
+    def __init__(self, id_prefix="block_"):
+        """
+        初始化编译器
+
+        Args:
+            id_prefix (str): 积木ID前缀
+        """
+        self.id_prefix = id_prefix
+        self.blocks = {}
+        self.broadcasts = {}
+        self.unknown_phrases = []
+        self._counter = 0
+        self._next_y = 0
+
+    # ---------- 解析 ----------
+
+    def parse(self, script):
+        """
+        解析一条脚本
+
+        Args:
+            script (str): 脚本短语
+
+        Returns:
+            ScriptIR: 帽子类型、帽子参数和语句序列
+        """
+        unknown_before = len(self.unknown_phrases)
+        pos = self._skip_separators(script, 0)
+        hat_kind, hat_args = "flag", ()
+        match = _HAT_RE.match(script, pos)
+        if match:
+            hat_kind, hat_regex = _HAT_LOOKUP[match.lastgroup]
+            hat_args = hat_regex.match(script, pos).groups()
+            pos = match.end()
+        statements, _ = self._parse_sequence(script, pos, None)
+        return ScriptIR(script, hat_kind, hat_args, statements, tuple(self.unknown_phrases[unknown_before:]))
+
+    def _skip_separators(self, text, pos):
+        match = _SEPARATOR_RE.match(text, pos)
+        return match.end() if match else pos
+
+    def _parse_sequence(self, text, pos, closing):
+        """
+        解析语句序列，直到文本结束或遇到闭合括号
+
+        Returns:
+            tuple: (StatementIR元组, 结束位置)
+        """
+        statements = []
+        length = len(text)
+        while True:
+            pos = self._skip_separators(text, pos)
+            if pos >= length:
+                return tuple(statements), pos
+            if closing and text[pos] in "]】":
+                return tuple(statements), pos + 1
+
+            match = _STATEMENT_RE.match(text, pos)
+            if not match:
+                pos = self._skip_unknown(text, pos)
+                continue
+
+            kind, regex = _STATEMENT_LOOKUP[match.lastgroup]
+            groups = regex.match(text, pos).groups()
+            pos = match.end()
+            substack = None
+            if kind in C_BLOCK_KINDS:
+                opened = groups[-1]
+                groups = groups[:-1]
+                if opened:
+                    substack, pos = self._parse_sequence(text, pos, closing=True)
+                else:
+                    # 没有括号时，本层剩余的语句都属于子脚本
+                    substack, pos = self._parse_sequence(text, pos, closing)
+                    statements.append(StatementIR(kind, groups, substack))
+                    return tuple(statements), pos
+            statements.append(StatementIR(kind, groups, substack))
+
+    def _skip_unknown(self, text, pos):
+        """跳过无法识别的短语，直到同一层级的下一个分隔符"""
+        start = pos
+        depth = 0
+        while pos < len(text):
+            c = text[pos]
+            if c in "[【":
+                depth += 1
+            elif c in "]】":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0 and c in "，,、；;。":
+                break
+            pos += 1
+        if pos == start:
+            pos += 1
+        phrase = text[start:pos].strip()
+        if phrase:
+            self.unknown_phrases.append(phrase)
+        return pos
+
+    # ---------- 生成积木 ----------
+
+    def compile(self, scripts):
+        """
+        编译角色的所有脚本
+
+        Args:
+            scripts (list): 脚本短语或已解析的ScriptIR列表
+
+        Returns:
+            dict: Scratch积木字典
+        """
+        for script in scripts:
+            if not isinstance(script, ScriptIR):
+                script = parse_script(script if isinstance(script, str) else str(script))
+            self.unknown_phrases.extend(script.unknown_phrases)
+            count_before = self._counter
+            self._emit_script(script, 0, self._next_y)
+            self._next_y += 100 + (self._counter - count_before) * 24
+        return self.blocks
+
+    def _new_block(self, opcode, parent, inputs=None, fields=None, shadow=False):
+        block_id = f"{self.id_prefix}{self._counter}"
+        self._counter += 1
+        self.blocks[block_id] = {
+            "opcode": opcode,
+            "next": None,
+            "parent": parent,
+            "inputs": inputs if inputs is not None else {},
+            "fields": fields if fields is not None else {},
+            "shadow": shadow,
+            "topLevel": False,
+        }
+        return block_id
+
+    def _menu(self, opcode, field, value, parent):
+        """创建下拉菜单影子积木"""
+        return self._new_block(opcode, parent, fields={field: [value, None]}, shadow=True)
+
+    def _broadcast(self, name):
+        name = name.strip() or "消息1"
+        self.broadcasts[name] = broadcast_id(name)
+        return name, self.broadcasts[name]
+
+    def _emit_script(self, script, x, y):
+        """生成一条以帽子积木开头的脚本"""
+        hat_kind, hat_args, statements = script.hat, script.hat_args, script.statements
+        fields = {}
+        opcode = "event_whenflagclicked"
+        if hat_kind == "key":
+            opcode = "event_whenkeypressed"
+            fields = {"KEY_OPTION": [_key_option(hat_args[0]), None]}
+        elif hat_kind == "clicked":
+            opcode = "event_whenthisspriteclicked"
+        elif hat_kind == "receive":
+            opcode = "event_whenbroadcastreceived"
+            name, bid = self._broadcast(hat_args[0])
+            fields = {"BROADCAST_OPTION": [name, bid]}
+        elif hat_kind == "backdrop":
+            opcode = "event_whenbackdropswitchesto"
+            fields = {"BACKDROP": [hat_args[0].strip(), None]}
+        elif hat_kind == "touching":
+            # Scratch没有“碰到”帽子积木：绿旗 + 重复执行[等待直到碰到, 脚本, 等待直到不再碰到]
+            target = hat_args[0]
+            statements = (StatementIR("forever", (), (StatementIR("wait_touching", (target,)),) + statements +
+                                      (StatementIR("wait_not_touching", (target,)),)),)
+
+        hat_id = self._new_block(opcode, None, fields=fields)
+        hat = self.blocks[hat_id]
+        hat.update(topLevel=True, x=x, y=y)
+        hat["next"] = self._emit_sequence(statements, hat_id)
+        return hat_id
+
+    def _emit_sequence(self, statements, parent):
+        """生成语句序列，返回第一个积木的ID"""
+        first_id = None
+        previous_id = None
+        for statement in statements:
+            block_id = self._emit_statement(statement.kind, statement.args, statement.substack, previous_id or parent)
+            if previous_id is None:
+                first_id = block_id
+            else:
+                self.blocks[previous_id]["next"] = block_id
+            previous_id = block_id
+        return first_id
+
+    def _emit_statement(self, kind, args, substack, parent):
+        """生成单个语句积木"""
+        builder = getattr(self, f"_build_{kind}")
+        block_id = builder(parent, *args)
+        if substack is not None:
+            first_id = self._emit_sequence(substack, block_id)
+            if first_id is not None:
+                self.blocks[block_id]["inputs"]["SUBSTACK"] = [2, first_id]
+        return block_id
+
+    # 各类积木的构建函数
+
+    def _simple(self, opcode, parent, **inputs):
+        return self._new_block(opcode, parent, inputs=dict(inputs))
+
+    def _build_gotoxy(self, parent, x, y):
+        return self._simple("motion_gotoxy", parent, X=_num(x), Y=_num(y))
+
+    def _build_setx(self, parent, x):
+        return self._simple("motion_setx", parent, X=_num(x))
+
+    def _build_sety(self, parent, y):
+        return self._simple("motion_sety", parent, Y=_num(y))
+
+    def _build_changex(self, parent, dx):
+        return self._simple("motion_changexby", parent, DX=_num(dx))
+
+    def _build_changex_neg(self, parent, dx):
+        return self._build_changex(parent, _negate(dx))
+
+    def _build_changey(self, parent, dy):
+        return self._simple("motion_changeyby", parent, DY=_num(dy))
+
+    def _build_changey_neg(self, parent, dy):
+        return self._build_changey(parent, _negate(dy))
+
+    def _build_bounce(self, parent):
+        return self._simple("motion_ifonedgebounce", parent)
+
+    def _build_movesteps(self, parent, steps):
+        return self._simple("motion_movesteps", parent, STEPS=_num(steps))
+
+    def _build_turnright(self, parent, degrees):
+        return self._simple("motion_turnright", parent, DEGREES=_num(degrees))
+
+    def _build_turnleft(self, parent, degrees):
+        return self._simple("motion_turnleft", parent, DEGREES=_num(degrees))
+
+    def _build_pointdir(self, parent, direction):
+        return self._simple("motion_pointindirection", parent, DIRECTION=_num(direction, 8))
+
+    def _build_say(self, parent, message):
+        return self._simple("looks_say", parent, MESSAGE=_text(message))
+
+    def _build_sayforsecs(self, parent, message, secs):
+        return self._simple("looks_sayforsecs", parent, MESSAGE=_text(message), SECS=_num(secs))
+
+    def _build_think(self, parent, message):
+        return self._simple("looks_think", parent, MESSAGE=_text(message))
+
+    def _build_thinkforsecs(self, parent, message, secs):
+        return self._simple("looks_thinkforsecs", parent, MESSAGE=_text(message), SECS=_num(secs))
+
+    def _build_nextcostume(self, parent):
+        return self._simple("looks_nextcostume", parent)
+
+    def _build_switchcostume(self, parent, costume):
+        block_id = self._simple("looks_switchcostumeto", parent)
+        menu_id = self._menu("looks_costume", "COSTUME", costume.strip(), block_id)
+        self.blocks[block_id]["inputs"]["COSTUME"] = [1, menu_id]
+        return block_id
+
+    def _build_changesize(self, parent, change):
+        return self._simple("looks_changesizeby", parent, CHANGE=_num(change))
+
+    def _build_setsize(self, parent, size):
+        return self._simple("looks_setsizeto", parent, SIZE=_num(size))
+
+    def _build_show(self, parent):
+        return self._simple("looks_show", parent)
+
+    def _build_hide(self, parent):
+        return self._simple("looks_hide", parent)
+
+    def _build_wait(self, parent, duration):
+        return self._simple("control_wait", parent, DURATION=_num(duration, 5))
+
+    def _build_repeat(self, parent, times):
+        return self._simple("control_repeat", parent, TIMES=_num(times, 6))
+
+    def _build_forever(self, parent):
+        return self._simple("control_forever", parent)
+
+    def _touching_condition(self, target, parent):
+        condition_id = self._simple("sensing_touchingobject", parent)
+        menu_id = self._menu("sensing_touchingobjectmenu", "TOUCHINGOBJECTMENU", _touching_option(target), condition_id)
+        self.blocks[condition_id]["inputs"]["TOUCHINGOBJECTMENU"] = [1, menu_id]
+        return condition_id
+
+    def _build_if_touching(self, parent, target):
+        block_id = self._simple("control_if", parent)
+        self.blocks[block_id]["inputs"]["CONDITION"] = [2, self._touching_condition(target, block_id)]
+        return block_id
+
+    def _build_if_key(self, parent, key):
+        block_id = self._simple("control_if", parent)
+        condition_id = self._simple("sensing_keypressed", block_id)
+        menu_id = self._menu("sensing_keyoptions", "KEY_OPTION", _key_option(key), condition_id)
+        self.blocks[condition_id]["inputs"]["KEY_OPTION"] = [1, menu_id]
+        self.blocks[block_id]["inputs"]["CONDITION"] = [2, condition_id]
+        return block_id
+
+    def _build_wait_touching(self, parent, target):
+        block_id = self._simple("control_wait_until", parent)
+        self.blocks[block_id]["inputs"]["CONDITION"] = [2, self._touching_condition(target, block_id)]
+        return block_id
+
+    def _build_wait_not_touching(self, parent, target):
+        block_id = self._simple("control_wait_until", parent)
+        not_id = self._simple("operator_not", block_id)
+        self.blocks[not_id]["inputs"]["OPERAND"] = [2, self._touching_condition(target, not_id)]
+        self.blocks[block_id]["inputs"]["CONDITION"] = [2, not_id]
+        return block_id
+
+    def _build_broadcast(self, parent, message, opcode="event_broadcast"):
+        name, bid = self._broadcast(message)
+        return self._simple(opcode, parent, BROADCAST_INPUT=[1, [11, name, bid]])
+
+    def _build_broadcastandwait(self, parent, message):
+        return self._build_broadcast(parent, message, "event_broadcastandwait")
+
+    def _build_playuntildone(self, parent, sound, opcode="sound_playuntildone"):
+        block_id = self._simple(opcode, parent)
+        menu_id = self._menu("sound_sounds_menu", "SOUND_MENU", sound.strip(), block_id)
+        self.blocks[block_id]["inputs"]["SOUND_MENU"] = [1, menu_id]
+        return block_id
+
+    def _build_startsound(self, parent, sound):
+        return self._build_playuntildone(parent, sound, "sound_play")
+
+    def _build_stopall(self, parent):
+        block_id = self._new_block("control_stop", parent, fields={"STOP_OPTION": ["all", None]})
+        self.blocks[block_id]["mutation"] = {"tagName": "mutation", "children": [], "hasnext": "false"}
+        return block_id
+
+
+def _num(value, kind=4):
+    """数字输入，kind为Scratch的基本类型编号（4数字、5正数、6整数、8角度）"""
+    return [1, [kind, _number(value)]]
+
+
+def _text(value):
+    """文本输入"""
+    return [1, [10, value]]
+
+
+def compile_scripts(scripts, id_prefix="block_"):
+    """
+    把脚本短语列表编译为Scratch积木字典
+
+    Args:
+        scripts (list): 脚本短语或已解析的ScriptIR列表
+        id_prefix (str): 积木ID前缀
+
+    Returns:
+        dict: Scratch积木字典
+    """
+    compiler = ScriptCompiler(id_prefix)
+    blocks = compiler.compile(scripts)
+    if compiler.unknown_phrases:
+        logger.debug(f"未识别的脚本短语: {compiler.unknown_phrases}")
+    return blocks
+
+
+def iter_compile_scripts(scripts, id_prefix="block_"):
+    """
+    逐条脚本编译并产出积木，同一时刻只保留一条脚本的积木
+
+    产出的积木与 compile_scripts 的结果相同（ID、顺序和坐标一致），用于流式写出很大的项目。
+
+    Args:
+        scripts (list): 脚本短语或已解析的ScriptIR列表
+        id_prefix (str): 积木ID前缀
+
+    Yields:
+        tuple: (积木ID, 积木)
+    """
+    compiler = ScriptCompiler(id_prefix)
+    for script in scripts:
+        compiler.blocks = {}
+        yield from compiler.compile((script,)).items()
+    compiler.blocks = {}
+
+
+def script_broadcasts(scripts):
+    """
+    不生成积木，直接从解析结果中收集脚本引用的广播
+
+    结果与对编译出的积木调用 collect_broadcasts 相同，流式写出时据此提前登记舞台上的广播。
+
+    Args:
+        scripts (list): 脚本短语或已解析的ScriptIR列表
+
+    Returns:
+        dict: {广播ID: 广播名}
+    """
+    broadcasts = {}
+
+    def add(name):
+        name = name.strip() or "消息1"
+        broadcasts[broadcast_id(name)] = name
+
+    def walk(statements):
+        for statement in statements:
+            if statement.kind in ("broadcast", "broadcastandwait"):
+                add(statement.args[0])
+            if statement.substack:
+                walk(statement.substack)
+
+    for script in scripts:
+        if not isinstance(script, ScriptIR):
+            script = parse_script(script if isinstance(script, str) else str(script))
+        if script.hat == "receive":
+            add(script.hat_args[0])
+        walk(script.statements)
+    return broadcasts
+
+
+def collect_broadcasts(blocks):
+    """
+    收集积木中引用的广播
+
+    Args:
+        blocks (dict): Scratch积木字典
+
+    Returns:
+        dict: {广播ID: 广播名}
+    """
+    broadcasts = {}
+    for block in blocks.values():
+        field = block["fields"].get("BROADCAST_OPTION")
+        if field:
+            broadcasts[field[1]] = field[0]
+        value = block["inputs"].get("BROADCAST_INPUT")
+        if value and isinstance(value[1], list) and len(value[1]) == 3:
+            broadcasts[value[1][2]] = value[1][1]
+    return broadcasts
+
+
+def benchmark(num_scripts=10000):
+    """
+    编译吞吐量微基准
+
+    Args:
+        num_scripts (int): 编译的脚本数量
+
+    Returns:
+        dict: 脚本数、积木数、耗时和每秒脚本数
+    """
+    samples = [
+        "当绿旗被点击时，移到x:0 y:0",
+        "当按下[空格键]，改变y坐标(10)",
+        "当按下[左箭头]，将x坐标减少(10)",
+        "当绿旗被点击时，重复执行[将x坐标减少(5)，如果碰到边缘就反弹]",
+        "当碰到[主角]，广播[游戏结束]",
+        "当绿旗被点击时，重复执行[下一个造型，等待(0.5)秒]",
+        "当绿旗被点击时，等待(3)秒后，说[他遇到了...]",
+        "当被点击时，播放声音[喵]直到播放完毕",
+        "when green flag clicked, repeat (10) [move (10) steps, turn right (15) degrees]",
+        "when I receive [start], if touching [edge] then [say [Ouch!] for (2) seconds]",
+    ]
+    # 每条脚本末尾加一句编号不同的说话积木，使脚本原文互不相同，parse_script 的缓存不会命中
+    scripts = []
+    for i in range(num_scripts):
+        sample = samples[i % len(samples)]
+        scripts.append(f"{sample}, say [#{i}]" if sample.isascii() else f"{sample}，说[#{i}]")
+    parse_script.cache_clear()
+
+    start_time = time.perf_counter()
+    blocks = 0
+    # 每个角色20条脚本，模拟真实项目
+    for i in range(0, len(scripts), 20):
+        blocks += len(compile_scripts(scripts[i:i + 20]))
+    elapsed = time.perf_counter() - start_time
+    parse_script.cache_clear()
+
+    return {
+        "scripts": len(scripts),
+        "blocks": blocks,
+        "seconds": round(elapsed, 4),
+        "scripts_per_second": round(len(scripts) / elapsed) if elapsed > 0 else None,
+    }
+
+
+# 测试代码
+if __name__ == "__main__":
+    import json
+
+    example = "当绿旗被点击时，重复执行[将x坐标减少(5)，如果碰到边缘就反弹]"
+    print(json.dumps(compile_scripts([example]), ensure_ascii=False, indent=2))
+    print(benchmark())
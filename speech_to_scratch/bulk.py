@@ -0,0 +1,196 @@
+"""
+批量生成模块
+
+一次生成大量Scratch项目（如老师备课时准备几十个项目）：
+
+1. 描述阶段：在主进程的线程池中为每段文字生成项目描述。所有线程共享同一个模型实例，
+   并发请求由批量生成器合并成批；缓存命中或使用模板时不会调用模型。
+2. 构建阶段：把描述交给进程池，在多个CPU核心上并行创建角色、编译积木。
+
+结果按完成顺序逐个产出，调用方可以边生成边返回（如NDJSON流）。
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from speech_to_scratch.project_store import project_metadata
+except ImportError:
+    from project_store import project_metadata
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 工作进程内的转换器，只用于构建项目，不会加载模型
+_worker_converter = None
+
+
+def _get_worker_converter():
+    global _worker_converter
+    if _worker_converter is None:
+        try:
+            from speech_to_scratch.text_to_scratch import TextToScratchConverter
+        except ImportError:
+            from text_to_scratch import TextToScratchConverter
+        _worker_converter = TextToScratchConverter(use_gpu=False, use_cache=False)
+    return _worker_converter
+
+
+def _worker_ready():
+    """工作进程已启动并完成初始化（用于预热）"""
+    return os.getpid()
+
+
+def _build_project(project_description):
+    """
+    在工作进程中根据项目描述创建Scratch项目
+
+    Args:
+        project_description (ProjectIR): 校验后的项目描述
+
+    Returns:
+        dict: Scratch项目
+    """
+    return _get_worker_converter()._create_scratch_project(project_description)
+
+
+class BulkGenerator:
+    """两阶段批量生成器：线程池生成描述，进程池构建项目"""
+
+    def __init__(self, converter, max_workers=None, llm_threads=8, use_processes=True):
+        """
+        初始化批量生成器
+
+        Args:
+            converter (TextToScratchConverter): 用于生成项目描述的转换器（共享模型）
+            max_workers (int): 构建阶段的进程数，默认为CPU核心数
+            llm_threads (int): 描述阶段的并发线程数，建议不小于批量生成器的 max_batch_size
+            use_processes (bool): 构建阶段是否使用进程池，False时在线程中构建
+        """
+        self.converter = converter
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.llm_threads = llm_threads
+        self.use_processes = use_processes
+        self._describe_pool = None
+        self._build_pool = None
+        self._workers_started = False
+        self._lock = threading.Lock()
+
+    def _pools(self):
+        """懒创建线程池和进程池，之后的批次复用同一组工作进程"""
+        with self._lock:
+            if self._describe_pool is None:
+                self._describe_pool = ThreadPoolExecutor(max_workers=self.llm_threads, thread_name_prefix="bulk-llm")
+            if self._build_pool is None:
+                if self.use_processes:
+                    try:
+                        # spawn：不从持有批量生成器、精修和渲染任务线程及其锁的Web服务进程fork
+                        self._build_pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_get_worker_converter,
+                        )
+                    except (OSError, NotImplementedError) as e:
+                        logger.error(f"无法创建进程池，改用线程构建: {str(e)}")
+                        self.use_processes = False
+                if self._build_pool is None:
+                    self._build_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bulk-build")
+            return self._describe_pool, self._build_pool
+
+    def warm_up(self):
+        """
+        创建线程池和进程池，并在调用线程中启动全部工作进程
+        （否则工作进程会在描述阶段的回调线程中按需启动）
+
+        Returns:
+            list: 工作进程PID列表，使用线程构建时为空
+        """
+        _, build_pool = self._pools()
+        if not self.use_processes or self._workers_started:
+            return []
+        futures = [build_pool.submit(_worker_ready) for _ in range(self.max_workers)]
+        pids = [future.result() for future in futures]
+        self._workers_started = True
+        return pids
+
+    def generate(self, texts):
+        """
+        批量生成项目，按完成顺序产出结果
+
+        Args:
+            texts (list): 自然语言描述列表
+
+        Yields:
+            dict: {"index", "text", "project", "description", "metadata", "seconds"}（description为ProjectIR），
+                  失败时为 {"index", "text", "error"}
+        """
+        texts = list(texts)
+        if not texts:
+            return
+
+        self.warm_up()
+        describe_pool, build_pool = self._pools()
+        results = queue.Queue()
+        start_time = time.perf_counter()
+
+        def on_built(index, text, description, future):
+            try:
+                project = future.result()
+                results.put({
+                    "index": index,
+                    "text": text,
+                    "project": project,
+                    "description": description,
+                    "metadata": project_metadata(project),
+                    "seconds": round(time.perf_counter() - start_time, 3),
+                })
+            except Exception as e:
+                logger.error(f"构建项目失败: {str(e)}")
+                results.put({"index": index, "text": text, "error": str(e)})
+
+        def on_described(index, text, future):
+            try:
+                description = future.result()
+                build_future = build_pool.submit(_build_project, description)
+                build_future.add_done_callback(lambda f: on_built(index, text, description, f))
+            except Exception as e:
+                logger.error(f"生成项目描述失败: {str(e)}")
+                results.put({"index": index, "text": text, "error": str(e)})
+
+        for index, text in enumerate(texts):
+            future = describe_pool.submit(self.converter._generate_project_description, text)
+            future.add_done_callback(lambda f, i=index, t=text: on_described(i, t, f))
+
+        for _ in range(len(texts)):
+            yield results.get()
+        logger.info(f"批量生成完成: {len(texts)} 个项目，耗时 {time.perf_counter() - start_time:.2f} 秒")
+
+    def shutdown(self):
+        """关闭线程池和进程池"""
+        with self._lock:
+            for pool in (self._describe_pool, self._build_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True)
+            self._describe_pool = None
+            self._build_pool = None
+            self._workers_started = False
+
+
+# 测试代码
+if __name__ == "__main__":
+    try:
+        from speech_to_scratch.text_to_scratch import TextToScratchConverter
+    except ImportError:
+        from text_to_scratch import TextToScratchConverter
+
+    generator = BulkGenerator(TextToScratchConverter(use_gpu=False))
+    texts = ["做一个躲避游戏", "制作一个小猫跳舞的动画", "讲一个小兔子的故事"] * 10
+    for result in generator.generate(texts):
+        print(result["index"], result.get("metadata") or result.get("error"))
+    generator.shutdown()
@@ -0,0 +1,336 @@
+"""
+JSON感知的解码控制模块
+
+- JSONStoppingCriteria: 顶层JSON对象的括号一旦配平就停止生成
+- SchemaLogitsProcessor: 把对象键约束在 projectName/sprites/backgrounds/events
+  （以及角色的 name/scripts）之内，让生成结果几乎总能一次解析成功
+"""
+
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 项目描述的键约束
+PROJECT_KEYS = ("projectName", "sprites", "backgrounds", "events")
+SPRITE_KEYS = ("name", "scripts")
+SCHEMA_KEYS = {
+    "project": PROJECT_KEYS,
+    "sprite": SPRITE_KEYS,
+}
+
+
+class JSONDecodeState:
+    """逐字符跟踪生成文本的JSON结构，判断当前位置受哪些约束"""
+
+    __slots__ = ("started", "closed", "stack", "in_string", "escape", "string_is_key", "key_buffer")
+
+    def __init__(self):
+        self.started = False
+        self.closed = False
+        # 每个元素为 [容器类型, 模式名, 当前键, 是否等待键]
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_is_key = False
+        self.key_buffer = ""
+
+    def feed(self, text):
+        """
+        输入新生成的文本
+
+        Args:
+            text (str): 新文本
+        """
+        for c in text:
+            if self.closed:
+                return
+            if not self.started:
+                if c == '{':
+                    self.started = True
+                    self.stack.append(['{', "project", None, True])
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.string_is_key:
+                        self.stack[-1][2] = self.key_buffer
+                elif self.string_is_key:
+                    self.key_buffer += c
+                continue
+
+            frame = self.stack[-1]
+            if c == '"':
+                self.in_string = True
+                self.string_is_key = frame[0] == '{' and frame[3]
+                self.key_buffer = ""
+            elif c == '{':
+                schema = None
+                if frame[0] == '[' and frame[1] == ("project", "sprites"):
+                    schema = "sprite"
+                self.stack.append(['{', schema, None, True])
+            elif c == '[':
+                self.stack.append(['[', (frame[1], frame[2]), None, False])
+            elif c in '}]':
+                self.stack.pop()
+                if not self.stack:
+                    self.closed = True
+            elif c == ':' and frame[0] == '{':
+                frame[3] = False
+            elif c == ',' and frame[0] == '{':
+                frame[3] = True
+
+    def constraint(self):
+        """
+        当前位置的约束状态
+
+        Returns:
+            tuple: ("start",) / ("closed",) / ("expect", 模式名, "") / ("key", 模式名, 已生成的键前缀)，
+                   无约束时为None
+        """
+        if self.closed:
+            return ("closed",)
+        if not self.started:
+            return ("start",)
+        frame = self.stack[-1]
+        if frame[0] != '{' or frame[1] not in SCHEMA_KEYS:
+            return None
+        if self.in_string and self.string_is_key:
+            return ("key", frame[1], self.key_buffer)
+        if not self.in_string and frame[3]:
+            return ("expect", frame[1], "")
+        return None
+
+
+def _token_allowed(token_text, constraint):
+    """
+    判断一个token在给定约束下是否合法
+
+    Args:
+        token_text (str): token解码后的文本
+        constraint (tuple): JSONDecodeState.constraint() 的返回值
+
+    Returns:
+        bool: 是否允许
+    """
+    mode = constraint[0]
+    keys = SCHEMA_KEYS.get(constraint[1], PROJECT_KEYS) if len(constraint) > 1 else PROJECT_KEYS
+    prefix = constraint[2] if len(constraint) > 2 else ""
+    if not token_text:
+        return False
+
+    for c in token_text:
+        if mode == "start":
+            if c == '{':
+                mode = "expect"
+            elif not c.isspace():
+                return False
+        elif mode == "expect":
+            if c == '"':
+                mode = "key"
+                prefix = ""
+            elif c == '}':
+                return True
+            elif not c.isspace():
+                return False
+        else:
+            if c == '"':
+                return prefix in keys
+            prefix += c
+            if not any(key.startswith(prefix) for key in keys):
+                return False
+    return True
+
+
+class JSONGenerationTracker:
+    """为一批生成序列维护JSON状态，供停止条件和logits处理器共享"""
+
+    def __init__(self, tokenizer, prompt_length, batch_size=1):
+        """
+        初始化跟踪器
+
+        Args:
+            tokenizer: 分词器
+            prompt_length (int): 输入（含填充）的token长度
+            batch_size (int): 批大小
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.vocab = get_vocab_strings(tokenizer)
+        self.states = [JSONDecodeState() for _ in range(batch_size)]
+        self._consumed = [prompt_length] * batch_size
+
+    def update(self, input_ids):
+        """消费每一行自上次调用以来新生成的token"""
+        length = input_ids.shape[1]
+        for row, state in enumerate(self.states):
+            start = self._consumed[row]
+            if start >= length:
+                continue
+            for token_id in input_ids[row, start:length].tolist():
+                if token_id < len(self.vocab):
+                    state.feed(self.vocab[token_id])
+            self._consumed[row] = length
+
+    @property
+    def all_closed(self):
+        """所有序列的顶层JSON对象是否都已闭合"""
+        return all(state.closed for state in self.states)
+
+
+class JSONStoppingCriteria:
+    """顶层JSON对象括号配平后立即停止生成"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def __call__(self, input_ids, scores, **kwargs):
+        self.tracker.update(input_ids)
+        return self.tracker.all_closed
+
+
+class SchemaLogitsProcessor:
+    """在键的位置把采样限制在项目描述模式允许的键名之内"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.eos_token_id = tracker.tokenizer.eos_token_id
+
+    def __call__(self, input_ids, scores):
+        import torch
+
+        self.tracker.update(input_ids)
+        for row, state in enumerate(self.tracker.states):
+            constraint = state.constraint()
+            if constraint is None:
+                continue
+            if constraint[0] == "closed":
+                # 已完成的序列只允许输出结束符，等待同批次其他序列
+                allowed = [self.eos_token_id] if self.eos_token_id is not None else None
+            else:
+                allowed = allowed_token_ids(self.tracker.tokenizer, self.tracker.vocab, constraint)
+            if not allowed:
+                continue
+            mask = torch.full_like(scores[row], float("-inf"))
+            mask[torch.tensor(allowed, device=scores.device)] = 0
+            scores[row] = scores[row] + mask
+        return scores
+
+
+# 每个分词器的词表文本和约束状态对应的合法token，只计算一次
+_vocab_cache = {}
+_allowed_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_vocab_strings(tokenizer):
+    """
+    获取分词器每个token解码后的文本
+
+    Args:
+        tokenizer: 分词器
+
+    Returns:
+        list: 下标为token id的文本列表
+    """
+    key = id(tokenizer)
+    with _cache_lock:
+        cached = _vocab_cache.get(key)
+        if cached is not None and cached[0] is tokenizer:
+            return cached[1]
+
+    logger.info("预计算词表文本，用于JSON约束解码...")
+    vocab = [tokenizer.decode([token_id]) for token_id in range(len(tokenizer))]
+    with _cache_lock:
+        _vocab_cache[key] = (tokenizer, vocab)
+    return vocab
+
+
+def allowed_token_ids(tokenizer, vocab, constraint):
+    """
+    计算约束状态下允许的token id列表
+
+    Args:
+        tokenizer: 分词器
+        vocab (list): get_vocab_strings 的结果
+        constraint (tuple): 约束状态
+
+    Returns:
+        list: 允许的token id
+    """
+    key = (id(tokenizer), constraint)
+    with _cache_lock:
+        cached = _allowed_cache.get(key)
+    if cached is not None:
+        return cached
+
+    allowed = [token_id for token_id, text in enumerate(vocab) if _token_allowed(text, constraint)]
+    with _cache_lock:
+        _allowed_cache[key] = allowed
+    return allowed
+
+
+def json_generation_kwargs(tokenizer, prompt_length, batch_size=1, constrain_schema=True):
+    """
+    构建JSON模式下传给 model.generate 的额外参数
+
+    Args:
+        tokenizer: 分词器
+        prompt_length (int): 输入（含填充）的token长度
+        batch_size (int): 批大小
+        constrain_schema (bool): 是否启用键约束
+
+    Returns:
+        dict: 包含 stopping_criteria 和（可选）logits_processor
+    """
+    from transformers import LogitsProcessorList, StoppingCriteriaList
+
+    tracker = JSONGenerationTracker(tokenizer, prompt_length, batch_size)
+    kwargs = {"stopping_criteria": StoppingCriteriaList([JSONStoppingCriteria(tracker)])}
+    if constrain_schema:
+        kwargs["logits_processor"] = LogitsProcessorList([SchemaLogitsProcessor(tracker)])
+    return kwargs
+
+
+def count_generated_tokens(tokens, tokenizer):
+    """
+    统计一行新生成token中有效token的数量（遇到结束符或填充符为止）
+
+    Args:
+        tokens: 一维token张量
+        tokenizer: 分词器
+
+    Returns:
+        int: 有效token数
+    """
+    stop_ids = {tokenizer.eos_token_id, tokenizer.pad_token_id} - {None}
+    count = 0
+    for token_id in tokens.tolist():
+        if token_id in stop_ids:
+            break
+        count += 1
+    return count
+
+
+def log_token_savings(generated_tokens, max_new_tokens):
+    """
+    输出一次请求节省的token数
+
+    Args:
+        generated_tokens (int): 实际生成的token数
+        max_new_tokens (int): 生成上限
+
+    Returns:
+        int: 节省的token数
+    """
+    saved = max(max_new_tokens - generated_tokens, 0)
+    logger.info(f"JSON提前停止: 生成 {generated_tokens} tokens，节省 {saved} tokens "
+                f"({saved / max_new_tokens:.0%})")
+    return saved
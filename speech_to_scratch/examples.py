@@ -2,6 +2,7 @@ import os
 import json
 from pathlib import Path
 import sys
+import threading
 
 # 修复相对导入问题
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,10 +11,174 @@ try:
 except ImportError:
     from text_to_scratch import TextToScratchConverter
 
+try:
+    from speech_to_scratch.bulk import BulkGenerator
+except ImportError:
+    from bulk import BulkGenerator
+
+try:
+    from speech_to_scratch.project_store import project_hash
+except ImportError:
+    from project_store import project_hash
+
 # 配置示例项目保存目录
 EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets/scratch_examples")
 os.makedirs(EXAMPLES_DIR, exist_ok=True)
 
+class ExampleEntry:
+    """一个已解析的示例项目及其元数据"""
+    
+    __slots__ = ("number", "name", "file", "path", "mtime_ns", "size", "project", "sprite_count", "hash")
+    
+    def __init__(self, file, path, stat, project):
+        self.file = file
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.project = project
+        prefix, _, rest = file.partition('_')
+        self.number = int(prefix) if prefix.isdigit() else None
+        self.name = rest.replace('_', ' ').replace('.json', '') if rest else file
+        self.sprite_count = sum(1 for target in project.get("targets", []) if not target.get("isStage", False))
+        self.hash = project_hash(project)
+    
+    def metadata(self):
+        """
+        获取示例元数据
+        
+        Returns:
+            dict: 编号、名称、文件名、角色数、大小和内容哈希
+        """
+        return {
+            "number": self.number,
+            "name": self.name,
+            "file": self.file,
+            "sprite_count": self.sprite_count,
+            "size": self.size,
+            "hash": self.hash
+        }
+
+class ExampleCatalog:
+    """
+    示例项目目录索引
+    
+    第一次使用时扫描目录并解析所有示例，之后常驻内存。目录的mtime变化（增删文件）时才重新扫描，
+    且只重新解析mtime或大小发生变化的文件；读取单个示例只需一次stat检查。
+    返回的项目对象在多次调用间共享，调用方不应修改。
+    """
+    
+    def __init__(self, examples_dir=EXAMPLES_DIR):
+        """
+        初始化示例索引
+        
+        Args:
+            examples_dir (str): 示例目录
+        """
+        self.examples_dir = examples_dir
+        self._entries = {}
+        self._by_number = {}
+        self._dir_mtime_ns = None
+        self._lock = threading.Lock()
+    
+    def _load_entry(self, file, stat):
+        path = os.path.join(self.examples_dir, file)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return ExampleEntry(file, path, stat, json.load(f))
+        except Exception as e:
+            print(f"读取 {file} 失败: {str(e)}")
+            return None
+    
+    def _refresh_locked(self):
+        """重新扫描目录（调用方需持有锁）"""
+        try:
+            dir_mtime_ns = os.stat(self.examples_dir).st_mtime_ns
+        except OSError:
+            self._entries, self._by_number, self._dir_mtime_ns = {}, {}, None
+            return
+        if dir_mtime_ns == self._dir_mtime_ns:
+            return
+        
+        entries = {}
+        with os.scandir(self.examples_dir) as it:
+            for item in it:
+                if not item.name.endswith('.json') or not item.is_file():
+                    continue
+                stat = item.stat()
+                entry = self._entries.get(item.name)
+                if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                    entry = self._load_entry(item.name, stat)
+                if entry is not None:
+                    entries[item.name] = entry
+        
+        by_number = {}
+        for file in sorted(entries):
+            number = entries[file].number
+            if number is not None and number not in by_number:
+                by_number[number] = file
+        self._entries, self._by_number, self._dir_mtime_ns = entries, by_number, dir_mtime_ns
+    
+    def refresh(self):
+        """检查目录变化并更新索引"""
+        with self._lock:
+            self._refresh_locked()
+    
+    def entry(self, example_number):
+        """
+        获取指定编号的示例
+        
+        Args:
+            example_number (int): 示例编号
+            
+        Returns:
+            ExampleEntry: 示例，不存在时为None
+        """
+        with self._lock:
+            self._refresh_locked()
+            file = self._by_number.get(example_number)
+            if file is None:
+                return None
+            entry = self._entries[file]
+            # 文件被原地修改时目录mtime不变，单独检查这个文件
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                return None
+            if stat.st_mtime_ns != entry.mtime_ns or stat.st_size != entry.size:
+                entry = self._load_entry(file, stat)
+                if entry is None:
+                    return None
+                self._entries[file] = entry
+            return entry
+    
+    def list(self):
+        """
+        列出所有示例的元数据
+        
+        Returns:
+            list: 按编号和文件名排序的元数据
+        """
+        with self._lock:
+            self._refresh_locked()
+            entries = [self._entries[file] for file in sorted(self._entries)]
+        return [entry.metadata() for entry in entries]
+
+_default_catalog = None
+_default_catalog_lock = threading.Lock()
+
+def get_example_catalog():
+    """
+    获取进程级示例索引
+    
+    Returns:
+        ExampleCatalog: 默认示例索引
+    """
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = ExampleCatalog()
+        return _default_catalog
+
 def generate_scratch_examples():
     """生成Scratch项目示例"""
     print("开始生成Scratch项目示例...")
@@ -41,23 +206,26 @@ def generate_scratch_examples():
         }
     ]
     
-    # 为每个示例生成Scratch项目
-    for i, example in enumerate(examples):
+    # 批量生成所有示例，按完成顺序保存
+    generator = BulkGenerator(converter)
+    for result in generator.generate(example["description"] for example in examples):
+        i = result["index"]
+        example = examples[i]
         print(f"\n生成示例 {i+1}/{len(examples)}: {example['name']}")
-        try:
-            project = converter.convert(example["description"])
-            
-            # 保存项目文件
-            file_name = f"{i+1}_{example['name'].replace(' ', '_')}.json"
-            file_path = os.path.join(EXAMPLES_DIR, file_name)
-            
-            success = converter.save_project(project, file_path)
-            if success:
-                print(f"✓ 示例 '{example['name']}' 已生成并保存到 {file_path}")
-            else:
-                print(f"✗ 示例 '{example['name']}' 生成失败")
-        except Exception as e:
-            print(f"生成示例 '{example['name']}' 时出错: {str(e)}")
+        if "error" in result:
+            print(f"生成示例 '{example['name']}' 时出错: {result['error']}")
+            continue
+        
+        # 保存项目文件
+        file_name = f"{i+1}_{example['name'].replace(' ', '_')}.json"
+        file_path = os.path.join(EXAMPLES_DIR, file_name)
+        
+        success = converter.save_project(result["project"], file_path)
+        if success:
+            print(f"✓ 示例 '{example['name']}' 已生成并保存到 {file_path}")
+        else:
+            print(f"✗ 示例 '{example['name']}' 生成失败")
+    generator.shutdown()
             
     print("\n所有示例生成完成！")
     return EXAMPLES_DIR
@@ -77,10 +245,10 @@ def load_example(example_number):
         os.makedirs(EXAMPLES_DIR, exist_ok=True)
         print(f"警告: 示例目录不存在，已创建 {EXAMPLES_DIR}")
         
-    # 获取所有示例文件
-    example_files = [f for f in os.listdir(EXAMPLES_DIR) if f.startswith(f"{example_number}_") and f.endswith('.json')]
+    # 从内存索引中查找示例
+    entry = get_example_catalog().entry(example_number)
     
-    if not example_files:
+    if entry is None:
         print(f"找不到编号为 {example_number} 的示例，将创建一个默认示例")
         # 创建默认示例
         try:
@@ -103,16 +271,7 @@ def load_example(example_number):
             print(f"创建默认示例失败: {str(e)}")
             return None
         
-    # 加载第一个匹配的文件
-    example_path = os.path.join(EXAMPLES_DIR, example_files[0])
-    try:
-        with open(example_path, 'r', encoding='utf-8') as f:
-            project = json.load(f)
-        print(f"已加载示例: {example_files[0]}")
-        return project
-    except Exception as e:
-        print(f"加载示例失败: {str(e)}")
-        return None
+    return entry.project
 
 def print_example_info():
     """打印所有可用示例的信息"""
@@ -122,27 +281,17 @@ def print_example_info():
         print("示例目录不存在，请先生成示例")
         return
         
-    example_files = sorted([f for f in os.listdir(EXAMPLES_DIR) if f.endswith('.json')])
+    examples = get_example_catalog().list()
     
-    if not example_files:
+    if not examples:
         print("没有找到示例文件，请先生成示例")
         return
         
-    for file in example_files:
-        try:
-            with open(os.path.join(EXAMPLES_DIR, file), 'r', encoding='utf-8') as f:
-                project = json.load(f)
-                
-            # 提取项目信息
-            project_name = file.split('_', 1)[1].replace('_', ' ').replace('.json', '')
-            sprite_count = sum(1 for target in project["targets"] if not target.get("isStage", False))
-            
-            print(f"- {file.split('_')[0]}: {project_name}")
-            print(f"  角色数量: {sprite_count}")
-            print(f"  文件: {file}")
-            print()
-        except Exception as e:
-            print(f"读取 {file} 失败: {str(e)}")
+    for example in examples:
+        print(f"- {example['file'].split('_')[0]}: {example['name']}")
+        print(f"  角色数量: {example['sprite_count']}")
+        print(f"  文件: {example['file']}")
+        print()
 
 if __name__ == "__main__":
     # 生成示例项目
@@ -0,0 +1,655 @@
+"""
+无界面Scratch虚拟机
+
+纯Python实现的解释器，覆盖转换器会生成的积木子集（事件、运动、外观/说话、控制循环和等待、广播、碰撞侦测），
+用于在服务器端批量试运行生成的项目并记录角色状态轨迹。
+
+运行在虚拟时钟上：每帧推进 1/fps 秒，不做真实等待，因此比实时快得多。
+脚本按Scratch的调度方式实现为生成器线程：循环每次迭代、等待积木都会让出到下一帧。
+"""
+
+import logging
+import math
+import time
+from collections import Counter
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STAGE_WIDTH = 480
+STAGE_HEIGHT = 360
+# Scratch要求角色至少有这么多像素留在舞台内
+FENCE_INSET = 15
+
+HAT_OPCODES = {
+    "event_whenflagclicked",
+    "event_whenkeypressed",
+    "event_whenthisspriteclicked",
+    "event_whenbroadcastreceived",
+    "event_whenbackdropswitchesto",
+}
+
+
+class SpriteState:
+    """角色（或舞台）的运行时状态"""
+
+    __slots__ = ("name", "is_stage", "blocks", "x", "y", "direction", "size", "visible",
+                 "costume", "costumes", "say", "half_width", "half_height")
+
+    def __init__(self, target):
+        self.name = target.get("name", "Sprite")
+        self.is_stage = target.get("isStage", False)
+        self.blocks = target.get("blocks", {})
+        self.x = float(target.get("x", 0))
+        self.y = float(target.get("y", 0))
+        self.direction = float(target.get("direction", 90))
+        self.size = float(target.get("size", 100))
+        self.visible = target.get("visible", True)
+        self.costume = target.get("currentCostume", 0)
+        self.costumes = [c.get("name") for c in target.get("costumes", [])] or ["造型1"]
+        self.say = None
+        # 碰撞检测使用造型的包围盒，以旋转中心近似造型尺寸
+        costume = (target.get("costumes") or [{}])[0]
+        self.half_width = costume.get("rotationCenterX", 48)
+        self.half_height = costume.get("rotationCenterY", 50)
+
+    def bounds(self):
+        """当前的包围盒 (left, right, bottom, top)"""
+        scale = self.size / 100
+        w, h = self.half_width * scale, self.half_height * scale
+        return self.x - w, self.x + w, self.y - h, self.y + h
+
+    def snapshot(self):
+        """用于轨迹记录的状态元组"""
+        return (round(self.x, 2), round(self.y, 2), round(self.direction, 2), self.costume,
+                round(self.size, 2), self.visible, self.say)
+
+
+class _Thread:
+    """由帽子积木启动的一条脚本"""
+
+    __slots__ = ("target", "top_id", "generator", "done", "restart_generator")
+
+    def __init__(self, target, top_id, generator):
+        self.target = target
+        self.top_id = top_id
+        self.generator = generator
+        self.done = False
+        # 脚本在执行中重启自己（如广播自己接收的消息）时，本次执行让出后再换成的新生成器
+        self.restart_generator = None
+
+
+class _StopScript(Exception):
+    """停止当前脚本"""
+
+
+class HeadlessVM:
+    """在虚拟时钟上运行Scratch项目的解释器"""
+
+    def __init__(self, project, fps=30, record_trace=True, max_trace_events=100000, max_ops_per_frame=100000):
+        """
+        初始化虚拟机
+
+        Args:
+            project (dict): Scratch项目
+            fps (int): 每虚拟秒的帧数
+            record_trace (bool): 是否记录状态轨迹
+            max_trace_events (int): 轨迹最多记录的事件数，超出后停止记录
+            max_ops_per_frame (int): 每帧最多执行的积木数，防止失控脚本卡住
+        """
+        self.fps = fps
+        self.dt = 1.0 / fps
+        self.time = 0.0
+        self.frame = 0
+        self.targets = [SpriteState(t) for t in project.get("targets", [])]
+        self.sprites = {t.name: t for t in self.targets if not t.is_stage}
+        self.threads = []
+        self.keys_down = set()
+        self.mouse = (0.0, 0.0)
+        self.record_trace = record_trace
+        self.max_trace_events = max_trace_events
+        self.max_ops_per_frame = max_ops_per_frame
+        self.trace = []
+        self.trace_truncated = False
+        self.unsupported = Counter()
+        self.errors = []
+        self.broadcast_count = 0
+        self._ops = 0
+        self._current = None
+        self._scheduled = []
+        self._last_snapshots = {}
+        self._handlers = self._build_handlers()
+
+    # ---------- 调度 ----------
+
+    def schedule(self, at, action, *args):
+        """
+        在虚拟时间at执行一个输入事件
+
+        Args:
+            at (float): 虚拟时间（秒）
+            action (str): "key_down"、"key_up"、"press_key"、"click" 或 "broadcast"
+            args: 事件参数，如按键名或角色名
+        """
+        self._scheduled.append((at, action, args))
+        self._scheduled.sort(key=lambda item: item[0])
+
+    def _process_scheduled(self):
+        while self._scheduled and self._scheduled[0][0] <= self.time + 1e-9:
+            _, action, args = self._scheduled.pop(0)
+            if action == "key_down":
+                self.keys_down.add(args[0])
+                self._start_key_hats(args[0])
+            elif action == "key_up":
+                self.keys_down.discard(args[0])
+            elif action == "press_key":
+                self._start_key_hats(args[0])
+            elif action == "click":
+                sprite = self.sprites.get(args[0])
+                if sprite is not None:
+                    self._start_hats("event_whenthisspriteclicked", only_target=sprite)
+            elif action == "broadcast":
+                self._broadcast(args[0])
+
+    def _start_key_hats(self, key):
+        self._start_hats("event_whenkeypressed",
+                         lambda fields: fields.get("KEY_OPTION", [None])[0] in (key, "any"))
+
+    def _start_hats(self, opcode, matches=None, only_target=None):
+        """启动所有匹配的帽子积木；同一脚本已在运行时从头重新开始"""
+        started = []
+        for target in self.targets:
+            if only_target is not None and target is not only_target:
+                continue
+            for block_id, block in target.blocks.items():
+                if block.get("opcode") != opcode or not block.get("topLevel"):
+                    continue
+                if matches is not None and not matches(block.get("fields", {})):
+                    continue
+                thread = self._find_thread(target, block_id)
+                generator = self._run_stack(target, block.get("next"))
+                if thread is None:
+                    thread = _Thread(target, block_id, generator)
+                    self.threads.append(thread)
+                elif thread is self._current:
+                    # 正在执行的生成器不能close，等它让出后在step中替换
+                    thread.restart_generator = generator
+                else:
+                    thread.generator.close()
+                    thread.generator = generator
+                    thread.done = False
+                started.append(thread)
+        return started
+
+    def _find_thread(self, target, top_id):
+        for thread in self.threads:
+            if thread.target is target and thread.top_id == top_id and not thread.done:
+                return thread
+        return None
+
+    def _broadcast(self, name):
+        self.broadcast_count += 1
+        self._record_event("broadcast", name=name)
+        lowered = str(name).lower()
+        return self._start_hats(
+            "event_whenbroadcastreceived",
+            lambda fields: str(fields.get("BROADCAST_OPTION", [""])[0]).lower() == lowered
+        )
+
+    def green_flag(self):
+        """点击绿旗：启动所有“当绿旗被点击”脚本"""
+        self._start_hats("event_whenflagclicked")
+
+    def step(self):
+        """执行一帧"""
+        self._process_scheduled()
+        self._ops = 0
+        index = 0
+        # 本帧中新启动的线程（如广播）也在本帧内运行
+        while index < len(self.threads):
+            thread = self.threads[index]
+            index += 1
+            if thread.done:
+                continue
+            self._current = thread
+            try:
+                next(thread.generator)
+            except StopIteration:
+                thread.done = True
+            except _StopScript:
+                thread.done = True
+            except Exception as e:
+                thread.done = True
+                self.errors.append(f"{thread.target.name}: {str(e)}")
+            if thread.restart_generator is not None:
+                thread.generator.close()
+                thread.generator, thread.restart_generator = thread.restart_generator, None
+                thread.done = False
+        self._current = None
+        self.threads = [t for t in self.threads if not t.done]
+        self._record_states()
+        self.time += self.dt
+        self.frame += 1
+
+    def run(self, seconds=10.0, green_flag=True):
+        """
+        运行项目
+
+        Args:
+            seconds (float): 虚拟运行时长
+            green_flag (bool): 开始时是否点击绿旗
+
+        Returns:
+            dict: 运行结果
+        """
+        wall_start = time.perf_counter()
+        if green_flag:
+            self.green_flag()
+        frames = int(round(seconds * self.fps))
+        for _ in range(frames):
+            if not self.threads and not self._scheduled:
+                break
+            self.step()
+        wall_seconds = time.perf_counter() - wall_start
+        return {
+            "frames": self.frame,
+            "virtual_seconds": round(self.time, 3),
+            "wall_seconds": round(wall_seconds, 4),
+            "speedup": round(self.time / wall_seconds, 1) if wall_seconds > 0 else None,
+            "running_threads": len(self.threads),
+            "broadcasts": self.broadcast_count,
+            "sprites": {name: self._sprite_summary(s) for name, s in self.sprites.items()},
+            "unsupported": dict(self.unsupported),
+            "errors": self.errors,
+            "trace_events": len(self.trace),
+            "trace_truncated": self.trace_truncated,
+        }
+
+    # ---------- 轨迹 ----------
+
+    def _record_event(self, kind, **data):
+        if not self.record_trace:
+            return
+        if len(self.trace) >= self.max_trace_events:
+            self.trace_truncated = True
+            return
+        event = {"t": round(self.time, 4), "event": kind}
+        event.update(data)
+        self.trace.append(event)
+
+    def _record_states(self):
+        if not self.record_trace:
+            return
+        for sprite in self.sprites.values():
+            snapshot = sprite.snapshot()
+            if self._last_snapshots.get(sprite.name) != snapshot:
+                self._last_snapshots[sprite.name] = snapshot
+                x, y, direction, costume, size, visible, say = snapshot
+                self._record_event("state", sprite=sprite.name, x=x, y=y, direction=direction,
+                                   costume=costume, size=size, visible=visible, say=say)
+
+    @staticmethod
+    def _sprite_summary(sprite):
+        return {
+            "x": round(sprite.x, 2),
+            "y": round(sprite.y, 2),
+            "direction": round(sprite.direction, 2),
+            "costume": sprite.costume,
+            "size": round(sprite.size, 2),
+            "visible": sprite.visible,
+            "say": sprite.say,
+        }
+
+    # ---------- 解释执行 ----------
+
+    def _run_stack(self, target, block_id):
+        """执行从block_id开始的积木序列（生成器，让出表示等待下一帧）"""
+        blocks = target.blocks
+        while block_id:
+            block = blocks.get(block_id)
+            if block is None:
+                return
+            self._ops += 1
+            if self._ops > self.max_ops_per_frame:
+                # 本帧执行的积木过多，强制让出
+                self._ops = 0
+                yield
+            handler = self._handlers.get(block["opcode"])
+            if handler is None:
+                self.unsupported[block["opcode"]] += 1
+            else:
+                result = handler(target, block)
+                if result is not None:
+                    yield from result
+            block_id = block.get("next")
+
+    def _substack(self, target, block, name="SUBSTACK"):
+        value = block.get("inputs", {}).get(name)
+        return self._run_stack(target, value[1] if value else None)
+
+    def _value(self, target, block, name, default=0):
+        """计算输入的值"""
+        value = block.get("inputs", {}).get(name)
+        if not value or len(value) < 2:
+            return default
+        item = value[1]
+        if isinstance(item, list):
+            # 字面量: [类型, 值] 或广播 [11, 名称, ID]
+            return item[1] if len(item) > 1 else default
+        if item is None:
+            return default
+        return self._evaluate(target, item, default)
+
+    def _evaluate(self, target, block_id, default=0):
+        """计算报告积木或下拉菜单的值"""
+        block = target.blocks.get(block_id)
+        if block is None:
+            return default
+        opcode = block["opcode"]
+        if block.get("shadow") and block.get("fields"):
+            return next(iter(block["fields"].values()))[0]
+        if opcode == "sensing_touchingobject":
+            return self._touching(target, self._value(target, block, "TOUCHINGOBJECTMENU", ""))
+        if opcode == "sensing_keypressed":
+            key = self._value(target, block, "KEY_OPTION", "")
+            return key in self.keys_down or (key == "any" and bool(self.keys_down))
+        if opcode == "operator_not":
+            return not self._truthy(self._value(target, block, "OPERAND", False))
+        if opcode == "operator_and":
+            return self._truthy(self._value(target, block, "OPERAND1", False)) and \
+                self._truthy(self._value(target, block, "OPERAND2", False))
+        if opcode == "operator_or":
+            return self._truthy(self._value(target, block, "OPERAND1", False)) or \
+                self._truthy(self._value(target, block, "OPERAND2", False))
+        if opcode == "motion_xposition":
+            return target.x
+        if opcode == "motion_yposition":
+            return target.y
+        if opcode == "motion_direction":
+            return target.direction
+        if opcode == "sensing_timer":
+            return self.time
+        self.unsupported[opcode] += 1
+        return default
+
+    @staticmethod
+    def _number(value):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        return 0.0 if math.isnan(number) else number
+
+    @staticmethod
+    def _truthy(value):
+        if isinstance(value, str):
+            return value not in ("", "0", "false")
+        return bool(value)
+
+    def _touching(self, target, other):
+        left, right, bottom, top = target.bounds()
+        if other == "_edge_":
+            return left <= -STAGE_WIDTH / 2 or right >= STAGE_WIDTH / 2 or \
+                bottom <= -STAGE_HEIGHT / 2 or top >= STAGE_HEIGHT / 2
+        if other == "_mouse_":
+            mx, my = self.mouse
+            return left <= mx <= right and bottom <= my <= top
+        sprite = self.sprites.get(other)
+        if sprite is None or sprite is target or not sprite.visible or not target.visible:
+            return False
+        o_left, o_right, o_bottom, o_top = sprite.bounds()
+        return left < o_right and o_left < right and bottom < o_top and o_bottom < top
+
+    def _keep_in_fence(self, target):
+        """与Scratch一样把角色限制在舞台范围内"""
+        left, right, bottom, top = target.bounds()
+        half_w, half_h = STAGE_WIDTH / 2, STAGE_HEIGHT / 2
+        if right < -half_w + FENCE_INSET:
+            target.x += -half_w + FENCE_INSET - right
+        elif left > half_w - FENCE_INSET:
+            target.x -= left - (half_w - FENCE_INSET)
+        if top < -half_h + FENCE_INSET:
+            target.y += -half_h + FENCE_INSET - top
+        elif bottom > half_h - FENCE_INSET:
+            target.y -= bottom - (half_h - FENCE_INSET)
+
+    def _move_to(self, target, x, y):
+        if target.is_stage:
+            return
+        target.x, target.y = x, y
+        self._keep_in_fence(target)
+
+    @staticmethod
+    def _wrap_direction(direction):
+        direction = (direction + 180) % 360 - 180
+        return 180.0 if direction == -180 else direction
+
+    def _wait(self, seconds):
+        end = self.time + seconds
+        yield
+        while self.time < end - 1e-9:
+            yield
+
+    def _build_handlers(self):
+        """opcode -> 处理函数；返回生成器的处理函数需要等待"""
+        return {
+            # 帽子积木出现在脚本中间时忽略
+            **{opcode: (lambda target, block: None) for opcode in HAT_OPCODES},
+            "motion_movesteps": self._op_movesteps,
+            "motion_gotoxy": lambda t, b: self._move_to(
+                t, self._number(self._value(t, b, "X")), self._number(self._value(t, b, "Y"))),
+            "motion_setx": lambda t, b: self._move_to(t, self._number(self._value(t, b, "X")), t.y),
+            "motion_sety": lambda t, b: self._move_to(t, t.x, self._number(self._value(t, b, "Y"))),
+            "motion_changexby": lambda t, b: self._move_to(t, t.x + self._number(self._value(t, b, "DX")), t.y),
+            "motion_changeyby": lambda t, b: self._move_to(t, t.x, t.y + self._number(self._value(t, b, "DY"))),
+            "motion_turnright": lambda t, b: setattr(
+                t, "direction", self._wrap_direction(t.direction + self._number(self._value(t, b, "DEGREES")))),
+            "motion_turnleft": lambda t, b: setattr(
+                t, "direction", self._wrap_direction(t.direction - self._number(self._value(t, b, "DEGREES")))),
+            "motion_pointindirection": lambda t, b: setattr(
+                t, "direction", self._wrap_direction(self._number(self._value(t, b, "DIRECTION", 90)))),
+            "motion_ifonedgebounce": self._op_bounce,
+            "looks_say": lambda t, b: setattr(t, "say", str(self._value(t, b, "MESSAGE", "")) or None),
+            "looks_think": lambda t, b: setattr(t, "say", str(self._value(t, b, "MESSAGE", "")) or None),
+            "looks_sayforsecs": self._op_sayforsecs,
+            "looks_thinkforsecs": self._op_sayforsecs,
+            "looks_show": lambda t, b: setattr(t, "visible", True),
+            "looks_hide": lambda t, b: setattr(t, "visible", False),
+            "looks_nextcostume": lambda t, b: setattr(t, "costume", (t.costume + 1) % len(t.costumes)),
+            "looks_switchcostumeto": self._op_switchcostume,
+            "looks_changesizeby": lambda t, b: setattr(
+                t, "size", max(5.0, t.size + self._number(self._value(t, b, "CHANGE")))),
+            "looks_setsizeto": lambda t, b: setattr(
+                t, "size", max(5.0, self._number(self._value(t, b, "SIZE", 100)))),
+            "sound_play": self._op_sound,
+            "sound_playuntildone": self._op_sound,
+            "control_wait": lambda t, b: self._wait(self._number(self._value(t, b, "DURATION"))),
+            "control_repeat": self._op_repeat,
+            "control_forever": self._op_forever,
+            "control_if": self._op_if,
+            "control_if_else": self._op_if_else,
+            "control_wait_until": self._op_wait_until,
+            "control_stop": self._op_stop,
+            "event_broadcast": lambda t, b: self._broadcast(self._value(t, b, "BROADCAST_INPUT", "")) and None,
+            "event_broadcastandwait": self._op_broadcastandwait,
+        }
+
+    def _op_movesteps(self, target, block):
+        steps = self._number(self._value(target, block, "STEPS"))
+        radians = math.radians(90 - target.direction)
+        self._move_to(target, target.x + steps * math.cos(radians), target.y + steps * math.sin(radians))
+
+    def _op_bounce(self, target, block):
+        left, right, bottom, top = target.bounds()
+        half_w, half_h = STAGE_WIDTH / 2, STAGE_HEIGHT / 2
+        # 找到越界最多的边并按Scratch规则反弹
+        distances = {
+            "left": left + half_w,
+            "right": half_w - right,
+            "bottom": bottom + half_h,
+            "top": half_h - top,
+        }
+        edge, distance = min(distances.items(), key=lambda item: item[1])
+        if distance > 0:
+            return
+        radians = math.radians(90 - target.direction)
+        dx, dy = math.cos(radians), math.sin(radians)
+        if edge == "left":
+            dx = max(0.2, abs(dx))
+        elif edge == "right":
+            dx = -max(0.2, abs(dx))
+        elif edge == "bottom":
+            dy = max(0.2, abs(dy))
+        else:
+            dy = -max(0.2, abs(dy))
+        target.direction = self._wrap_direction(90 - math.degrees(math.atan2(dy, dx)))
+        # 移回舞台内
+        if edge == "left":
+            target.x -= distance
+        elif edge == "right":
+            target.x += distance
+        elif edge == "bottom":
+            target.y -= distance
+        else:
+            target.y += distance
+
+    def _op_sayforsecs(self, target, block):
+        message = str(self._value(target, block, "MESSAGE", ""))
+        target.say = message or None
+        yield from self._wait(self._number(self._value(target, block, "SECS", 2)))
+        if target.say == (message or None):
+            target.say = None
+
+    def _op_switchcostume(self, target, block):
+        costume = self._value(target, block, "COSTUME", "")
+        if costume in target.costumes:
+            target.costume = target.costumes.index(costume)
+        else:
+            number = self._number(costume)
+            if number:
+                target.costume = (int(number) - 1) % len(target.costumes)
+
+    def _op_sound(self, target, block):
+        # 无界面运行不播放声音，只记录事件
+        self._record_event("sound", sprite=target.name, sound=self._value(target, block, "SOUND_MENU", ""))
+
+    def _op_repeat(self, target, block):
+        for _ in range(max(0, int(round(self._number(self._value(target, block, "TIMES", 10)))))):
+            yield from self._substack(target, block)
+            yield
+
+    def _op_forever(self, target, block):
+        while True:
+            yield from self._substack(target, block)
+            yield
+
+    def _op_if(self, target, block):
+        if self._truthy(self._value(target, block, "CONDITION", False)):
+            return self._substack(target, block)
+        return None
+
+    def _op_if_else(self, target, block):
+        if self._truthy(self._value(target, block, "CONDITION", False)):
+            return self._substack(target, block)
+        return self._substack(target, block, "SUBSTACK2")
+
+    def _op_wait_until(self, target, block):
+        while not self._truthy(self._value(target, block, "CONDITION", False)):
+            yield
+
+    def _op_stop(self, target, block):
+        option = block.get("fields", {}).get("STOP_OPTION", ["all"])[0]
+        if option == "all":
+            for thread in self.threads:
+                thread.done = True
+                thread.restart_generator = None
+            self._scheduled = []
+            raise _StopScript()
+        if option == "this script":
+            raise _StopScript()
+        # other scripts in sprite
+        for thread in self.threads:
+            if thread.target is target and thread is not self._current:
+                thread.done = True
+        return None
+
+    def _op_broadcastandwait(self, target, block):
+        threads = self._broadcast(self._value(target, block, "BROADCAST_INPUT", ""))
+        yield
+        while any(not thread.done for thread in threads):
+            yield
+
+
+def smoke_run(project, seconds=5.0, fps=30, inputs=None, record_trace=False):
+    """
+    试运行一个项目
+
+    Args:
+        project (dict): Scratch项目
+        seconds (float): 虚拟运行时长
+        fps (int): 帧率
+        inputs (list): (时间, 动作, 参数...) 输入事件，如 (1.0, "press_key", "space")
+        record_trace (bool): 是否在结果中附带状态轨迹
+
+    Returns:
+        dict: 运行结果；record_trace为True时包含trace
+    """
+    vm = HeadlessVM(project, fps=fps, record_trace=record_trace)
+    for item in inputs or []:
+        vm.schedule(item[0], item[1], *item[2:])
+    result = vm.run(seconds)
+    if record_trace:
+        result["trace"] = vm.trace
+    return result
+
+
+def benchmark(num_projects=1000, seconds=5.0):
+    """
+    批量试运行吞吐量
+
+    Args:
+        num_projects (int): 运行的项目数
+        seconds (float): 每个项目的虚拟运行时长
+
+    Returns:
+        dict: 项目数、总耗时和每分钟项目数
+    """
+    try:
+        from speech_to_scratch.text_to_scratch import TextToScratchConverter
+    except ImportError:
+        from text_to_scratch import TextToScratchConverter
+
+    converter = TextToScratchConverter(use_gpu=False, use_cache=False)
+    texts = ["做一个躲避游戏", "制作一个小猫跳舞的动画", "讲一个小兔子的故事", "做一个会说话的小狗"]
+    projects = [converter._create_scratch_project(converter._get_default_project_template(t)) for t in texts]
+    inputs = [(0.5, "key_down", "space"), (1.0, "key_down", "left arrow"), (2.0, "click", "主角")]
+
+    start_time = time.perf_counter()
+    for i in range(num_projects):
+        smoke_run(projects[i % len(projects)], seconds=seconds, inputs=inputs, record_trace=True)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "projects": num_projects,
+        "virtual_seconds_each": seconds,
+        "wall_seconds": round(elapsed, 3),
+        "projects_per_minute": round(num_projects / elapsed * 60) if elapsed > 0 else None,
+    }
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="在无界面虚拟机中试运行Scratch项目")
+    parser.add_argument("project", nargs="?", help="项目JSON文件；不指定时运行吞吐量测试")
+    parser.add_argument("--seconds", type=float, default=5.0, help="虚拟运行时长")
+    parser.add_argument("--count", type=int, default=1000, help="吞吐量测试的项目数")
+    args = parser.parse_args()
+
+    if args.project:
+        with open(args.project, "r", encoding="utf-8") as f:
+            print(json.dumps(smoke_run(json.load(f), args.seconds), ensure_ascii=False, indent=2))
+    else:
+        print(benchmark(args.count, args.seconds))
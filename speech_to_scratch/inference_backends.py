@@ -0,0 +1,203 @@
+"""
+推理后端模块
+
+为BlueLM提供可选的加载方式，生产环境主要运行在CPU上：
+
+- fp32: 全精度（默认）
+- bf16: bfloat16权重，支持AVX512-BF16/AMX的CPU上更快
+- int8: 加载后对所有Linear层做动态int8量化，内存约为fp32的1/4
+- int4: 通过bitsandbytes加载4bit权重，不可用时回退到int8
+
+部署时通过环境变量 BLUELM_BACKEND 选择后端，无需修改代码。
+"""
+
+import logging
+import os
+import sys
+import time
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("fp32", "bf16", "int8", "int4")
+DEFAULT_BACKEND = "fp32"
+
+
+def get_default_backend():
+    """
+    读取部署配置的推理后端
+
+    Returns:
+        str: 后端名称
+    """
+    backend = os.environ.get("BLUELM_BACKEND", DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"未知的推理后端 {backend}，使用 {DEFAULT_BACKEND}")
+        return DEFAULT_BACKEND
+    return backend
+
+
+def resident_memory_mb():
+    """
+    获取当前进程的常驻内存（MB）
+
+    Returns:
+        float: 常驻内存，无法获取时为None
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS单位为字节，Linux为KB
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def _load_tokenizer(model_path):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_path, trust_remote_code=True, use_fast=False)
+
+
+def _load_fp(model_path, device, dtype=None):
+    from transformers import AutoModelForCausalLM
+    kwargs = {"device_map": device, "trust_remote_code": True}
+    if dtype is not None:
+        kwargs["torch_dtype"] = dtype
+    return AutoModelForCausalLM.from_pretrained(model_path, **kwargs)
+
+
+def _load_int8(model_path, device):
+    import torch
+
+    if device != "cpu":
+        logger.warning("动态int8量化只支持CPU，将在CPU上加载")
+    model = _load_fp(model_path, "cpu")
+    # 原地替换Linear层，不复制一份fp32模型，峰值内存不会翻倍
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _load_int4(model_path, device):
+    import torch
+    from transformers import AutoModelForCausalLM, BitsAndBytesConfig
+
+    quantization_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16,
+    )
+    return AutoModelForCausalLM.from_pretrained(
+        model_path,
+        device_map=device,
+        trust_remote_code=True,
+        quantization_config=quantization_config,
+    )
+
+
+def load_model(model_path, device, backend=DEFAULT_BACKEND):
+    """
+    按指定后端加载分词器和模型
+
+    Args:
+        model_path (str): 语言模型路径
+        device (str): 运行设备
+        backend (str): 推理后端，见 BACKENDS
+
+    Returns:
+        tuple: (tokenizer, model, 实际使用的后端, 实际运行设备)，int8只在CPU上运行
+    """
+    tokenizer = _load_tokenizer(model_path)
+
+    if backend == "int4":
+        try:
+            model = _load_int4(model_path, device)
+            return tokenizer, model.eval(), "int4", device
+        except Exception as e:
+            logger.warning(f"int4加载失败: {str(e)}，回退到int8")
+            backend = "int8"
+
+    if backend == "int8":
+        model = _load_int8(model_path, device)
+        device = "cpu"
+    elif backend == "bf16":
+        import torch
+        model = _load_fp(model_path, device, torch.bfloat16)
+    else:
+        backend = "fp32"
+        model = _load_fp(model_path, device)
+    return tokenizer, model.eval(), backend, device
+
+
+def benchmark_backends(model_path, backends=BACKENDS, device="cpu", max_new_tokens=64,
+                       prompt="[|Human|]:用一句话介绍Scratch。[|AI|]:"):
+    """
+    依次加载各个后端并测量加载时间、内存占用和生成速度
+
+    Args:
+        model_path (str): 语言模型路径
+        backends (tuple): 需要测试的后端
+        device (str): 运行设备
+        max_new_tokens (int): 每个后端生成的token数
+        prompt (str): 测试提示词
+
+    Returns:
+        list: 每个后端的测量结果
+    """
+    import gc
+
+    results = []
+    for backend in backends:
+        gc.collect()
+        memory_before = resident_memory_mb()
+        start_time = time.perf_counter()
+        try:
+            tokenizer, model, actual_backend, actual_device = load_model(model_path, device, backend)
+        except Exception as e:
+            logger.error(f"{backend} 后端加载失败: {str(e)}")
+            results.append({"backend": backend, "error": str(e)})
+            continue
+        load_seconds = time.perf_counter() - start_time
+        memory_after = resident_memory_mb()
+
+        inputs = tokenizer(prompt, return_tensors="pt").to(actual_device)
+        start_time = time.perf_counter()
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens, do_sample=False)
+        generate_seconds = time.perf_counter() - start_time
+        new_tokens = outputs.shape[1] - inputs["input_ids"].shape[1]
+
+        result = {
+            "backend": actual_backend,
+            "load_seconds": round(load_seconds, 2),
+            "memory_mb": round(memory_after - memory_before, 1) if memory_after and memory_before else None,
+            "tokens_per_second": round(new_tokens / generate_seconds, 2),
+        }
+        logger.info(f"后端测试结果: {result}")
+        results.append(result)
+
+        del model, tokenizer
+    return results
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="比较BlueLM各推理后端的加载时间、内存和速度")
+    parser.add_argument("--model", default="vivo-ai/BlueLM-7B-Chat", help="模型路径")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="逗号分隔的后端列表")
+    parser.add_argument("--tokens", type=int, default=64, help="每个后端生成的token数")
+    args = parser.parse_args()
+
+    for item in benchmark_backends(args.model, tuple(args.backends.split(",")), max_new_tokens=args.tokens):
+        print(item)
@@ -0,0 +1,294 @@
+"""
+项目描述的中间表示（IR）
+
+LLM输出的项目描述是松散的字典，字段类型不可靠。这里在构建项目前一次性校验并转换为
+带 __slots__ 的只读对象：ProjectIR → SpriteIR → ScriptIR → StatementIR。
+之后积木编译器直接读取属性，不再逐层 .get；脚本短语解析结果按原文缓存，相同脚本只解析一次。
+"""
+
+import logging
+import time
+from functools import lru_cache
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_NAME = "未命名项目"
+DEFAULT_SPRITE_NAME = "Sprite"
+
+
+class IRValidationError(ValueError):
+    """项目描述不符合要求"""
+
+
+class StatementIR:
+    """一个语句积木：类型、参数和C型积木的子脚本"""
+
+    __slots__ = ("kind", "args", "substack")
+
+    def __init__(self, kind, args=(), substack=None):
+        self.kind = kind
+        self.args = args
+        self.substack = substack
+
+    def to_json(self):
+        data = {"kind": self.kind, "args": list(self.args)}
+        if self.substack is not None:
+            data["substack"] = [statement.to_json() for statement in self.substack]
+        return data
+
+
+class ScriptIR:
+    """一条解析后的脚本：帽子积木和语句序列"""
+
+    __slots__ = ("source", "hat", "hat_args", "statements", "unknown_phrases")
+
+    def __init__(self, source, hat, hat_args, statements, unknown_phrases=()):
+        self.source = source
+        self.hat = hat
+        self.hat_args = hat_args
+        self.statements = statements
+        self.unknown_phrases = unknown_phrases
+
+    def to_json(self):
+        return self.source
+
+
+class SpriteIR:
+    """一个角色及其脚本"""
+
+    __slots__ = ("name", "scripts")
+
+    def __init__(self, name, scripts):
+        self.name = name
+        self.scripts = scripts
+
+    @classmethod
+    def from_description(cls, sprite_desc, path="sprite"):
+        """
+        校验角色描述并转换为IR
+
+        Args:
+            sprite_desc (dict): 角色描述
+            path (str): 出错时报告的位置
+
+        Returns:
+            SpriteIR: 角色IR
+        """
+        if isinstance(sprite_desc, SpriteIR):
+            return sprite_desc
+        if not isinstance(sprite_desc, dict):
+            raise IRValidationError(f"{path}: 角色应为对象，实际为{type(sprite_desc).__name__}")
+        name = sprite_desc.get("name")
+        name = str(name).strip() if name is not None else ""
+        scripts = _string_list(sprite_desc.get("scripts"), f"{path}.scripts")
+        return cls(name or DEFAULT_SPRITE_NAME, tuple(parse_script(script) for script in scripts))
+
+    def to_json(self):
+        return {"name": self.name, "scripts": [script.source for script in self.scripts]}
+
+
+class ProjectIR:
+    """校验后的项目描述"""
+
+    __slots__ = ("name", "sprites", "backgrounds", "events")
+
+    def __init__(self, name, sprites, backgrounds, events):
+        self.name = name
+        self.sprites = sprites
+        self.backgrounds = backgrounds
+        self.events = events
+
+    @classmethod
+    def from_description(cls, description):
+        """
+        校验项目描述并转换为IR
+
+        Args:
+            description (dict): 项目描述（LLM输出或模板）
+
+        Returns:
+            ProjectIR: 项目IR
+
+        Raises:
+            IRValidationError: 描述的结构不符合要求
+        """
+        if isinstance(description, ProjectIR):
+            return description
+        if not isinstance(description, dict):
+            raise IRValidationError(f"项目描述应为对象，实际为{type(description).__name__}")
+        sprites_desc = description.get("sprites")
+        if sprites_desc is None:
+            sprites_desc = []
+        elif not isinstance(sprites_desc, list):
+            raise IRValidationError(f"sprites: 应为列表，实际为{type(sprites_desc).__name__}")
+
+        sprites = []
+        names = set()
+        for i, sprite_desc in enumerate(sprites_desc):
+            sprites.append(unique_sprite(SpriteIR.from_description(sprite_desc, f"sprites[{i}]"), names))
+
+        name = description.get("projectName")
+        return cls(
+            str(name) if name else DEFAULT_PROJECT_NAME,
+            tuple(sprites),
+            tuple(_string_list(description.get("backgrounds"), "backgrounds")),
+            tuple(_string_list(description.get("events"), "events")),
+        )
+
+    def to_json(self):
+        """转换回项目描述字典"""
+        return {
+            "projectName": self.name,
+            "sprites": [sprite.to_json() for sprite in self.sprites],
+            "backgrounds": list(self.backgrounds),
+            "events": list(self.events),
+        }
+
+    to_description = to_json
+
+
+def unique_sprite(sprite, names):
+    """
+    保证角色名唯一（Scratch要求角色名唯一），重名时加数字后缀
+
+    Args:
+        sprite (SpriteIR): 角色IR
+        names (set): 已使用的角色名，会加入该角色的名字
+
+    Returns:
+        SpriteIR: 名字唯一的角色IR
+    """
+    if sprite.name in names:
+        base, n = sprite.name, 2
+        while f"{base}{n}" in names:
+            n += 1
+        sprite = SpriteIR(f"{base}{n}", sprite.scripts)
+    names.add(sprite.name)
+    return sprite
+
+
+def _string_list(value, path):
+    """把字段规范化为字符串列表；单个字符串视为只有一项的列表"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        raise IRValidationError(f"{path}: 应为列表，实际为{type(value).__name__}")
+    items = []
+    for i, item in enumerate(value):
+        if item is None:
+            continue
+        if isinstance(item, (dict, list)):
+            raise IRValidationError(f"{path}[{i}]: 应为字符串，实际为{type(item).__name__}")
+        items.append(item if isinstance(item, str) else str(item))
+    return items
+
+
+@lru_cache(maxsize=8192)
+def parse_script(source):
+    """
+    解析脚本短语（按原文缓存，ScriptIR只读，可在角色和项目间共享）
+
+    Args:
+        source (str): 脚本短语
+
+    Returns:
+        ScriptIR: 解析结果
+    """
+    try:
+        from speech_to_scratch.block_compiler import ScriptCompiler
+    except ImportError:
+        from block_compiler import ScriptCompiler
+    return ScriptCompiler().parse(source)
+
+
+def parse_description(description):
+    """
+    校验项目描述并转换为IR
+
+    Args:
+        description (dict): 项目描述
+
+    Returns:
+        ProjectIR: 项目IR
+    """
+    return ProjectIR.from_description(description)
+
+
+def benchmark(num_projects=2000):
+    """
+    比较直接使用字典与使用IR构建项目的吞吐量和内存
+
+    Args:
+        num_projects (int): 构建的项目数
+
+    Returns:
+        dict: 两种方式的耗时、每秒项目数、峰值内存和保留的描述所占内存
+    """
+    import json
+    import tracemalloc
+
+    try:
+        from speech_to_scratch.text_to_scratch import TextToScratchConverter
+        from speech_to_scratch.block_compiler import ScriptCompiler
+    except ImportError:
+        from text_to_scratch import TextToScratchConverter
+        from block_compiler import ScriptCompiler
+
+    converter = TextToScratchConverter(use_gpu=False, use_cache=False)
+    templates = [converter._get_default_project_template(t) for t in ("游戏", "动画", "故事", "其他")]
+    # 模拟LLM输出：每个项目都是新解析出的字典。每条脚本末尾加一句编号不同的说话积木，
+    # 使所有脚本原文互不相同，parse_script 的缓存不会命中，比较的是IR本身而不是缓存
+    counter = iter(range(1, 1 << 62))
+    raw = []
+    for i in range(num_projects):
+        description = json.loads(json.dumps(templates[i % len(templates)]))
+        for sprite_desc in description["sprites"]:
+            sprite_desc["scripts"] = [f"{script}，说[#{next(counter)}]" for script in sprite_desc["scripts"]]
+        raw.append(json.dumps(description, ensure_ascii=False))
+
+    def dict_path(text):
+        # 原来的方式：逐层 .get，每条脚本都重新解析
+        description = json.loads(text)
+        sprites = []
+        for sprite_desc in description.get("sprites", []):
+            compiler = ScriptCompiler()
+            scripts = [compiler.parse(script) for script in sprite_desc.get("scripts", [])]
+            sprites.append((sprite_desc.get("name", "Sprite"), compiler.compile(scripts)))
+        return description, sprites
+
+    def ir_path(text):
+        project = ProjectIR.from_description(json.loads(text))
+        sprites = []
+        for sprite in project.sprites:
+            sprites.append((sprite.name, ScriptCompiler().compile(sprite.scripts)))
+        return project, sprites
+
+    results = {"projects": num_projects}
+    for label, build in (("dict", dict_path), ("ir", ir_path)):
+        parse_script.cache_clear()
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        kept = [build(text)[0] for text in raw]
+        elapsed = time.perf_counter() - start_time
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        parse_script.cache_clear()
+        results[label] = {
+            "seconds": round(elapsed, 4),
+            "projects_per_second": round(num_projects / elapsed) if elapsed > 0 else None,
+            "peak_kb": round(peak / 1024),
+            "retained_kb": round(retained / 1024),
+        }
+        del kept
+    return results
+
+
+# 测试代码
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark(), ensure_ascii=False, indent=2))
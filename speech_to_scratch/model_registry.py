@@ -0,0 +1,288 @@
+"""
+语言模型注册表模块
+
+在进程内按 (model_path, device, backend) 共享已加载的模型，避免每次请求都重新执行
+``from_pretrained``。模型在第一次使用时才加载，空闲模型按LRU策略卸载。
+"""
+
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from speech_to_scratch.inference_backends import load_model, resident_memory_mb, DEFAULT_BACKEND
+except ImportError:
+    from inference_backends import load_model, resident_memory_mb, DEFAULT_BACKEND
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_bluelm(model_path, device, backend=DEFAULT_BACKEND):
+    """
+    默认的模型加载函数
+
+    Args:
+        model_path (str): 语言模型路径
+        device (str): 运行设备，如"cpu"或"cuda:0"
+        backend (str): 推理后端，如"fp32"、"int8"、"int4"
+
+    Returns:
+        tuple: (tokenizer, model, 实际使用的后端, 实际运行设备)
+    """
+    return load_model(model_path, device, backend)
+
+
+class ModelHandle:
+    """共享模型句柄，多个转换器可以同时持有同一个句柄"""
+
+    def __init__(self, registry, model_path, device, loader, backend=DEFAULT_BACKEND):
+        """
+        初始化模型句柄（不会立即加载模型）
+
+        Args:
+            registry (ModelRegistry): 所属注册表
+            model_path (str): 语言模型路径
+            device (str): 运行设备
+            loader (callable): 加载函数，返回 (tokenizer, model[, 实际后端[, 实际设备]])
+            backend (str): 推理后端
+        """
+        self.registry = registry
+        self.model_path = model_path
+        self.device = device
+        self.backend = backend
+        self.active_backend = None
+        self.active_device = None
+        self.key = (model_path, device, backend)
+        self._loader = loader
+        self._lock = threading.Lock()
+        # 同一个模型不能并发调用 generate（共享分词器和前缀KV缓存），批处理、流式和直接生成都持有该锁
+        self.generate_lock = threading.Lock()
+        self.tokenizer = None
+        self.model = None
+        self.load_failed = False
+        # 固定提示词前缀的KV缓存，随模型一起释放
+        self.prefix_states = {}
+        self.last_used = 0.0
+        self.load_count = 0
+        # 性能指标
+        self.load_seconds = None
+        self.memory_mb = None
+        self._generated_tokens = 0
+        self._generate_seconds = 0.0
+
+    @property
+    def input_device(self):
+        """模型输入应放置的设备（模型实际运行的设备，如int8后端总在CPU上）"""
+        return self.active_device or self.device
+
+    @property
+    def is_loaded(self):
+        """模型是否已加载"""
+        return self.model is not None and self.tokenizer is not None
+
+    def acquire(self):
+        """
+        获取模型，首次调用时加载
+
+        Returns:
+            tuple: (tokenizer, model)，加载失败时为 (None, None)
+        """
+        with self._lock:
+            self.last_used = time.monotonic()
+            if not self.is_loaded and not self.load_failed:
+                self._load()
+            tokenizer, model = self.tokenizer, self.model
+        self.registry._touch(self)
+        return tokenizer, model
+
+    @property
+    def tokens_per_second(self):
+        """累计生成速度（tokens/秒）"""
+        if self._generate_seconds <= 0:
+            return None
+        return self._generated_tokens / self._generate_seconds
+
+    def record_generation(self, generated_tokens, seconds):
+        """
+        记录一次生成的token数和耗时
+
+        Args:
+            generated_tokens (int): 生成的token数
+            seconds (float): 耗时（秒）
+        """
+        with self._lock:
+            self._generated_tokens += generated_tokens
+            self._generate_seconds += seconds
+
+    def _load(self):
+        """加载模型（调用方需持有锁）"""
+        logger.info(f"加载语言模型: {self.model_path} ({self.device}, {self.backend})")
+        memory_before = resident_memory_mb()
+        start_time = time.perf_counter()
+        try:
+            result = self._loader(self.model_path, self.device, self.backend)
+            self.tokenizer, self.model = result[0], result[1]
+            self.active_backend = result[2] if len(result) > 2 else self.backend
+            self.active_device = result[3] if len(result) > 3 else self.device
+            self.load_count += 1
+            self.load_seconds = time.perf_counter() - start_time
+            memory_after = resident_memory_mb()
+            if memory_before is not None and memory_after is not None:
+                self.memory_mb = memory_after - memory_before
+            logger.info(f"模型加载成功 ({self.active_backend}, {self.active_device})，耗时 {self.load_seconds:.1f} 秒，"
+                        f"内存增加 {self.memory_mb or 0:.0f} MB")
+        except Exception as e:
+            logger.error(f"模型加载失败: {str(e)}")
+            self.tokenizer = None
+            self.model = None
+            # 加载失败后不再重复尝试，直到显式reset
+            self.load_failed = True
+
+    def unload(self):
+        """卸载模型，释放内存；下次acquire时会重新加载"""
+        with self._lock:
+            if not self.is_loaded:
+                return
+            logger.info(f"卸载语言模型: {self.model_path} ({self.device})")
+            self.tokenizer = None
+            self.model = None
+            self.prefix_states = {}
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def reset(self):
+        """清除加载失败标记，允许重新尝试加载"""
+        with self._lock:
+            self.load_failed = False
+
+
+class ModelRegistry:
+    """进程级模型注册表，按 (model_path, device, backend) 缓存模型句柄"""
+
+    def __init__(self, max_loaded=1, idle_timeout=None, loader=load_bluelm):
+        """
+        初始化注册表
+
+        Args:
+            max_loaded (int): 同时驻留内存的最大模型数，超出时卸载最久未使用的模型
+            idle_timeout (float): 空闲超过该秒数的模型会被unload_idle卸载，None表示不按时间卸载
+            loader (callable): 模型加载函数
+        """
+        self.max_loaded = max_loaded
+        self.idle_timeout = idle_timeout
+        self.loader = loader
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_path, device="cpu", backend=DEFAULT_BACKEND):
+        """
+        获取共享模型句柄（懒加载）
+
+        Args:
+            model_path (str): 语言模型路径
+            device (str): 运行设备
+            backend (str): 推理后端
+
+        Returns:
+            ModelHandle: 模型句柄
+        """
+        key = (model_path, device, backend)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = ModelHandle(self, model_path, device, self.loader, backend)
+                self._handles[key] = handle
+            return handle
+
+    def _touch(self, handle):
+        """将句柄标记为最近使用，并按LRU策略卸载多余模型"""
+        with self._lock:
+            if handle.key in self._handles:
+                self._handles.move_to_end(handle.key)
+            loaded = [h for h in self._handles.values() if h.is_loaded and h is not handle]
+            overflow = len(loaded) + (1 if handle.is_loaded else 0) - self.max_loaded
+            victims = loaded[:max(overflow, 0)]
+        for victim in victims:
+            victim.unload()
+
+    def unload_idle(self, idle_timeout=None):
+        """
+        卸载空闲超时的模型
+
+        Args:
+            idle_timeout (float): 空闲秒数阈值，默认使用注册表配置
+
+        Returns:
+            int: 卸载的模型数量
+        """
+        idle_timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+        if idle_timeout is None:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            victims = [h for h in self._handles.values()
+                       if h.is_loaded and now - h.last_used > idle_timeout]
+        for victim in victims:
+            victim.unload()
+        return len(victims)
+
+    def unload_all(self):
+        """卸载所有模型"""
+        with self._lock:
+            handles = list(self._handles.values())
+        for handle in handles:
+            handle.unload()
+
+    def stats(self):
+        """
+        获取注册表状态
+
+        Returns:
+            list: 每个句柄的状态信息
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "model_path": h.model_path,
+                    "device": h.active_device or h.device,
+                    "backend": h.active_backend or h.backend,
+                    "loaded": h.is_loaded,
+                    "load_failed": h.load_failed,
+                    "load_count": h.load_count,
+                    "idle_seconds": round(now - h.last_used, 1) if h.last_used else None,
+                    "load_seconds": round(h.load_seconds, 2) if h.load_seconds is not None else None,
+                    "memory_mb": round(h.memory_mb, 1) if h.memory_mb is not None else None,
+                    "tokens_per_second": round(h.tokens_per_second, 2) if h.tokens_per_second else None
+                }
+                for h in self._handles.values()
+            ]
+
+
+# 进程级默认注册表
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    获取进程级默认模型注册表
+
+    Returns:
+        ModelRegistry: 默认注册表
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
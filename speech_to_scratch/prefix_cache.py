@@ -0,0 +1,142 @@
+"""
+提示词前缀KV缓存模块
+
+生成项目描述的提示词由一段固定的说明文字和很短的用户输入组成。
+固定前缀的 past_key_values 在每个已加载模型上只计算一次，
+之后每次生成都从缓存状态开始，只需编码用户输入部分，缩短首token延迟。
+"""
+
+import logging
+import threading
+import time
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_prefix_lock = threading.Lock()
+
+
+class PrefixState:
+    """一段固定前缀的token和对应的KV缓存"""
+
+    __slots__ = ("token_ids", "past_key_values")
+
+    def __init__(self, token_ids, past_key_values):
+        self.token_ids = token_ids
+        self.past_key_values = past_key_values
+
+    @property
+    def length(self):
+        """前缀的token数"""
+        return len(self.token_ids)
+
+
+def _to_legacy_cache(past_key_values):
+    """统一转换为 ((key, value), ...) 形式，便于按批扩展"""
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def _expand_cache(past_key_values, batch_size):
+    """把批大小为1的KV缓存扩展为batch_size（共享底层存储，不复制）"""
+    return tuple(
+        tuple(tensor.expand(batch_size, *tensor.shape[1:]) for tensor in layer)
+        for layer in past_key_values
+    )
+
+
+def get_prefix_state(model_handle, tokenizer, model, prefix_text):
+    """
+    获取固定前缀的KV缓存，每个已加载模型只计算一次
+
+    缓存保存在模型句柄上，模型被卸载时一并释放。
+
+    Args:
+        model_handle (ModelHandle): 共享模型句柄
+        tokenizer: 分词器
+        model: 语言模型
+        prefix_text (str): 固定前缀文本
+
+    Returns:
+        PrefixState: 前缀状态
+    """
+    import torch
+
+    with _prefix_lock:
+        state = model_handle.prefix_states.get(prefix_text)
+        if state is not None:
+            return state
+
+        start_time = time.perf_counter()
+        token_ids = tokenizer(prefix_text)["input_ids"]
+        input_ids = torch.tensor([token_ids], device=model_handle.input_device)
+        with torch.no_grad():
+            outputs = model(input_ids=input_ids, use_cache=True)
+        state = PrefixState(token_ids, _to_legacy_cache(outputs.past_key_values))
+        model_handle.prefix_states[prefix_text] = state
+        logger.info(f"已缓存提示词前缀KV: {state.length} tokens，耗时 {time.perf_counter() - start_time:.2f} 秒")
+        return state
+
+
+def build_generation_inputs(model_handle, tokenizer, model, prompts, use_prefix_cache=True):
+    """
+    构建 model.generate 的输入
+
+    当一批提示词共享同一个前缀时，输入排布为 [前缀][左填充][后缀]，
+    前缀部分直接复用KV缓存；后缀除最后一个token外也预先写入缓存，
+    这样无论模型的 prepare_inputs_for_generation 如何截断输入，都只会处理最后一个token。
+
+    Args:
+        model_handle (ModelHandle): 共享模型句柄
+        tokenizer: 分词器
+        model: 语言模型
+        prompts (list): (前缀, 后缀) 元组列表
+        use_prefix_cache (bool): 是否复用前缀KV缓存
+
+    Returns:
+        dict: input_ids、attention_mask，以及可选的 past_key_values
+    """
+    import torch
+
+    device = model_handle.input_device
+    prefixes = {prefix for prefix, _ in prompts}
+    if not use_prefix_cache or len(prefixes) != 1 or not next(iter(prefixes)):
+        texts = [prefix + suffix for prefix, suffix in prompts]
+        return dict(tokenizer(texts, return_tensors="pt", padding=True).to(device))
+
+    state = get_prefix_state(model_handle, tokenizer, model, next(iter(prefixes)))
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    suffix_ids = [tokenizer(suffix, add_special_tokens=False)["input_ids"] for _, suffix in prompts]
+    max_length = max(len(ids) for ids in suffix_ids)
+    rows = []
+    masks = []
+    for ids in suffix_ids:
+        padding = max_length - len(ids)
+        rows.append(state.token_ids + [pad_token_id] * padding + ids)
+        masks.append([1] * state.length + [0] * padding + [1] * len(ids))
+
+    input_ids = torch.tensor(rows, device=device)
+    attention_mask = torch.tensor(masks, device=device)
+    past_key_values = _expand_cache(state.past_key_values, len(prompts))
+
+    if max_length > 1:
+        # 预先编码后缀（除最后一个token），填充位置由attention_mask屏蔽
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        with torch.no_grad():
+            outputs = model(
+                input_ids=input_ids[:, state.length:-1],
+                attention_mask=attention_mask[:, :-1],
+                position_ids=position_ids[:, state.length:-1],
+                past_key_values=past_key_values,
+                use_cache=True,
+            )
+        past_key_values = outputs.past_key_values
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "past_key_values": past_key_values,
+    }
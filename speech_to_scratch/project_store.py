@@ -0,0 +1,356 @@
+"""
+内容寻址的项目存储模块
+
+生成的Scratch项目按规范化JSON的SHA-256保存一次，之后只通过哈希引用。
+相同内容的项目得到相同的哈希，哈希对应的内容永远不变，因此可以作为ETag并被客户端长期缓存。
+生成项目时使用的项目描述也随项目保存，编辑项目时据此判断哪些角色发生了变化。
+磁盘上的项目总大小超过上限时按最近使用时间淘汰，被淘汰的哈希之后按不存在处理。
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    from speech_to_scratch import serializer
+except ImportError:
+    import serializer
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 默认磁盘目录
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp", "projects")
+DEFAULT_MAX_DISK_BYTES = int(os.environ.get("PROJECT_STORE_MAX_MB", "256")) * 1024 * 1024
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def canonical_bytes(project):
+    """
+    项目的规范化JSON（紧凑、键排序），同一内容总是得到相同的字节
+
+    Args:
+        project (dict): Scratch项目
+
+    Returns:
+        bytes: 规范化JSON
+    """
+    if serializer.orjson_available:
+        return serializer.orjson.dumps(project, default=serializer._default, option=serializer.orjson.OPT_SORT_KEYS)
+    return serializer.json.dumps(project, ensure_ascii=False, separators=(",", ":"), sort_keys=True,
+                                 default=serializer._default).encode("utf-8")
+
+
+def project_hash(project):
+    """
+    计算项目的内容哈希
+
+    Args:
+        project (dict): Scratch项目
+
+    Returns:
+        str: 十六进制SHA-256
+    """
+    return hashlib.sha256(canonical_bytes(project)).hexdigest()
+
+
+def is_project_hash(value):
+    """检查字符串是否是合法的项目哈希（同时防止路径穿越）"""
+    return isinstance(value, str) and bool(_HASH_RE.match(value))
+
+
+def project_metadata(project):
+    """
+    提取项目元数据
+
+    Args:
+        project (dict): Scratch项目
+
+    Returns:
+        dict: 角色数、角色名和积木数
+    """
+    sprites = [target for target in project.get("targets", []) if not target.get("isStage", False)]
+    return {
+        "sprite_count": len(sprites),
+        "sprite_names": [sprite.get("name") for sprite in sprites],
+        "block_count": sum(len(target.get("blocks", {})) for target in project.get("targets", [])),
+    }
+
+
+class ProjectStore:
+    """按内容哈希保存项目（内存LRU + 磁盘）"""
+
+    def __init__(self, max_memory_entries=128, store_dir=DEFAULT_STORE_DIR, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        初始化项目存储
+
+        Args:
+            max_memory_entries (int): 内存中保留的项目数
+            store_dir (str): 磁盘目录，None表示只保存在内存中
+            max_disk_bytes (int): 磁盘上项目和项目描述的总大小上限
+        """
+        self.max_memory_entries = max_memory_entries
+        self.store_dir = store_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._descriptions = OrderedDict()
+        self._lock = threading.Lock()
+        # 哈希 -> 磁盘上项目和项目描述的字节数，按最近使用时间排序（最旧的在前）
+        self._disk_entries = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """扫描磁盘目录，按修改时间（即最近使用时间）重建索引"""
+        if not self.store_dir:
+            return
+        sizes = {}
+        used_at = {}
+        try:
+            with os.scandir(self.store_dir) as it:
+                for item in it:
+                    digest = item.name.split(".", 1)[0]
+                    if not item.name.endswith(".json") or not is_project_hash(digest) or not item.is_file():
+                        continue
+                    stat = item.stat()
+                    sizes[digest] = sizes.get(digest, 0) + stat.st_size
+                    used_at[digest] = max(used_at.get(digest, 0), stat.st_mtime_ns)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"读取项目存储目录失败: {str(e)}")
+            return
+        for digest in sorted(sizes, key=used_at.get):
+            self._disk_entries[digest] = sizes[digest]
+            self._disk_bytes += sizes[digest]
+
+    def path_for(self, digest):
+        """
+        项目在磁盘上的路径
+
+        Args:
+            digest (str): 项目哈希
+
+        Returns:
+            str: 文件路径，未启用磁盘存储时为None
+        """
+        if not self.store_dir or not is_project_hash(digest):
+            return None
+        return os.path.join(self.store_dir, f"{digest}.json")
+
+    def put(self, project, description=None):
+        """
+        保存项目
+
+        Args:
+            project (dict): Scratch项目
+            description (dict): 生成该项目的项目描述（可选）
+
+        Returns:
+            str: 项目哈希
+        """
+        data = canonical_bytes(project)
+        digest = hashlib.sha256(data).hexdigest()
+        self._remember(self._memory, digest, data)
+        self._write(self.path_for(digest), data)
+
+        if description is not None:
+            description_data = canonical_bytes(description)
+            self._remember(self._descriptions, digest, description_data)
+            self._write(self._description_path(digest), description_data)
+        self._track(digest)
+        return digest
+
+    def _description_path(self, digest):
+        path = self.path_for(digest)
+        return path[:-len(".json")] + ".desc.json" if path else None
+
+    def _write(self, path, data):
+        """原子写入文件，文件已存在时跳过（内容由哈希决定，不会变化）"""
+        if not path or os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"保存项目失败: {str(e)}")
+
+    def _track(self, digest):
+        """更新项目在磁盘索引中的大小和最近使用时间，超出上限时淘汰最久未使用的项目"""
+        if not self.store_dir:
+            return
+        size = 0
+        for path in (self.path_for(digest), self._description_path(digest)):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes += size - self._disk_entries.pop(digest, 0)
+            self._disk_entries[digest] = size
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """淘汰最久未使用的项目，直到总大小不超过上限（至少保留最新的一个，调用方需持有锁）"""
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_entries) > 1:
+            digest, size = self._disk_entries.popitem(last=False)
+            self._disk_bytes -= size
+            self.evictions += 1
+            self._memory.pop(digest, None)
+            self._descriptions.pop(digest, None)
+            for path in (self.path_for(digest), self._description_path(digest)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remember(self, entries, digest, data):
+        with self._lock:
+            entries[digest] = data
+            entries.move_to_end(digest)
+            while len(entries) > self.max_memory_entries:
+                entries.popitem(last=False)
+
+    def get_bytes(self, digest):
+        """
+        读取项目的规范化JSON
+
+        Args:
+            digest (str): 项目哈希
+
+        Returns:
+            bytes: 项目JSON，不存在时为None
+        """
+        if not is_project_hash(digest):
+            return None
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                if digest in self._disk_entries:
+                    self._disk_entries.move_to_end(digest)
+                self.hits += 1
+                return data
+
+        path = self.path_for(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 更新修改时间，作为其它进程重建索引时的最近使用时间
+            os.utime(path)
+        except (OSError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        self._remember(self._memory, digest, data)
+        self._track(digest)
+        return data
+
+    def get(self, digest):
+        """
+        读取项目
+
+        Args:
+            digest (str): 项目哈希
+
+        Returns:
+            dict: Scratch项目，不存在时为None
+        """
+        data = self.get_bytes(digest)
+        return serializer.loads(data) if data is not None else None
+
+    def get_description(self, digest):
+        """
+        读取生成项目时使用的项目描述
+
+        Args:
+            digest (str): 项目哈希
+
+        Returns:
+            dict: 项目描述，未保存时为None
+        """
+        if not is_project_hash(digest):
+            return None
+        with self._lock:
+            data = self._descriptions.get(digest)
+        if data is None:
+            path = self._description_path(digest)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except (OSError, TypeError):
+                return None
+            self._remember(self._descriptions, digest, data)
+        return serializer.loads(data)
+
+    def contains(self, digest):
+        """
+        检查项目是否存在（不读取内容，不计入命中统计）
+
+        Args:
+            digest (str): 项目哈希
+
+        Returns:
+            bool: 是否存在
+        """
+        if not is_project_hash(digest):
+            return False
+        with self._lock:
+            if digest in self._memory:
+                return True
+        path = self.path_for(digest)
+        return path is not None and os.path.exists(path)
+
+    def __contains__(self, digest):
+        return self.get_bytes(digest) is not None
+
+    def stats(self):
+        """
+        获取存储状态
+
+        Returns:
+            dict: 命中次数、未命中次数、内存中的项目数和磁盘占用
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "evictions": self.evictions,
+            }
+
+
+# 进程级默认项目存储
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_project_store():
+    """
+    获取进程级默认项目存储
+
+    Returns:
+        ProjectStore: 默认项目存储
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ProjectStore()
+        return _default_store
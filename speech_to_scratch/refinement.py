@@ -0,0 +1,206 @@
+"""
+模板优先的快速生成模块
+
+convert 的快速模式：立即返回基于默认模板生成的项目（版本1），
+同时在后台调用LLM生成项目描述，完成后发布精修版本（版本2）。
+客户端可以轮询，或者带着已有版本号长轮询等待新版本。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_REFINING = "refining"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class RefinementJob:
+    """一次快速生成任务及其最新版本的项目"""
+
+    __slots__ = ("job_id", "text", "version", "status", "project", "refined", "error", "created_at", "updated_at")
+
+    def __init__(self, job_id, text, project, status):
+        self.job_id = job_id
+        self.text = text
+        self.version = 1
+        self.status = status
+        self.project = project
+        self.refined = False
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def version_token(self):
+        """版本令牌，格式为 "任务ID:版本号" """
+        return f"{self.job_id}:{self.version}"
+
+    def snapshot(self):
+        """
+        获取任务当前状态
+
+        Returns:
+            dict: 任务状态和最新项目
+        """
+        return {
+            "job_id": self.job_id,
+            "version": self.version,
+            "version_token": self.version_token,
+            "status": self.status,
+            "refined": self.refined,
+            "error": self.error,
+            "project": self.project,
+        }
+
+
+def parse_version_token(token):
+    """
+    解析版本令牌或版本号
+
+    Args:
+        token: "任务ID:版本号"、版本号字符串或整数
+
+    Returns:
+        int: 版本号，无法解析时为0
+    """
+    if token is None:
+        return 0
+    try:
+        return int(str(token).rsplit(":", 1)[-1])
+    except ValueError:
+        return 0
+
+
+class RefinementManager:
+    """管理快速生成任务和后台LLM精修"""
+
+    def __init__(self, converter, max_workers=2, max_jobs=1000):
+        """
+        初始化管理器
+
+        Args:
+            converter (TextToScratchConverter): 用于生成项目的转换器
+            max_workers (int): 后台精修线程数
+            max_jobs (int): 最多保留的任务数，超出时丢弃最早的已完成任务
+        """
+        self.converter = converter
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refine")
+        self._jobs = OrderedDict()
+        self._condition = threading.Condition()
+
+    def submit(self, text):
+        """
+        立即生成模板项目，并在后台启动LLM精修
+
+        Args:
+            text (str): 自然语言描述
+
+        Returns:
+            dict: 任务快照，包含版本1的项目和版本令牌
+        """
+        converter = self.converter
+        job_id = uuid.uuid4().hex[:12]
+
+        # 缓存命中时直接得到最终版本
+        cached = converter._cached_description(text)
+        if cached is not None:
+            job = RefinementJob(job_id, text, converter._create_scratch_project(cached), STATUS_DONE)
+            job.refined = True
+            return self._add_job(job).snapshot()
+
+        project = converter._create_scratch_project(converter._get_default_project_template(text))
+        handle = converter.model_handle
+        model_unavailable = converter.using_simulation or handle is None or handle.load_failed
+        job = RefinementJob(job_id, text, project, STATUS_DONE if model_unavailable else STATUS_REFINING)
+        self._add_job(job)
+
+        if not model_unavailable:
+            self._executor.submit(self._refine, job)
+        return job.snapshot()
+
+    def _add_job(self, job):
+        """登记任务并淘汰多余的已完成任务"""
+        with self._condition:
+            self._jobs[job.job_id] = job
+            if len(self._jobs) > self.max_jobs:
+                for old_id in [k for k, v in self._jobs.items() if v.status != STATUS_REFINING]:
+                    if len(self._jobs) <= self.max_jobs:
+                        break
+                    del self._jobs[old_id]
+        return job
+
+    def _refine(self, job):
+        """后台调用LLM生成项目描述并发布新版本"""
+        start_time = time.perf_counter()
+        try:
+            description = self.converter._generate_refined_description(job.text)
+            project = self.converter._create_scratch_project(description) if description is not None else None
+            error = None
+        except Exception as e:
+            logger.error(f"后台精修失败: {str(e)}")
+            project = None
+            error = str(e)
+
+        with self._condition:
+            if project is not None:
+                job.project = project
+                job.version += 1
+                job.refined = True
+                job.status = STATUS_DONE
+            else:
+                # LLM不可用或生成失败时保留模板版本
+                job.status = STATUS_FAILED if error else STATUS_DONE
+                job.error = error
+            job.updated_at = time.time()
+            self._condition.notify_all()
+        logger.info(f"任务 {job.job_id} 精修结束（版本 {job.version}），耗时 {time.perf_counter() - start_time:.1f} 秒")
+
+    def get(self, job_id):
+        """
+        获取任务当前状态
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            dict: 任务快照，不存在时为None
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def wait(self, job_id, after_version=0, timeout=30):
+        """
+        等待任务发布比 after_version 更新的版本或结束（长轮询）
+
+        Args:
+            job_id (str): 任务ID
+            after_version: 客户端已有的版本号或版本令牌
+            timeout (float): 最长等待秒数
+
+        Returns:
+            dict: 任务快照，不存在时为None
+        """
+        after_version = parse_version_token(after_version)
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job.version > after_version or job.status != STATUS_REFINING:
+                    return job.snapshot()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job.snapshot()
+                self._condition.wait(remaining)
@@ -0,0 +1,288 @@
+"""
+项目描述结果缓存模块
+
+以“规范化输入文本 + 模型 + 推理后端 + 解码设置 + 提示词版本”为键缓存LLM生成的项目描述。
+缓存分两层：进程内LRU内存缓存，以及重启后依然有效的磁盘缓存。条目以只读的 ProjectIR 保存，
+从磁盘读取时重新校验，不合格的条目删除并按未命中处理。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+
+try:
+    from speech_to_scratch.ir import ProjectIR, IRValidationError
+except ImportError:
+    from ir import ProjectIR, IRValidationError
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 默认磁盘缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp", "description_cache")
+
+
+def normalize_text(text):
+    """
+    规范化输入文本，使仅有空白、全半角或大小写差异的输入命中同一缓存
+
+    Args:
+        text (str): 原始输入
+
+    Returns:
+        str: 规范化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    # 去掉结尾的标点，"做个游戏。" 与 "做个游戏" 视为相同
+    return text.rstrip("。.!！?？")
+
+
+def make_cache_key(text, model_path, prompt_version, backend=None, json_mode=True, constrain_schema=True):
+    """
+    生成缓存键
+
+    不同推理后端（量化会改变输出）和解码约束生成的描述不同，分别缓存。
+
+    Args:
+        text (str): 用户输入文本
+        model_path (str): 模型路径
+        prompt_version (str): 提示词版本
+        backend (str): 推理后端
+        json_mode (bool): 是否在顶层JSON对象闭合后停止生成
+        constrain_schema (bool): 是否启用键约束
+
+    Returns:
+        str: 十六进制SHA-256缓存键
+    """
+    decoding = f"json={int(bool(json_mode))},schema={int(bool(constrain_schema))}"
+    raw = "\x1f".join([normalize_text(text), model_path, str(prompt_version), str(backend), decoding])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DescriptionCache:
+    """两级（内存LRU + 磁盘）项目描述缓存"""
+
+    def __init__(self, max_memory_entries=256, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=50 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_memory_entries (int): 内存层最多保存的条目数
+            cache_dir (str): 磁盘缓存目录，None表示只使用内存缓存
+            max_disk_bytes (int): 磁盘层占用的最大字节数，超出时淘汰最久未使用的条目
+        """
+        self.max_memory_entries = max_memory_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk_bytes = 0
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._disk_bytes = sum(size for _, _, size in self._scan_disk())
+            except OSError as e:
+                logger.error(f"创建缓存目录失败: {str(e)}，将只使用内存缓存")
+                self.cache_dir = None
+
+    def _path_for(self, key):
+        """缓存条目对应的磁盘文件路径"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _scan_disk(self):
+        """
+        列出磁盘缓存条目
+
+        Returns:
+            list: (最后使用时间, 路径, 字节数) 列表
+        """
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key):
+        """
+        查询缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            ProjectIR: 项目描述（只读，可直接共享），未命中时为None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        project_ir = self._read_disk(key)
+        with self._lock:
+            if project_ir is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, project_ir)
+        return project_ir
+
+    def put(self, key, description):
+        """
+        写入缓存
+
+        Args:
+            key (str): 缓存键
+            description (ProjectIR): 项目描述，也可以是描述字典（写入前校验）
+
+        Raises:
+            IRValidationError: 描述字典不符合要求
+        """
+        project_ir = ProjectIR.from_description(description)
+        with self._lock:
+            self._remember(key, project_ir)
+        self._write_disk(key, project_ir.to_json())
+
+    def _remember(self, key, description):
+        """写入内存层并执行LRU淘汰（调用方需持有锁）"""
+        self._memory[key] = description
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        """从磁盘层读取条目并校验，不合格的条目会被删除"""
+        if not self.cache_dir:
+            return None
+        path = self._path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                project_ir = ProjectIR.from_description(json.load(f))
+            # 更新修改时间作为LRU的最近使用时间
+            os.utime(path, None)
+            return project_ir
+        except FileNotFoundError:
+            return None
+        except (ValueError, IRValidationError) as e:
+            # 损坏或由旧版本写入的条目，删除后重新生成
+            logger.warning(f"缓存条目不符合要求，已删除: {str(e)}")
+            self._remove_disk(path)
+            return None
+        except Exception as e:
+            logger.warning(f"读取缓存条目失败: {str(e)}")
+            return None
+
+    def _remove_disk(self, path):
+        """删除一个磁盘条目并更新占用字节数"""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+
+    def _write_disk(self, key, description):
+        """原子写入磁盘层，并在超出容量时淘汰旧条目"""
+        if not self.cache_dir:
+            return
+        path = self._path_for(key)
+        try:
+            data = json.dumps(description, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            with self._lock:
+                self._disk_bytes += len(data) - old_size
+                over_limit = self._disk_bytes > self.max_disk_bytes
+            if over_limit:
+                self._evict_disk()
+        except Exception as e:
+            logger.warning(f"写入缓存条目失败: {str(e)}")
+
+    def _evict_disk(self):
+        """按最近使用时间淘汰磁盘条目，直到总大小不超过上限"""
+        entries = sorted(self._scan_disk())
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, path, size in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += removed
+
+    def clear(self):
+        """清空两级缓存"""
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir:
+            for _, path, _ in self._scan_disk():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_bytes = 0
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中、未命中、淘汰次数和容量信息
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+# 进程级默认缓存
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_description_cache():
+    """
+    获取进程级默认描述缓存
+
+    Returns:
+        DescriptionCache: 默认缓存
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DescriptionCache()
+        return _default_cache
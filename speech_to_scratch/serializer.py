@@ -0,0 +1,445 @@
+"""
+Scratch项目序列化模块
+
+- 紧凑JSON：不缩进、不加多余空格，安装了orjson时自动使用orjson
+- .sb3：把project.json和造型、声音资源直接流式写入zip，
+  目标可以是文件路径，也可以是任何可写的文件对象（包括不可seek的socket流）。
+  资源从按md5去重的资源存储中读取，每个不同的资源只写入一次。
+- 流式写出：project.json按目标和积木逐块生成，很大的项目也不需要在内存中拼出整个文档
+"""
+
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+try:
+    from speech_to_scratch.asset_store import get_asset_store
+except ImportError:
+    from asset_store import get_asset_store
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SB3_MIMETYPE = "application/x.scratch.sb3"
+
+# 流式写出时每个数据块的大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 资源存储中没有对应数据时（如旧项目引用的Scratch资源库assetId）使用的占位造型
+_PLACEHOLDER_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="2" height="2" viewBox="0 0 2 2">'
+    b'<rect width="2" height="2" fill="none"/></svg>'
+)
+
+
+def _default(value):
+    """序列化中间表示（ir模块中带to_json的对象）"""
+    to_json = getattr(value, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_json()
+
+
+def dumps(project, compact=True, use_orjson=None):
+    """
+    把项目序列化为UTF-8编码的JSON
+
+    Args:
+        project (dict): Scratch项目，也可以包含ProjectIR等中间表示对象
+        compact (bool): 是否使用紧凑格式，False时缩进2格
+        use_orjson (bool): 是否使用orjson，None表示可用时使用
+
+    Returns:
+        bytes: JSON数据
+    """
+    if use_orjson is None:
+        use_orjson = orjson_available
+    if use_orjson:
+        return orjson.dumps(project, default=_default, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(project, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+    return json.dumps(project, ensure_ascii=False, indent=2, default=_default).encode("utf-8")
+
+
+def loads(data):
+    """
+    解析JSON数据
+
+    Args:
+        data (bytes|str): JSON数据
+
+    Returns:
+        dict: Scratch项目
+    """
+    if orjson_available:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_json(project, target, compact=True):
+    """
+    写出project.json
+
+    Args:
+        project (dict): Scratch项目
+        target (str|file): 文件路径或二进制文件对象
+        compact (bool): 是否使用紧凑格式
+
+    Returns:
+        int: 写入的字节数
+    """
+    data = dumps(project, compact)
+    if hasattr(target, "write"):
+        target.write(data)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+    return len(data)
+
+
+def iter_json(project, chunk_size=STREAM_CHUNK_SIZE, on_target=None):
+    """
+    以数据块的形式流式生成紧凑的project.json，不在内存中拼出整个文档
+
+    project["targets"] 可以是任意可迭代对象（如生成器），每个目标的 "blocks" 可以是字典，
+    也可以是 (积木ID, 积木) 的可迭代对象。配合 TextToScratchConverter.iter_scratch_project
+    使用时，内存占用只取决于单条脚本和数据块的大小，与项目的积木总数无关。
+
+    Args:
+        project (dict): Scratch项目
+        chunk_size (int): 数据块大约的字节数
+        on_target (callable): 每个目标开始写出时调用，参数为目标字典
+
+    Yields:
+        bytes: JSON数据块
+    """
+    buffer = bytearray(b'{"targets":[')
+    for i, target in enumerate(project.get("targets", [])):
+        if on_target is not None:
+            on_target(target)
+        buffer += b'{' if i == 0 else b',{'
+        for key, value in target.items():
+            if key != "blocks":
+                buffer += dumps(key) + b':' + dumps(value) + b','
+        buffer += b'"blocks":{'
+        blocks = target.get("blocks", {})
+        for j, (block_id, block) in enumerate(blocks.items() if isinstance(blocks, dict) else blocks):
+            if j:
+                buffer += b','
+            buffer += dumps(block_id) + b':' + dumps(block)
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b'}}'
+    buffer += b']'
+    for key, value in project.items():
+        if key != "targets":
+            buffer += b',' + dumps(key) + b':' + dumps(value)
+    buffer += b'}'
+    yield bytes(buffer)
+
+
+def write_json_stream(project, target, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    流式写出project.json
+
+    Args:
+        project (dict): Scratch项目，targets和blocks可以是生成器（见iter_json）
+        target (str|file): 文件路径或二进制文件对象
+        chunk_size (int): 数据块大约的字节数
+
+    Returns:
+        int: 写入的字节数
+    """
+    size = 0
+    if hasattr(target, "write"):
+        for chunk in iter_json(project, chunk_size):
+            target.write(chunk)
+            size += len(chunk)
+        return size
+
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    with open(target, "wb") as f:
+        for chunk in iter_json(project, chunk_size):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def _default_asset_loader(md5ext):
+    """默认资源加载：从资源存储读取，存储中没有的SVG造型使用占位图"""
+    data = get_asset_store().get(md5ext)
+    if data is None and md5ext.endswith(".svg"):
+        return _PLACEHOLDER_SVG
+    return data
+
+
+def write_sb3(project, target, asset_loader=None, compact=True, asset_key=None):
+    """
+    把项目写成.sb3文件
+
+    project.json和资源逐块写入zip，不会在内存中拼出整个文件；target不可seek时zipfile会自动使用数据描述符。
+
+    Args:
+        project (dict): Scratch项目，targets和blocks可以是生成器（见iter_json）
+        target (str|file): 文件路径或二进制文件对象
+        asset_loader (callable): md5ext -> bytes，返回None表示缺少该资源
+        compact (bool): project.json是否使用紧凑格式
+        asset_key (str): 资源清单的缓存键（如项目哈希）
+
+    Returns:
+        list: 缺失而未写入的资源文件名
+    """
+    asset_loader = asset_loader or _default_asset_loader
+    if not hasattr(target, "write"):
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+
+    missing = []
+    targets = []
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for _ in _write_project_json(archive, project, compact, targets):
+            pass
+        for md5ext in _project_assets(project, asset_key, targets):
+            data = asset_loader(md5ext)
+            if data is None:
+                missing.append(md5ext)
+                continue
+            # 位图和音频本身已压缩，直接存储
+            compression = zipfile.ZIP_DEFLATED if md5ext.endswith((".svg", ".json")) else zipfile.ZIP_STORED
+            archive.writestr(md5ext, data, compress_type=compression)
+
+    if missing:
+        logger.warning(f"sb3缺少资源: {missing}")
+    return missing
+
+
+def _write_project_json(archive, project, compact, targets=None):
+    """
+    把project.json写入zip；紧凑格式时流式写入，每写入一个数据块产出一次
+
+    Args:
+        archive (ZipFile): 目标zip
+        project (dict): Scratch项目
+        compact (bool): 是否使用紧凑格式
+        targets (list): 收集写出的目标，供随后导出资源
+    """
+    if not compact:
+        archive.writestr("project.json", dumps(project, compact))
+        yield
+        return
+    on_target = targets.append if targets is not None else None
+    with archive.open("project.json", "w") as f:
+        for chunk in iter_json(project, on_target=on_target):
+            f.write(chunk)
+            yield
+
+
+def _project_assets(project, asset_key=None, targets=None):
+    """项目引用的资源；targets是生成器时使用写出project.json时收集到的目标"""
+    if not isinstance(project.get("targets"), (list, tuple)):
+        return get_asset_store().asset_set({"targets": targets or []})
+    return get_asset_store().asset_set(project, asset_key)
+
+
+class _ChunkWriter(io.RawIOBase):
+    """收集zipfile写出的数据块，供生成器逐块取出"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # zipfile需要tell来记录文件头偏移，但不会seek
+        return self.position
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b"".join(chunks)
+
+
+def iter_sb3(project, asset_loader=None, compact=True, asset_key=None):
+    """
+    以数据块的形式生成.sb3内容，适合作为HTTP流式响应
+
+    Args:
+        project (dict): Scratch项目
+        asset_loader (callable): md5ext -> bytes
+        compact (bool): project.json是否使用紧凑格式
+        asset_key (str): 资源清单的缓存键（如项目哈希）
+
+    Yields:
+        bytes: zip数据块
+    """
+    asset_loader = asset_loader or _default_asset_loader
+    writer = _ChunkWriter()
+    targets = []
+    with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for _ in _write_project_json(archive, project, compact, targets):
+            data = writer.drain()
+            if data:
+                yield data
+        for md5ext in _project_assets(project, asset_key, targets):
+            data = asset_loader(md5ext)
+            if data is None:
+                continue
+            compression = zipfile.ZIP_DEFLATED if md5ext.endswith((".svg", ".json")) else zipfile.ZIP_STORED
+            archive.writestr(md5ext, data, compress_type=compression)
+            yield writer.drain()
+    yield writer.drain()
+
+
+def sb3_bytes(project, asset_loader=None, compact=True, asset_key=None):
+    """
+    生成完整的.sb3数据
+
+    Returns:
+        bytes: sb3文件内容
+    """
+    buffer = io.BytesIO()
+    write_sb3(project, buffer, asset_loader, compact, asset_key)
+    return buffer.getvalue()
+
+
+def _benchmark_converter():
+    try:
+        from speech_to_scratch.text_to_scratch import TextToScratchConverter
+    except ImportError:
+        from text_to_scratch import TextToScratchConverter
+    return TextToScratchConverter(use_gpu=False, use_cache=False)
+
+
+def _benchmark_description(num_blocks):
+    """构造编译后大约包含num_blocks个积木的项目描述"""
+    script = "当绿旗被点击时，重复执行[移动(10)步，如果碰到边缘就反弹，下一个造型，等待(0.5)秒]"
+    # 每条脚本编译为5个积木
+    scripts_per_sprite = min(50, max(1, num_blocks // 5))
+    sprite_count = max(1, num_blocks // (5 * scripts_per_sprite))
+    return {
+        "projectName": "benchmark",
+        "sprites": [{"name": f"角色{i}", "scripts": [script] * scripts_per_sprite} for i in range(sprite_count)],
+        "backgrounds": ["白色背景"],
+    }
+
+
+def _benchmark_project(num_blocks):
+    """构造大约包含num_blocks个积木的项目"""
+    return _benchmark_converter()._create_scratch_project(_benchmark_description(num_blocks))
+
+
+def benchmark(num_blocks=5000, repeat=5):
+    """
+    比较旧的保存方式（缩进JSON写入临时文件再读回）与紧凑序列化的体积和耗时
+
+    Args:
+        num_blocks (int): 项目中的积木数量
+        repeat (int): 每种方式重复次数，取最短耗时
+
+    Returns:
+        dict: 各方式的字节数和毫秒数
+    """
+    import tempfile
+
+    project = _benchmark_project(num_blocks)
+    block_count = sum(len(t["blocks"]) for t in project["targets"])
+
+    def timed(func):
+        best = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            size = func()
+            elapsed = (time.perf_counter() - start_time) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return {"bytes": size, "ms": round(best, 2)}
+
+    def legacy_roundtrip():
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".json")
+        temp_file.close()
+        with open(temp_file.name, "w", encoding="utf-8") as f:
+            json.dump(project, f, ensure_ascii=False, indent=2)
+        with open(temp_file.name, "r", encoding="utf-8") as f:
+            json.load(f)
+        size = os.path.getsize(temp_file.name)
+        os.unlink(temp_file.name)
+        return size
+
+    results = {
+        "blocks": block_count,
+        "legacy_indent_roundtrip": timed(legacy_roundtrip),
+        "indent_json": timed(lambda: len(dumps(project, compact=False, use_orjson=False))),
+        "compact_json": timed(lambda: len(dumps(project, use_orjson=False))),
+        "sb3": timed(lambda: len(sb3_bytes(project))),
+    }
+    if orjson_available:
+        results["compact_orjson"] = timed(lambda: len(dumps(project, use_orjson=True)))
+    return results
+
+
+def stream_benchmark(block_counts=(10, 100, 1000, 10000, 100000)):
+    """
+    比较一次性构建并序列化与流式写出的峰值内存随积木数的变化
+
+    项目描述在计时前创建，峰值内存只统计构建和写出过程（tracemalloc）。
+
+    Args:
+        block_counts (tuple): 要测试的积木数
+
+    Returns:
+        list: 每个积木数下两种方式的字节数、毫秒数和峰值内存(KB)
+    """
+    import tracemalloc
+
+    converter = _benchmark_converter()
+    results = []
+    for num_blocks in block_counts:
+        description = _benchmark_description(num_blocks)
+        row = {"blocks": num_blocks}
+        for label in ("in_memory", "streaming"):
+            with open(os.devnull, "wb") as sink:
+                tracemalloc.start()
+                start_time = time.perf_counter()
+                if label == "in_memory":
+                    size = write_json(converter._create_scratch_project(description), sink)
+                else:
+                    size = write_json_stream(converter.iter_scratch_project(description), sink)
+                elapsed = (time.perf_counter() - start_time) * 1000
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            row[label] = {"bytes": size, "ms": round(elapsed, 1), "peak_kb": round(peak / 1024)}
+        results.append(row)
+    return results
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="比较Scratch项目序列化方式的体积和耗时")
+    parser.add_argument("--blocks", type=int, nargs="+", help="项目积木数")
+    parser.add_argument("--stream", action="store_true", help="测试流式写出的内存随积木数的变化")
+    args = parser.parse_args()
+
+    if args.stream:
+        for row in stream_benchmark(tuple(args.blocks or (10, 100, 1000, 10000, 100000))):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        for n in args.blocks or (1000, 5000, 20000):
+            print(json.dumps(benchmark(n), ensure_ascii=False))
@@ -1,7 +1,6 @@
 import speech_recognition as sr
 import os
 import tempfile
-from pydub import AudioSegment
 import logging
 
 # 配置日志
@@ -102,6 +101,9 @@ class SpeechRecognizer:
         logger.info(f"转换音频格式: {audio_path} -> WAV")
         
         try:
+            # pydub只在需要转换格式时才导入
+            from pydub import AudioSegment
+            
             # 创建临时WAV文件
             temp_wav = tempfile.mktemp(suffix='.wav')
             
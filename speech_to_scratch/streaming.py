@@ -0,0 +1,219 @@
+"""
+流式生成与增量JSON解析模块
+
+模型逐个token输出时，增量解析器会在每个角色对象闭合的瞬间把它交给调用方，
+而不必等待整个JSON生成完毕。
+"""
+
+import json
+import logging
+import threading
+
+try:
+    from speech_to_scratch.decoding import json_generation_kwargs
+except ImportError:
+    from decoding import json_generation_kwargs
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """
+    增量解析模型输出中的第一个顶层JSON对象
+
+    feed() 返回本次新增文本触发的事件列表，事件为元组：
+
+    - ("field", key, value): 顶层字段的值已完整
+    - ("sprite", sprite): "sprites" 数组中的一个角色对象已闭合
+    - ("done", description): 顶层对象已闭合，附完整解析结果
+    """
+
+    def __init__(self, stream_key="sprites"):
+        """
+        初始化解析器
+
+        Args:
+            stream_key (str): 需要逐个元素输出的顶层数组字段名
+        """
+        self.stream_key = stream_key
+        self.text = ""
+        self.result = None
+        self.finished = False
+
+        self._pos = 0
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._key_start = None
+        self._expect_key = False
+        self._current_key = None
+        self._value_start = None
+        self._element_start = None
+
+    def feed(self, chunk):
+        """
+        输入一段新生成的文本
+
+        Args:
+            chunk (str): 新文本
+
+        Returns:
+            list: 本次触发的事件
+        """
+        if self.finished or not chunk:
+            return []
+        self.text += chunk
+        events = []
+        text = self.text
+
+        while self._pos < len(text) and not self.finished:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self.text = text = text[i:]
+                    self._pos = 1
+                    self._stack.append('{')
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._close_string(text, i, events)
+                continue
+
+            depth = len(self._stack)
+            if c == '"':
+                self._in_string = True
+                self._string_is_key = depth == 1 and self._expect_key
+                if self._string_is_key:
+                    self._key_start = i
+                elif depth == 1 and self._value_start is None:
+                    self._value_start = i
+            elif c in '{[':
+                if depth == 1 and self._value_start is None:
+                    self._value_start = i
+                if (c == '{' and depth == 2 and self._stack[-1] == '['
+                        and self._current_key == self.stream_key):
+                    self._element_start = i
+                self._stack.append(c)
+            elif c in '}]':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and c == '}' and self._element_start is not None:
+                    self._emit(events, "sprite", text[self._element_start:i + 1])
+                    self._element_start = None
+                elif depth == 1 and self._value_start is not None:
+                    self._emit_field(events, text[self._value_start:i + 1])
+                elif depth == 0:
+                    if self._value_start is not None:
+                        self._emit_field(events, text[self._value_start:i])
+                    self._finish(text[:i + 1], events)
+            elif depth == 1:
+                if c == ':':
+                    self._expect_key = False
+                    self._value_start = None
+                elif c == ',':
+                    if self._value_start is not None:
+                        self._emit_field(events, text[self._value_start:i])
+                    self._expect_key = True
+                elif not c.isspace() and not self._expect_key and self._value_start is None:
+                    # 数字、true/false/null 等标量值
+                    self._value_start = i
+
+        return events
+
+    def _close_string(self, text, i, events):
+        """字符串结束时处理顶层键或顶层字符串值"""
+        if self._string_is_key:
+            try:
+                self._current_key = json.loads(text[self._key_start:i + 1])
+            except ValueError:
+                self._current_key = None
+            self._key_start = None
+        elif len(self._stack) == 1 and self._value_start is not None:
+            self._emit_field(events, text[self._value_start:i + 1])
+
+    def _emit_field(self, events, raw):
+        """输出一个完整的顶层字段"""
+        self._value_start = None
+        try:
+            events.append(("field", self._current_key, json.loads(raw)))
+        except ValueError as e:
+            logger.debug(f"跳过无法解析的字段 {self._current_key}: {str(e)}")
+
+    def _emit(self, events, kind, raw):
+        """输出一个完整的数组元素"""
+        try:
+            events.append((kind, json.loads(raw)))
+        except ValueError as e:
+            logger.debug(f"跳过无法解析的元素: {str(e)}")
+
+    def _finish(self, raw, events):
+        """顶层对象闭合"""
+        self.finished = True
+        try:
+            self.result = json.loads(raw)
+            events.append(("done", self.result))
+        except ValueError as e:
+            logger.warning(f"顶层JSON解析失败: {str(e)}")
+
+
+def stream_generate(tokenizer, model, inputs, generation_kwargs, json_mode=False, constrain_schema=True,
+                    generate_lock=None):
+    """
+    以流式方式调用 model.generate
+
+    Args:
+        tokenizer: 分词器
+        model: 语言模型
+        inputs (dict): 已构建好的生成输入（见 prefix_cache.build_generation_inputs）
+        generation_kwargs (dict): 生成参数
+        json_mode (bool): 顶层JSON对象闭合后是否立即停止生成
+        constrain_schema (bool): JSON模式下是否启用键约束
+        generate_lock (threading.Lock): 生成期间持有的锁（模型句柄的 generate_lock），避免与其它生成并发
+
+    Yields:
+        str: 新解码出的文本片段
+    """
+    from transformers import TextIteratorStreamer
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    generation_kwargs = dict(generation_kwargs)
+    if json_mode:
+        generation_kwargs.update(json_generation_kwargs(tokenizer, inputs["input_ids"].shape[1], 1, constrain_schema))
+    errors = []
+
+    def run():
+        try:
+            if generate_lock is None:
+                model.generate(**inputs, streamer=streamer, **generation_kwargs)
+            else:
+                with generate_lock:
+                    model.generate(**inputs, streamer=streamer, **generation_kwargs)
+        except Exception as e:
+            errors.append(e)
+            # 确保消费端不会一直阻塞
+            streamer.end()
+
+    thread = threading.Thread(target=run, name="llm-stream", daemon=True)
+    thread.start()
+    for chunk in streamer:
+        yield chunk
+    thread.join()
+    if errors:
+        raise errors[0]
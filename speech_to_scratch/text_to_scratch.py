@@ -1,9 +1,10 @@
+import importlib.util
 import json
 import os
 import logging
-import requests
 from pathlib import Path
 import sys
+import time
 
 # 修复导入路径问题
 model_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'BlueLM-main'))
@@ -12,54 +13,172 @@ if os.path.exists(model_path):
 else:
     logging.warning(f"BlueLM模型路径不存在: {model_path}，将使用模拟模式")
 
-# 尝试导入模型
+# 只检查transformers是否安装，不在模块加载时导入（torch/transformers要到第一次生成时才加载）
+transformers_available = importlib.util.find_spec("transformers") is not None
+if not transformers_available:
+    logging.error("无法导入transformers库，请确保已安装依赖")
+
 try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM
-    transformers_available = True
+    from speech_to_scratch.model_registry import get_model_registry
 except ImportError:
-    logging.error("无法导入transformers库，请确保已安装依赖")
-    transformers_available = False
+    from model_registry import get_model_registry
+
+try:
+    from speech_to_scratch.inference_backends import get_default_backend
+except ImportError:
+    from inference_backends import get_default_backend
+
+try:
+    from speech_to_scratch.batching import get_batcher, DEFAULT_GENERATION_KWARGS
+except ImportError:
+    from batching import get_batcher, DEFAULT_GENERATION_KWARGS
+
+try:
+    from speech_to_scratch.decoding import json_generation_kwargs, count_generated_tokens, log_token_savings
+except ImportError:
+    from decoding import json_generation_kwargs, count_generated_tokens, log_token_savings
+
+try:
+    from speech_to_scratch.result_cache import get_description_cache, make_cache_key
+except ImportError:
+    from result_cache import get_description_cache, make_cache_key
+
+try:
+    from speech_to_scratch.streaming import IncrementalJSONParser, stream_generate
+except ImportError:
+    from streaming import IncrementalJSONParser, stream_generate
+
+try:
+    from speech_to_scratch.refinement import RefinementManager
+except ImportError:
+    from refinement import RefinementManager
+
+try:
+    from speech_to_scratch.prefix_cache import build_generation_inputs
+except ImportError:
+    from prefix_cache import build_generation_inputs
+
+try:
+    from speech_to_scratch.block_compiler import (compile_scripts, collect_broadcasts, iter_compile_scripts,
+                                                  script_broadcasts)
+except ImportError:
+    from block_compiler import compile_scripts, collect_broadcasts, iter_compile_scripts, script_broadcasts
+
+try:
+    from speech_to_scratch.ir import ProjectIR, SpriteIR, IRValidationError, unique_sprite
+except ImportError:
+    from ir import ProjectIR, SpriteIR, IRValidationError, unique_sprite
+
+try:
+    from speech_to_scratch import serializer
+except ImportError:
+    import serializer
+
+try:
+    from speech_to_scratch.asset_store import get_asset_store
+except ImportError:
+    from asset_store import get_asset_store
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 提示词版本，修改提示词后需要递增，使旧的缓存结果失效
+PROMPT_VERSION = "2"
+
+# 提示词的固定前缀，放在最前面以便复用其KV缓存
+PROMPT_PREFIX = """[|Human|]:我想创建一个Scratch项目。
+请生成一个详细的项目描述，包括角色、背景、事件和脚本。以JSON格式输出，包含以下字段：
+1. projectName: 项目名称
+2. sprites: 角色列表，每个角色包含name（名称）和scripts（脚本列表）
+3. backgrounds: 背景列表
+4. events: 事件列表
+
+请确保生成的JSON格式正确，可以直接解析。
+"""
+
+# 提示词中随用户输入变化的部分
+PROMPT_SUFFIX = "项目内容是：{text}。[|AI|]:"
+
 class TextToScratchConverter:
     """将自然语言文本转换为Scratch项目的转换器"""
     
-    def __init__(self, model_path="vivo-ai/BlueLM-7B-Chat", use_gpu=True):
+    def __init__(self, model_path="vivo-ai/BlueLM-7B-Chat", use_gpu=True, registry=None,
+                 batching=True, max_batch_size=8, max_wait_ms=50, cache=None, use_cache=True,
+                 json_mode=True, constrain_schema=True, use_prefix_cache=True, backend=None,
+                 asset_store=None):
         """
         初始化转换器
         
+        模型通过进程级注册表共享，并在第一次生成时才加载，
+        因此创建转换器本身几乎没有开销。
+        
         Args:
             model_path (str): 语言模型路径
             use_gpu (bool): 是否使用GPU
+            registry (ModelRegistry): 模型注册表，默认使用进程级共享注册表
+            batching (bool): 是否把并发请求合并成批量生成
+            max_batch_size (int): 单批最大请求数
+            max_wait_ms (float): 凑批等待窗口（毫秒）
+            cache (DescriptionCache): 项目描述缓存，默认使用进程级共享缓存
+            use_cache (bool): 是否启用项目描述缓存
+            json_mode (bool): 顶层JSON对象括号配平后立即停止生成
+            constrain_schema (bool): 把生成的键约束在 projectName/sprites/backgrounds/events 模式之内
+            use_prefix_cache (bool): 复用提示词固定前缀的KV缓存
+            backend (str): 推理后端（fp32/bf16/int8/int4），默认读取环境变量 BLUELM_BACKEND
+            asset_store (AssetStore): 造型资源存储，默认使用进程级共享存储
         """
         self.model_path = model_path
         self.use_gpu = use_gpu
         self.device = "cuda:0" if use_gpu else "cpu"
+        self.backend = backend or get_default_backend()
         self.using_simulation = False
+        self.registry = registry or get_model_registry()
+        self.batching = batching
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache = (cache or get_description_cache()) if use_cache else None
+        self.json_mode = json_mode
+        self.constrain_schema = constrain_schema
+        self.use_prefix_cache = use_prefix_cache
+        self.asset_store = asset_store or get_asset_store()
+        self.refiner = RefinementManager(self)
         
-        # 加载模型
+        # 获取共享模型句柄（懒加载）
         if transformers_available:
-            logger.info(f"加载语言模型: {model_path}")
-            try:
-                self.tokenizer = AutoTokenizer.from_pretrained(model_path, trust_remote_code=True, use_fast=False)
-                self.model = AutoModelForCausalLM.from_pretrained(model_path, device_map=self.device, trust_remote_code=True)
-                self.model = self.model.eval()
-                logger.info("模型加载成功")
-            except Exception as e:
-                logger.error(f"模型加载失败: {str(e)}")
-                logger.warning("使用替代方法: 将使用预定义模板生成Scratch项目")
-                self.tokenizer = None
-                self.model = None
-                self.using_simulation = True
+            self.model_handle = self.registry.get(model_path, self.device, self.backend)
         else:
             logger.warning("Transformers库不可用，使用预定义模板")
-            self.tokenizer = None
-            self.model = None
+            self.model_handle = None
             self.using_simulation = True
     
+    @property
+    def tokenizer(self):
+        """已加载的分词器，未加载时为None"""
+        return self.model_handle.tokenizer if self.model_handle else None
+    
+    @property
+    def model(self):
+        """已加载的语言模型，未加载时为None"""
+        return self.model_handle.model if self.model_handle else None
+    
+    def _load_model(self):
+        """
+        获取共享模型，首次调用时加载
+        
+        Returns:
+            tuple: (tokenizer, model)，不可用时为 (None, None)
+        """
+        if self.using_simulation or self.model_handle is None:
+            return None, None
+        
+        tokenizer, model = self.model_handle.acquire()
+        if model is None or tokenizer is None:
+            logger.warning("使用替代方法: 将使用预定义模板生成Scratch项目")
+            self.using_simulation = True
+            return None, None
+        return tokenizer, model
+    
     def convert(self, text):
         """
         将自然语言文本转换为Scratch项目
@@ -70,73 +189,384 @@ class TextToScratchConverter:
         Returns:
             dict: Scratch项目JSON数据
         """
+        return self.convert_with_description(text)[0]
+    
+    def convert_with_description(self, text):
+        """
+        将自然语言文本转换为Scratch项目，同时返回使用的项目描述
+        
+        Args:
+            text (str): 自然语言描述
+            
+        Returns:
+            tuple: (Scratch项目JSON数据, 项目描述的ProjectIR)
+        """
         logger.info(f"开始处理文本: {text}")
         
-        # 使用LLM生成Scratch项目描述
-        project_description = self._generate_project_description(text)
+        # 使用LLM生成Scratch项目描述（已校验）
+        project_ir = self._generate_project_description(text)
         
         # 根据描述生成Scratch项目
-        scratch_project = self._create_scratch_project(project_description)
+        scratch_project = self._create_scratch_project(project_ir)
         
-        return scratch_project
+        return scratch_project, project_ir
+    
+    def update_project(self, previous_project, text, previous_description=None):
+        """
+        根据修改后的描述更新已有项目，只重新生成发生变化的角色
+        
+        项目描述先查缓存，只有未命中时才调用LLM。描述相同的角色直接沿用原来的角色对象；
+        没有原描述时，重新编译角色并与原角色比较。
+        
+        Args:
+            previous_project (dict): 原Scratch项目
+            text (str): 修改后的自然语言描述
+            previous_description (dict): 生成原项目时的项目描述（可选）
+            
+        Returns:
+            tuple: (新项目, 新项目描述的ProjectIR, 变化情况)，变化情况包含
+                   added/changed/removed/unchanged 四个角色名列表
+        """
+        logger.info(f"开始增量更新项目: {text}")
+        project_ir = self._generate_project_description(text)
+        
+        old_targets = {t.get("name"): t for t in previous_project.get("targets", []) if not t.get("isStage", False)}
+        old_scripts = None
+        if previous_description is not None:
+            old_scripts = {s.name: [script.source for script in s.scripts]
+                           for s in ProjectIR.from_description(previous_description).sprites}
+        
+        changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        scratch_project = self._new_scratch_project(project_ir.backgrounds)
+        for sprite_ir in project_ir.sprites:
+            name = sprite_ir.name
+            old_target = old_targets.get(name)
+            if old_target is not None and old_scripts is not None and \
+                    old_scripts.get(name) == [script.source for script in sprite_ir.scripts]:
+                # 描述未变化，无需重新生成积木
+                sprite = old_target
+                changes["unchanged"].append(name)
+            else:
+                sprite = self._create_sprite(sprite_ir)
+                if old_target is None:
+                    changes["added"].append(name)
+                elif sprite == old_target:
+                    sprite = old_target
+                    changes["unchanged"].append(name)
+                else:
+                    changes["changed"].append(name)
+            scratch_project["targets"].append(sprite)
+        
+        new_names = {s.name for s in project_ir.sprites}
+        changes["removed"] = [name for name in old_targets if name not in new_names]
+        self._register_broadcasts(scratch_project)
+        
+        logger.info(f"增量更新完成: 新增{len(changes['added'])}个、修改{len(changes['changed'])}个、"
+                    f"删除{len(changes['removed'])}个角色")
+        return scratch_project, project_ir, changes
+    
+    def convert_fast(self, text):
+        """
+        快速模式：立即返回基于模板的项目，LLM精修在后台进行
+        
+        Args:
+            text (str): 自然语言描述
+            
+        Returns:
+            dict: 任务快照，包含 project、version、version_token 和 status，
+                  之后可通过 self.refiner.get/wait 获取精修版本
+        """
+        logger.info(f"快速模式处理文本: {text}")
+        return self.refiner.submit(text)
+    
+    def convert_stream(self, text):
+        """
+        以流式方式将自然语言文本转换为Scratch项目
+        
+        模型每生成完一个角色就立即创建对应的Scratch角色，
+        调用方可以在生成结束前展示部分项目。
+        
+        Args:
+            text (str): 自然语言描述
+            
+        Yields:
+            dict: {"event": 事件类型, "project": 当前的Scratch项目}，
+                  事件类型为 start/stage/sprite/reset/done，project为同一个逐步补全的对象；
+                  reset 表示之前的部分项目作废（例如生成结果不合格，改用默认模板）
+        """
+        logger.info(f"开始流式处理文本: {text}")
+        
+        events = self._stream_description_events(text)
+        for event, scratch_project in self._create_scratch_project_incremental(events):
+            yield {"event": event, "project": scratch_project}
+    
+    def _stream_description_events(self, text):
+        """
+        流式生成项目描述
+        
+        每个角色在发出前先校验并保证名字唯一（与 ProjectIR.from_description 相同），不合格的角色直接跳过。
+        已经发出角色后需要改用其它描述（如默认模板）时，先发出 ("reset",) 事件。
+        
+        Args:
+            text (str): 用户输入的文本
+            
+        Yields:
+            tuple: ("sprite", SpriteIR)、("field", 字段名, 值)、("reset",)，
+                   最后一个事件总是 ("done", ProjectIR)
+        """
+        cached = self._cached_description(text)
+        if cached is not None:
+            yield from self._description_events(cached)
+            return
+        
+        emitted = False
+        tokenizer, model = self._load_model()
+        if model and tokenizer:
+            logger.info("正在流式生成项目描述...")
+            parser = IncrementalJSONParser()
+            fields = {}
+            sprites = []
+            names = set()
+            try:
+                inputs = build_generation_inputs(self.model_handle, tokenizer, model,
+                                                 [self._build_prompt_parts(text)], self.use_prefix_cache)
+                chunks = stream_generate(tokenizer, model, inputs, DEFAULT_GENERATION_KWARGS,
+                                         json_mode=self.json_mode, constrain_schema=self.constrain_schema,
+                                         generate_lock=self.model_handle.generate_lock)
+                for chunk in chunks:
+                    for event in parser.feed(chunk):
+                        if event[0] == "sprite":
+                            try:
+                                sprite_ir = unique_sprite(SpriteIR.from_description(event[1]), names)
+                            except IRValidationError as e:
+                                logger.error(f"跳过不符合要求的角色: {str(e)}")
+                                continue
+                            sprites.append(sprite_ir)
+                            event = ("sprite", sprite_ir)
+                        elif event[0] == "field":
+                            fields[event[1]] = event[2]
+                        elif event[0] == "done":
+                            # 完整结果校验通过后再发出
+                            continue
+                        emitted = True
+                        yield event
+                    if parser.finished:
+                        break
+            except Exception as e:
+                logger.error(f"流式生成项目描述失败: {str(e)}")
+            
+            if parser.result is not None:
+                try:
+                    # 与非流式路径相同，校验通过后才写入缓存
+                    project_ir = ProjectIR.from_description(parser.result)
+                except IRValidationError as e:
+                    logger.error(f"流式生成的项目描述不符合要求: {str(e)}")
+                else:
+                    logger.info("成功生成项目描述")
+                    if self.cache is not None:
+                        self.cache.put(self._cache_key(text), project_ir)
+                    yield "done", project_ir
+                    return
+            
+            # 顶层JSON未能完整解析或校验失败，但已输出合格的角色时，用已有内容收尾（不写入缓存）
+            if sprites:
+                fields["sprites"] = sprites
+                try:
+                    project_ir = ProjectIR.from_description(fields)
+                except IRValidationError as e:
+                    logger.error(f"已生成的部分描述不符合要求: {str(e)}")
+                else:
+                    logger.warning("项目描述不完整，使用已生成的部分角色")
+                    yield "done", project_ir
+                    return
+        
+        if emitted:
+            # 丢弃已发出的内容，改用默认模板
+            yield ("reset",)
+        yield from self._description_events(self._get_default_project_template(text))
+    
+    @staticmethod
+    def _description_events(project_description):
+        """把完整的项目描述转换为增量事件序列"""
+        project_ir = ProjectIR.from_description(project_description)
+        for sprite_ir in project_ir.sprites:
+            yield "sprite", sprite_ir
+        yield "field", "backgrounds", list(project_ir.backgrounds)
+        yield "done", project_ir
     
     def _generate_project_description(self, text):
         """
         使用LLM生成项目描述
         
+        先查询描述缓存，命中时直接返回，不会加载或调用模型。
+        
         Args:
             text (str): 用户输入的文本
             
         Returns:
-            dict: 项目描述，包含角色、事件、脚本等
+            ProjectIR: 校验后的项目描述，包含角色、事件、脚本等
         """
-        if self.model and self.tokenizer and not self.using_simulation:
-            # 构建提示
-            prompt = f"""[|Human|]:我想创建一个Scratch项目，内容是：{text}。
-请生成一个详细的项目描述，包括角色、背景、事件和脚本。以JSON格式输出，包含以下字段：
-1. projectName: 项目名称
-2. sprites: 角色列表，每个角色包含name（名称）和scripts（脚本列表）
-3. backgrounds: 背景列表
-4. events: 事件列表
-
-请确保生成的JSON格式正确，可以直接解析。[|AI|]:"""
+        project_ir = self._generate_refined_description(text)
+        if project_ir is None:
+            # 如果模型未加载、使用模拟模式或生成失败，使用默认模板
+            return ProjectIR.from_description(self._get_default_project_template(text))
+        return project_ir
+    
+    def _cached_description(self, text):
+        """
+        查询描述缓存
+        
+        Args:
+            text (str): 用户输入的文本
             
-            # 生成回复
-            logger.info("正在生成项目描述...")
-            try:
-                inputs = self.tokenizer(prompt, return_tensors="pt")
-                inputs = inputs.to(self.device)
-                
-                outputs = self.model.generate(
-                    **inputs, 
-                    max_new_tokens=1024,
-                    do_sample=True,
-                    temperature=0.7,
-                    top_p=0.9,
-                )
-                
-                response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-                
-                # 提取AI回复部分
-                json_str = response.split("[|AI|]:")[-1].strip()
-                # 查找JSON部分
-                start_index = json_str.find('{')
-                end_index = json_str.rfind('}') + 1
-                
-                if start_index != -1 and end_index != -1:
-                    json_str = json_str[start_index:end_index]
-                
-                project_description = json.loads(json_str)
-                logger.info("成功生成项目描述")
-                return project_description
-            except Exception as e:
-                logger.error(f"解析生成的项目描述失败: {str(e)}")
-                logger.error(f"原始输出: {locals().get('response', '未生成')}")
-                # 使用默认模板
-                return self._get_default_project_template(text)
-        else:
-            # 如果模型未加载或使用模拟模式，使用默认模板
-            return self._get_default_project_template(text)
+        Returns:
+            ProjectIR: 缓存的项目描述，未命中、未启用缓存或缓存内容不合格时为None
+        """
+        if self.cache is None:
+            return None
+        # 缓存只保存校验过的描述，磁盘条目在读取时重新校验
+        project_ir = self.cache.get(self._cache_key(text))
+        if project_ir is not None:
+            logger.info("命中项目描述缓存")
+        return project_ir
+    
+    def _cache_key(self, text):
+        """
+        项目描述的缓存键，区分模型、推理后端和解码设置
+        
+        Args:
+            text (str): 用户输入的文本
+            
+        Returns:
+            str: 缓存键
+        """
+        return make_cache_key(text, self.model_path, PROMPT_VERSION, self.backend, self.json_mode,
+                              self.constrain_schema)
+    
+    def _generate_refined_description(self, text):
+        """
+        获取LLM质量的项目描述：先查缓存，未命中时调用LLM并写入缓存
+        
+        Args:
+            text (str): 用户输入的文本
+            
+        Returns:
+            ProjectIR: 校验后的项目描述，模型不可用或生成失败时为None
+        """
+        cached = self._cached_description(text)
+        if cached is not None:
+            return cached
+        
+        project_ir = self._generate_llm_description(text)
+        # 只缓存LLM成功生成的描述，模板结果无需缓存
+        if project_ir is not None and self.cache is not None:
+            self.cache.put(self._cache_key(text), project_ir)
+        return project_ir
+    
+    def _generate_llm_description(self, text):
+        """
+        调用LLM生成并解析项目描述
+        
+        Args:
+            text (str): 用户输入的文本
+            
+        Returns:
+            ProjectIR: 校验后的项目描述，模型不可用或解析失败时为None
+        """
+        tokenizer, model = self._load_model()
+        if not (model and tokenizer):
+            return None
+        
+        # 构建提示
+        prefix, suffix = self._build_prompt_parts(text)
+        
+        # 生成回复
+        logger.info("正在生成项目描述...")
+        try:
+            response = self._generate_text(prefix, suffix, tokenizer, model)
+            project_ir = self._parse_project_description(response)
+            logger.info("成功生成项目描述")
+            return project_ir
+        except Exception as e:
+            logger.error(f"解析生成的项目描述失败: {str(e)}")
+            logger.error(f"原始输出: {locals().get('response', '未生成')}")
+            return None
+    
+    def _build_prompt_parts(self, text):
+        """
+        构建生成项目描述的提示词
+        
+        Returns:
+            tuple: (固定前缀, 包含用户输入的后缀)
+        """
+        return PROMPT_PREFIX, PROMPT_SUFFIX.format(text=text)
+    
+    def _build_prompt(self, text):
+        """构建完整的提示词"""
+        return "".join(self._build_prompt_parts(text))
+    
+    def _generate_text(self, prefix, suffix, tokenizer, model):
+        """
+        调用语言模型生成回复
+        
+        启用批处理时，请求会交给共享调度器与其他并发请求合并生成；
+        固定前缀的KV缓存在每个已加载模型上只计算一次。
+        
+        Args:
+            prefix (str): 提示词固定前缀
+            suffix (str): 提示词中包含用户输入的部分
+            tokenizer: 分词器
+            model: 语言模型
+            
+        Returns:
+            str: 模型新生成的文本
+        """
+        if self.batching:
+            batcher = get_batcher(self.model_handle, self.max_batch_size, self.max_wait_ms,
+                                  self.json_mode, self.constrain_schema, self.use_prefix_cache)
+            return batcher.submit(suffix, prefix=prefix)
+        
+        inputs = build_generation_inputs(self.model_handle, tokenizer, model, [(prefix, suffix)], self.use_prefix_cache)
+        input_length = inputs["input_ids"].shape[1]
+        generation_kwargs = dict(DEFAULT_GENERATION_KWARGS)
+        if self.json_mode:
+            generation_kwargs.update(json_generation_kwargs(tokenizer, input_length, 1, self.constrain_schema))
+        start_time = time.perf_counter()
+        # 与批处理、流式生成和后台优化共用同一个模型，依次生成
+        with self.model_handle.generate_lock:
+            outputs = model.generate(**inputs, **generation_kwargs)
+        
+        new_tokens = outputs[0][input_length:]
+        token_count = count_generated_tokens(new_tokens, tokenizer)
+        self.model_handle.record_generation(token_count, time.perf_counter() - start_time)
+        if self.json_mode:
+            log_token_savings(token_count, generation_kwargs["max_new_tokens"])
+        return tokenizer.decode(new_tokens, skip_special_tokens=True)
+    
+    def _parse_project_description(self, response):
+        """
+        从模型回复中解析并校验项目描述JSON
+        
+        Args:
+            response (str): 模型回复
+            
+        Returns:
+            ProjectIR: 校验后的项目描述
+            
+        Raises:
+            IRValidationError: 描述的结构不符合要求（按生成失败处理，回退到模板）
+        """
+        # 提取AI回复部分
+        json_str = response.split("[|AI|]:")[-1].strip()
+        # 查找JSON部分
+        start_index = json_str.find('{')
+        end_index = json_str.rfind('}') + 1
+        
+        if start_index != -1 and end_index != -1:
+            json_str = json_str[start_index:end_index]
+        
+        # 在这里一次性校验结构，之后各处直接使用IR
+        return ProjectIR.from_description(json.loads(json_str))
     
     def _get_default_project_template(self, text):
         """
@@ -232,16 +662,59 @@ class TextToScratchConverter:
         根据描述创建Scratch项目
         
         Args:
-            project_description (dict): 项目描述
+            project_description (dict|ProjectIR): 项目描述，已经是ProjectIR时不再校验
             
         Returns:
             dict: Scratch项目JSON
         """
         logger.info("开始创建Scratch项目")
+        project_ir = ProjectIR.from_description(project_description)
+        
+        # 添加舞台
+        scratch_project = self._new_scratch_project(project_ir.backgrounds)
+        
+        # 添加角色
+        for sprite_ir in project_ir.sprites:
+            sprite = self._create_sprite(sprite_ir)
+            scratch_project["targets"].append(sprite)
+        self._register_broadcasts(scratch_project)
         
+        logger.info(f"Scratch项目创建完成: {project_ir.name}")
+        return scratch_project
+    
+    def iter_scratch_project(self, project_description):
+        """
+        根据描述创建惰性的Scratch项目，用于流式写出很大的项目
+        
+        返回的项目中 targets 是生成器，每个角色的 blocks 是逐条脚本编译的 (积木ID, 积木) 生成器，
+        交给 serializer.iter_json / write_json_stream / write_sb3 写出时才真正生成，只能写出一次。
+        舞台上的广播根据解析结果提前登记。写出的内容与 _create_scratch_project 的结果相同。
+        
+        Args:
+            project_description (dict|ProjectIR): 项目描述
+            
+        Returns:
+            dict: 惰性的Scratch项目
+        """
+        project_ir = ProjectIR.from_description(project_description)
+        stage = self._create_stage(project_ir.backgrounds)
+        for sprite_ir in project_ir.sprites:
+            stage["broadcasts"].update(script_broadcasts(sprite_ir.scripts))
+        
+        def targets():
+            yield stage
+            for sprite_ir in project_ir.sprites:
+                yield self._create_sprite(sprite_ir, blocks=iter_compile_scripts(sprite_ir.scripts))
+        
+        scratch_project = self._new_scratch_project()
+        scratch_project["targets"] = targets()
+        return scratch_project
+    
+    def _new_scratch_project(self, backgrounds=None):
+        """创建只包含舞台的空Scratch项目"""
         # Scratch项目模板
-        scratch_project = {
-            "targets": [],
+        return {
+            "targets": [self._create_stage(backgrounds or [])],
             "monitors": [],
             "extensions": [],
             "meta": {
@@ -250,18 +723,46 @@ class TextToScratchConverter:
                 "agent": "Python Scratch Converter"
             }
         }
+    
+    def _create_scratch_project_incremental(self, events):
+        """
+        根据增量描述事件逐步创建Scratch项目
         
-        # 添加舞台和精灵
-        stage = self._create_stage(project_description.get("backgrounds", []))
-        scratch_project["targets"].append(stage)
-        
-        # 添加角色
-        for sprite_desc in project_description.get("sprites", []):
-            sprite = self._create_sprite(sprite_desc)
-            scratch_project["targets"].append(sprite)
+        Args:
+            events (iterable): _stream_description_events 产生的事件
+            
+        Yields:
+            tuple: (事件类型, 当前的Scratch项目)，收到 reset 事件时清空已创建的角色并发出 reset
+        """
+        logger.info("开始增量创建Scratch项目")
+        scratch_project = self._new_scratch_project()
+        yield "start", scratch_project
         
-        logger.info(f"Scratch项目创建完成: {project_description.get('projectName', '未命名项目')}")
-        return scratch_project
+        sprite_count = 0
+        for event in events:
+            kind = event[0]
+            if kind == "reset":
+                scratch_project["targets"] = [self._create_stage([])]
+                sprite_count = 0
+                yield "reset", scratch_project
+            elif kind == "sprite":
+                scratch_project["targets"].append(self._create_sprite(event[1]))
+                self._register_broadcasts(scratch_project)
+                sprite_count += 1
+                yield "sprite", scratch_project
+            elif kind == "field" and event[1] == "backgrounds":
+                scratch_project["targets"][0] = self._create_stage(event[2])
+                self._register_broadcasts(scratch_project)
+                yield "stage", scratch_project
+            elif kind == "done":
+                project_ir = event[1]
+                # 补齐流式过程中未能单独解析出的角色
+                for sprite_ir in project_ir.sprites[sprite_count:]:
+                    scratch_project["targets"].append(self._create_sprite(sprite_ir))
+                self._register_broadcasts(scratch_project)
+                logger.info(f"Scratch项目创建完成: {project_ir.name}")
+                yield "done", scratch_project
+                return
     
     def _create_stage(self, backgrounds):
         """创建舞台对象"""
@@ -276,14 +777,7 @@ class TextToScratchConverter:
             "comments": {},
             "currentCostume": 0,
             "costumes": [
-                {
-                    "assetId": "cd21514d0531fdffb22204e0ec5ed84a",
-                    "name": "背景1",
-                    "md5ext": "cd21514d0531fdffb22204e0ec5ed84a.svg",
-                    "dataFormat": "svg",
-                    "rotationCenterX": 240,
-                    "rotationCenterY": 180
-                }
+                self.asset_store.costume(self.asset_store.default_backdrop, "背景1")
             ],
             "sounds": [],
             "volume": 100,
@@ -295,28 +789,20 @@ class TextToScratchConverter:
         }
         return stage
     
-    def _create_sprite(self, sprite_desc):
-        """创建精灵对象"""
+    def _create_sprite(self, sprite_ir, blocks=None):
+        """创建精灵对象（sprite_ir为校验后的SpriteIR，blocks为None时编译脚本）"""
         # 这里简化处理，实际应用中需要更复杂的转换逻辑
         sprite = {
             "isStage": False,
-            "name": sprite_desc.get("name", "Sprite"),
+            "name": sprite_ir.name,
             "variables": {},
             "lists": {},
             "broadcasts": {},
-            "blocks": self._create_blocks(sprite_desc.get("scripts", [])),
+            "blocks": self._create_blocks(sprite_ir.scripts) if blocks is None else blocks,
             "comments": {},
             "currentCostume": 0,
             "costumes": [
-                {
-                    "assetId": "bcf454acf82e4504149f7ffe07081dbc",
-                    "name": "造型1",
-                    "bitmapResolution": 1,
-                    "md5ext": "bcf454acf82e4504149f7ffe07081dbc.svg",
-                    "dataFormat": "svg",
-                    "rotationCenterX": 48,
-                    "rotationCenterY": 50
-                }
+                self.asset_store.costume(self.asset_store.default_costume, "造型1", bitmap_resolution=1)
             ],
             "sounds": [],
             "volume": 100,
@@ -331,43 +817,31 @@ class TextToScratchConverter:
         return sprite
     
     def _create_blocks(self, scripts):
-        """根据脚本创建代码块"""
-        # 这里简化处理，实际使用时需更复杂的解析和转换逻辑
-        blocks = {}
-        
-        # 生成唯一ID的简单方法
-        block_id = lambda i: f"block_{i}"
-        
-        for i, script in enumerate(scripts):
-            # 这里仅作示例，实际需要更复杂的解析
-            blocks[block_id(i)] = {
-                "opcode": "event_whenflagclicked" if "绿旗" in script else "event_whenkeypressed",
-                "next": None,
-                "parent": None,
-                "inputs": {},
-                "fields": {},
-                "shadow": False,
-                "topLevel": True,
-                "x": 0,
-                "y": i * 100
-            }
-        
-        return blocks
+        """根据脚本（短语或ScriptIR）编译出Scratch积木"""
+        return compile_scripts(scripts)
+    
+    def _register_broadcasts(self, scratch_project):
+        """把角色脚本中用到的广播登记到舞台上"""
+        stage = scratch_project["targets"][0]
+        for target in scratch_project["targets"][1:]:
+            stage["broadcasts"].update(collect_broadcasts(target["blocks"]))
     
-    def save_project(self, project, file_path):
+    def save_project(self, project, file_path, compact=False):
         """
         保存Scratch项目到文件
         
         Args:
-            project (dict): Scratch项目数据
-            file_path (str): 保存路径
+            project (dict): Scratch项目数据；compact为True时也可以是 iter_scratch_project 返回的惰性项目
+            file_path (str): 保存路径，以.sb3结尾时保存为包含资源的sb3文件
+            compact (bool): 是否使用紧凑JSON（流式写出），默认缩进2格便于阅读
         """
         try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(project, f, ensure_ascii=False, indent=2)
+            if str(file_path).endswith('.sb3'):
+                serializer.write_sb3(project, file_path, compact=compact)
+            elif compact:
+                serializer.write_json_stream(project, file_path)
+            else:
+                serializer.write_json(project, file_path, compact=compact)
             logger.info(f"项目已保存到: {file_path}")
             return True
         except Exception as e:
@@ -0,0 +1,2 @@
+# tests 模块
+# 不依赖模型、Manim等可选依赖的单元测试，运行: python -m pytest tests
@@ -0,0 +1,100 @@
+"""渲染缓存、项目存储和项目描述缓存的淘汰与校验测试"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from code_visualization.render_cache import RenderCache
+from speech_to_scratch.project_store import ProjectStore
+from speech_to_scratch.result_cache import DescriptionCache
+
+
+class TempDirTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+
+class RenderCacheTest(TempDirTestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(self.dir, max_bytes=250)
+        cache.put_bytes("a", b"a" * 100)
+        cache.put_bytes("b", b"b" * 100)
+        # 读取a后b成为最久未使用的条目
+        self.assertIsNotNone(cache.get_path("a"))
+        cache.put_bytes("c", b"c" * 100)
+
+        self.assertTrue(cache.contains("a"))
+        self.assertFalse(cache.contains("b"))
+        self.assertTrue(cache.contains("c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["bytes"], 200)
+
+    def test_keeps_newest_entry_over_limit(self):
+        cache = RenderCache(self.dir, max_bytes=10)
+        cache.put_bytes("big", b"x" * 100)
+        self.assertEqual(cache.get_bytes("big"), b"x" * 100)
+
+    def test_index_is_rebuilt_from_disk(self):
+        RenderCache(self.dir, max_bytes=1000).put_bytes("a", b"a" * 100)
+        cache = RenderCache(self.dir, max_bytes=1000)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.get_bytes("a"), b"a" * 100)
+        self.assertIsNone(cache.get_path("missing"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class ProjectStoreTest(TempDirTestCase):
+
+    def test_evicts_least_recently_used_projects(self):
+        store = ProjectStore(max_memory_entries=1, store_dir=self.dir, max_disk_bytes=400)
+        digests = [store.put({"targets": [], "n": i, "pad": "x" * 100}) for i in range(5)]
+
+        self.assertGreater(store.stats()["evictions"], 0)
+        self.assertLessEqual(store.stats()["disk_bytes"], 400)
+        self.assertFalse(store.contains(digests[0]))
+        self.assertIsNone(store.get(digests[0]))
+        self.assertEqual(store.get(digests[-1])["n"], 4)
+
+    def test_description_is_evicted_with_project(self):
+        store = ProjectStore(max_memory_entries=1, store_dir=self.dir, max_disk_bytes=200)
+        first = store.put({"targets": [], "pad": "x" * 100}, {"projectName": "p"})
+        store.put({"targets": [], "pad": "y" * 100}, {"projectName": "q"})
+        self.assertIsNone(store.get_description(first))
+        self.assertEqual(os.listdir(self.dir).count(f"{first}.desc.json"), 0)
+
+
+class DescriptionCacheTest(TempDirTestCase):
+
+    DESCRIPTION = {"projectName": "p", "sprites": [{"name": "s", "scripts": []}], "backgrounds": [], "events": []}
+
+    def test_disk_entry_survives_restart(self):
+        DescriptionCache(cache_dir=self.dir).put("k", self.DESCRIPTION)
+        cache = DescriptionCache(cache_dir=self.dir)
+        self.assertEqual(cache.get("k").to_json(), self.DESCRIPTION)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_invalid_disk_entry_is_removed(self):
+        path = os.path.join(self.dir, "bad.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"sprites": "not a list"}, f)
+        cache = DescriptionCache(cache_dir=self.dir)
+
+        self.assertIsNone(cache.get("bad"))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_memory_layer_is_bounded(self):
+        cache = DescriptionCache(max_memory_entries=2, cache_dir=None)
+        for key in "abc":
+            cache.put(key, self.DESCRIPTION)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
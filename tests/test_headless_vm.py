@@ -0,0 +1,89 @@
+"""无界面Scratch虚拟机的调度语义测试"""
+
+import unittest
+
+from speech_to_scratch.headless_vm import HeadlessVM, smoke_run
+from speech_to_scratch.text_to_scratch import TextToScratchConverter
+
+
+def _broadcast_block(name, next_id=None):
+    return {"opcode": "event_broadcast", "inputs": {"BROADCAST_INPUT": [1, [11, name, name]]},
+            "next": next_id, "topLevel": False}
+
+
+def _project(blocks):
+    return {"targets": [
+        {"isStage": True, "name": "Stage", "blocks": {}},
+        {"isStage": False, "name": "s", "blocks": blocks, "x": 0, "y": 0, "direction": 90},
+    ]}
+
+
+class SelfBroadcastTest(unittest.TestCase):
+    """脚本广播自己接收的消息时应从头重新开始，而不是报错停止"""
+
+    def test_loop_by_self_broadcast(self):
+        blocks = {
+            "flag": {"opcode": "event_whenflagclicked", "next": "start", "topLevel": True},
+            "start": _broadcast_block("go"),
+            "hat": {"opcode": "event_whenbroadcastreceived", "fields": {"BROADCAST_OPTION": ["go", "go"]},
+                    "next": "move", "topLevel": True},
+            "move": {"opcode": "motion_movesteps", "inputs": {"STEPS": [1, [4, 10]]}, "next": "wait"},
+            "wait": {"opcode": "control_wait", "inputs": {"DURATION": [1, [5, 0.1]]}, "next": "again"},
+            "again": _broadcast_block("go"),
+        }
+        vm = HeadlessVM(_project(blocks), record_trace=False)
+        result = vm.run(1.0)
+
+        self.assertEqual(result["errors"], [])
+        # 每次循环移动10步、等待0.1秒，1秒内应循环多次
+        self.assertGreater(result["sprites"]["s"]["x"], 50)
+        self.assertEqual(result["running_threads"], 1)
+
+    def test_restart_from_other_script(self):
+        blocks = {
+            "flag": {"opcode": "event_whenflagclicked", "next": "start", "topLevel": True},
+            "start": _broadcast_block("go", "pause"),
+            "pause": {"opcode": "control_wait", "inputs": {"DURATION": [1, [5, 0.5]]}, "next": "restart"},
+            "restart": _broadcast_block("go"),
+            "hat": {"opcode": "event_whenbroadcastreceived", "fields": {"BROADCAST_OPTION": ["go", "go"]},
+                    "next": "forever", "topLevel": True},
+            "forever": {"opcode": "control_forever", "inputs": {"SUBSTACK": [2, "move"]}, "next": None},
+            "move": {"opcode": "motion_movesteps", "inputs": {"STEPS": [1, [4, 1]]}, "next": None},
+        }
+        vm = HeadlessVM(_project(blocks), record_trace=False)
+        result = vm.run(1.0)
+
+        self.assertEqual(result["errors"], [])
+        # 同一脚本重启后仍只有一个线程
+        self.assertEqual(result["running_threads"], 1)
+        self.assertEqual(result["broadcasts"], 2)
+
+
+class RunTest(unittest.TestCase):
+    """基本积木的执行结果"""
+
+    def test_repeat_moves_and_finishes(self):
+        blocks = {
+            "flag": {"opcode": "event_whenflagclicked", "next": "repeat", "topLevel": True},
+            "repeat": {"opcode": "control_repeat", "inputs": {"TIMES": [1, [6, 5]], "SUBSTACK": [2, "move"]},
+                       "next": None},
+            "move": {"opcode": "motion_movesteps", "inputs": {"STEPS": [1, [4, 10]]}, "next": None},
+        }
+        result = HeadlessVM(_project(blocks), record_trace=False).run(2.0)
+
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(result["sprites"]["s"]["x"], 50)
+        self.assertEqual(result["running_threads"], 0)
+
+    def test_generated_project_runs_without_errors(self):
+        converter = TextToScratchConverter(use_gpu=False, use_cache=False)
+        project = converter.convert("做一个小猫追老鼠的游戏")
+        result = smoke_run(project, seconds=3.0, inputs=[(1.0, "press_key", "space")], record_trace=True)
+
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(result["unsupported"], {})
+        self.assertTrue(result["trace"])
+
+
+if __name__ == "__main__":
+    unittest.main()
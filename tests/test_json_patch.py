@@ -0,0 +1,69 @@
+"""JSON Patch 生成与应用的测试"""
+
+import json
+import unittest
+
+from utils import json_patch
+
+
+class SameValueTest(unittest.TestCase):
+    """布尔值和数字在JSON中是不同的值，嵌套在容器中时也要区分"""
+
+    def test_nested_bool_and_int_differ(self):
+        src = {"inputs": [1, {"value": 1}]}
+        dst = {"inputs": [True, {"value": True}]}
+        patch = json_patch.diff(src, dst)
+        self.assertTrue(patch)
+        self.assertEqual(json_patch.apply(src, patch), dst)
+        self.assertIs(json_patch.apply(src, patch)["inputs"][0], True)
+
+    def test_list_element_with_nested_bool_is_replaced(self):
+        src = [[0, 1], [2]]
+        dst = [[0, True], [2]]
+        result = json_patch.apply(src, json_patch.diff(src, dst))
+        self.assertIs(result[0][1], True)
+
+    def test_test_operation_checks_nested_types(self):
+        with self.assertRaises(json_patch.JSONPatchError):
+            json_patch.apply({"a": [1]}, [{"op": "test", "path": "/a", "value": [True]}])
+        self.assertEqual(json_patch.apply({"a": [1]}, [{"op": "test", "path": "/a", "value": [1]}]), {"a": [1]})
+
+
+class RoundTripTest(unittest.TestCase):
+    """apply(src, diff(src, dst)) 应得到 dst，且不修改 src"""
+
+    CASES = [
+        ({}, {"a": 1}),
+        ({"a": 1, "b": 2}, {"b": 3}),
+        ({"a/b": 1, "m~n": [1]}, {"a/b": 2, "m~n": [1, 2]}),
+        ([1, 2, 3, 4], [1, 3, 4]),
+        ([1, 2, 3], [0, 1, 2, 3, 4]),
+        ([{"id": 1}, {"id": 2}], [{"id": 2}]),
+        ({"targets": [{"blocks": {"x": {"next": None}}}]}, {"targets": [{"blocks": {"x": {"next": "y"}, "y": {}}}]}),
+        ({"a": [1, 2]}, {"a": {"b": 1}}),
+        ([1], {"root": True}),
+    ]
+
+    def test_round_trip(self):
+        for src, dst in self.CASES:
+            with self.subTest(src=src, dst=dst):
+                before = json.dumps(src)
+                patch = json_patch.diff(src, dst)
+                self.assertEqual(json_patch.apply(src, patch), dst)
+                self.assertEqual(json.dumps(src), before)
+
+    def test_identical_documents_give_empty_patch(self):
+        doc = {"targets": [{"name": "s", "blocks": {"a": {"x": [1, True, None]}}}]}
+        self.assertEqual(json_patch.diff(doc, json.loads(json.dumps(doc))), [])
+
+    def test_single_insertion_is_one_operation(self):
+        self.assertEqual(json_patch.diff(list(range(10)), [0, 1, 2, 99, 3, 4, 5, 6, 7, 8, 9]),
+                         [{"op": "add", "path": "/3", "value": 99}])
+
+    def test_invalid_path_raises(self):
+        with self.assertRaises(json_patch.JSONPatchError):
+            json_patch.apply({"a": []}, [{"op": "remove", "path": "/a/0"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""进程级模型注册表的共享和LRU卸载测试"""
+
+import unittest
+
+from speech_to_scratch.model_registry import ModelRegistry
+
+
+class _Loader:
+    """记录加载次数的假加载函数"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, model_path, device, backend):
+        self.calls.append((model_path, device, backend))
+        return f"tokenizer:{model_path}", f"model:{model_path}", backend, device
+
+
+class ModelRegistryTest(unittest.TestCase):
+
+    def test_handles_are_shared_and_loaded_once(self):
+        loader = _Loader()
+        registry = ModelRegistry(loader=loader)
+        first = registry.get("m")
+        self.assertIs(registry.get("m"), first)
+        self.assertEqual(loader.calls, [])
+
+        self.assertEqual(first.acquire(), ("tokenizer:m", "model:m"))
+        registry.get("m").acquire()
+        self.assertEqual(len(loader.calls), 1)
+
+    def test_least_recently_used_model_is_unloaded(self):
+        loader = _Loader()
+        registry = ModelRegistry(max_loaded=1, loader=loader)
+        a, b = registry.get("a"), registry.get("b")
+        a.acquire()
+        b.acquire()
+
+        self.assertFalse(a.is_loaded)
+        self.assertTrue(b.is_loaded)
+        a.acquire()
+        self.assertEqual([call[0] for call in loader.calls], ["a", "b", "a"])
+
+    def test_failed_load_is_not_retried_until_reset(self):
+        calls = []
+
+        def failing_loader(model_path, device, backend):
+            calls.append(model_path)
+            raise OSError("missing")
+
+        handle = ModelRegistry(loader=failing_loader).get("m")
+        self.assertEqual(handle.acquire(), (None, None))
+        self.assertEqual(handle.acquire(), (None, None))
+        self.assertEqual(len(calls), 1)
+        handle.reset()
+        handle.acquire()
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""项目序列化（紧凑JSON、流式JSON、.sb3）的测试"""
+
+import io
+import json
+import unittest
+import zipfile
+
+from speech_to_scratch import serializer
+from speech_to_scratch.ir import ProjectIR
+
+
+def _project(num_blocks=3):
+    blocks = {f"b{i}": {"opcode": "motion_movesteps", "next": f"b{i + 1}" if i + 1 < num_blocks else None,
+                        "inputs": {"STEPS": [1, [4, "10"]]}, "fields": {}, "topLevel": i == 0}
+              for i in range(num_blocks)}
+    return {
+        "targets": [
+            {"isStage": True, "name": "Stage", "blocks": {},
+             "costumes": [{"assetId": "a", "md5ext": "a.svg", "dataFormat": "svg"}], "sounds": []},
+            {"isStage": False, "name": "角色", "blocks": blocks,
+             "costumes": [{"assetId": "b", "md5ext": "b.png", "dataFormat": "png"}], "sounds": []},
+        ],
+        "monitors": [],
+        "extensions": [],
+        "meta": {"semver": "3.0.0", "vm": "0.2.0", "agent": ""},
+    }
+
+
+_ASSETS = {"a.svg": b"<svg/>", "b.png": b"\x89PNG"}
+
+
+class DumpsTest(unittest.TestCase):
+
+    def test_compact_round_trip(self):
+        project = _project()
+        data = serializer.dumps(project, use_orjson=False)
+        self.assertNotIn(b": ", data)
+        self.assertNotIn(b"\n", data)
+        self.assertEqual(json.loads(data), project)
+        # 非ASCII字符直接以UTF-8写出
+        self.assertIn("角色".encode("utf-8"), data)
+
+    def test_ir_objects_are_serialized(self):
+        description = {"projectName": "p", "sprites": [{"name": "s", "scripts": []}], "backgrounds": [], "events": []}
+        data = serializer.dumps({"description": ProjectIR.from_description(description)}, use_orjson=False)
+        self.assertEqual(json.loads(data)["description"], description)
+
+    def test_iter_json_matches_dumps(self):
+        project = _project(500)
+        streamed = b"".join(serializer.iter_json(project, chunk_size=256))
+        self.assertEqual(json.loads(streamed), json.loads(serializer.dumps(project)))
+
+    def test_iter_json_accepts_generators(self):
+        project = _project(20)
+        lazy = dict(project)
+        lazy["targets"] = (dict(target, blocks=iter(target["blocks"].items())) for target in project["targets"])
+        self.assertEqual(json.loads(b"".join(serializer.iter_json(lazy))), json.loads(serializer.dumps(project)))
+
+
+class Sb3Test(unittest.TestCase):
+
+    def test_sb3_contains_project_and_assets(self):
+        project = _project()
+        data = serializer.sb3_bytes(project, asset_loader=_ASSETS.get)
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["a.svg", "b.png", "project.json"])
+            self.assertEqual(json.loads(archive.read("project.json")), project)
+            self.assertEqual(archive.read("b.png"), _ASSETS["b.png"])
+
+    def test_iter_sb3_matches_write_sb3(self):
+        project = _project(200)
+        streamed = b"".join(serializer.iter_sb3(project, asset_loader=_ASSETS.get))
+        with zipfile.ZipFile(io.BytesIO(streamed)) as archive:
+            self.assertEqual(json.loads(archive.read("project.json")), project)
+            self.assertEqual(archive.read("a.svg"), _ASSETS["a.svg"])
+
+    def test_missing_assets_are_reported(self):
+        buffer = io.BytesIO()
+        missing = serializer.write_sb3(_project(), buffer, asset_loader={"a.svg": b"<svg/>"}.get)
+        self.assertEqual(missing, ["b.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+导入耗时预算检查
+
+在独立的子进程中用 ``python -X importtime`` 导入各个入口模块，测量累计导入耗时，
+并检查torch、transformers、manim等重型库是否在模块加载阶段被提前导入。
+超出预算或提前导入重型库时以非零状态退出，可直接放进CI或部署前检查：
+
+    python utils/import_budget.py
+    python utils/import_budget.py --runs 5 --budget api=600
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各入口模块的累计导入耗时预算（毫秒）
+DEFAULT_BUDGETS = {
+    "speech_to_scratch.text_to_scratch": 150,
+    "speech_to_scratch.examples": 200,
+    "code_visualization.code_animator": 100,
+    "api": 800,
+}
+
+# 这些库只能在第一次真正用到时导入
+HEAVY_MODULES = ("torch", "transformers", "manim", "numpy", "av", "pydub")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+_MISSING_RE = re.compile(r"ModuleNotFoundError: No module named '([^']+)'")
+
+
+def _project_packages():
+    """项目自身的顶层模块和包名"""
+    names = set()
+    for entry in os.listdir(PROJECT_ROOT):
+        path = os.path.join(PROJECT_ROOT, entry)
+        if entry.endswith(".py"):
+            names.add(entry[:-3])
+        elif os.path.isfile(os.path.join(path, "__init__.py")):
+            names.add(entry)
+    return names
+
+
+def measure_import(module):
+    """
+    在新的解释器中导入模块并测量耗时
+
+    Args:
+        module (str): 模块名
+
+    Returns:
+        dict: cumulative_ms、提前加载的重型库；导入失败时包含error和missing
+    """
+    probe = (
+        f"import {module}, sys, json; "
+        f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]))"
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+
+    if process.returncode != 0:
+        missing = _MISSING_RE.search(process.stderr)
+        return {
+            "module": module,
+            "error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "导入失败",
+            "missing": missing.group(1) if missing else None,
+        }
+
+    cumulative_us = None
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        # 缩进为1表示顶层导入，即被测模块本身
+        if match and match.group(4) == module and len(match.group(3)) == 1:
+            cumulative_us = int(match.group(2))
+    heavy = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "cumulative_ms": cumulative_us / 1000 if cumulative_us is not None else None,
+        "heavy_modules": heavy,
+    }
+
+
+def check_budgets(budgets=None, runs=3):
+    """
+    检查所有模块的导入预算
+
+    Args:
+        budgets (dict): {模块名: 预算毫秒}
+        runs (int): 每个模块测量的次数，取最小值以减少抖动
+
+    Returns:
+        list: 每个模块的结果，status为 ok、over_budget、heavy_import、error 或 skipped
+    """
+    budgets = budgets or DEFAULT_BUDGETS
+    project_packages = _project_packages()
+    results = []
+    for module, budget_ms in budgets.items():
+        measurements = [measure_import(module) for _ in range(max(1, runs))]
+        failed = [m for m in measurements if "error" in m]
+        if failed:
+            result = dict(failed[0], budget_ms=budget_ms)
+            missing = result["missing"]
+            # 缺少第三方依赖不算回归，只有项目内部的导入错误才算失败
+            if missing and missing.split(".")[0] not in project_packages:
+                result["status"] = "skipped"
+            else:
+                result["status"] = "error"
+            results.append(result)
+            continue
+
+        best = min(measurements, key=lambda m: m["cumulative_ms"] or 0)
+        result = dict(best, budget_ms=budget_ms)
+        if best["heavy_modules"]:
+            result["status"] = "heavy_import"
+        elif best["cumulative_ms"] is not None and best["cumulative_ms"] > budget_ms:
+            result["status"] = "over_budget"
+        else:
+            result["status"] = "ok"
+        results.append(result)
+    return results
+
+
+def _parse_budget_overrides(items):
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in items or []:
+        module, _, value = item.partition("=")
+        budgets[module] = float(value)
+    return budgets
+
+
+# 命令行入口
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查入口模块的导入耗时预算")
+    parser.add_argument("--runs", type=int, default=3, help="每个模块测量的次数")
+    parser.add_argument("--budget", action="append", metavar="MODULE=MS", help="覆盖某个模块的预算")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = check_budgets(_parse_budget_overrides(args.budget), args.runs)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            if r["status"] in ("error", "skipped"):
+                print(f"{r['status']:>12}  {r['module']}: {r['error']}")
+            else:
+                heavy = f"  提前导入: {', '.join(r['heavy_modules'])}" if r["heavy_modules"] else ""
+                print(f"{r['status']:>12}  {r['module']}: {r['cumulative_ms']:.1f} ms / {r['budget_ms']} ms{heavy}")
+
+    sys.exit(1 if any(r["status"] in ("over_budget", "heavy_import", "error") for r in results) else 0)
@@ -0,0 +1,203 @@
+"""
+JSON Patch (RFC 6902) 工具
+
+diff 生成把一个JSON文档变成另一个文档的最小补丁（对象逐键比较，数组先去掉相同的首尾再逐项比较），
+apply 把补丁应用到文档上。用于在编辑项目时只传输发生变化的部分。
+"""
+
+import copy
+
+
+class JSONPatchError(Exception):
+    """补丁无法应用"""
+
+
+def escape_token(token):
+    """按RFC 6901转义JSON Pointer中的一段"""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_token(token):
+    """还原JSON Pointer中转义的一段"""
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(src, dst):
+    """
+    计算从src到dst的JSON Patch
+
+    Args:
+        src: 原文档
+        dst: 目标文档
+
+    Returns:
+        list: RFC 6902 操作列表
+    """
+    operations = []
+    _diff(src, dst, "", operations)
+    return operations
+
+
+def _same(a, b):
+    # 1 == True 在Python中成立，但在JSON中是不同的值；容器要逐项比较，[1] == [True] 同样成立
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _diff(src, dst, path, operations):
+    if src is dst:
+        return
+    if isinstance(src, dict) and isinstance(dst, dict):
+        for key in src:
+            if key not in dst:
+                operations.append({"op": "remove", "path": f"{path}/{escape_token(key)}"})
+        for key, value in dst.items():
+            child_path = f"{path}/{escape_token(key)}"
+            if key not in src:
+                operations.append({"op": "add", "path": child_path, "value": copy.deepcopy(value)})
+            else:
+                _diff(src[key], value, child_path, operations)
+        return
+    if isinstance(src, list) and isinstance(dst, list):
+        _diff_list(src, dst, path, operations)
+        return
+    if not _same(src, dst):
+        operations.append({"op": "replace", "path": path, "value": copy.deepcopy(dst)})
+
+
+def _diff_list(src, dst, path, operations):
+    n, m = len(src), len(dst)
+    # 去掉相同的前缀和后缀，单个元素的插入或删除不会导致后续元素全部替换
+    start = 0
+    while start < n and start < m and _same(src[start], dst[start]):
+        start += 1
+    end = 0
+    while end < n - start and end < m - start and _same(src[n - 1 - end], dst[m - 1 - end]):
+        end += 1
+
+    src_middle = n - start - end
+    dst_middle = m - start - end
+    common = min(src_middle, dst_middle)
+    for offset in range(common):
+        _diff(src[start + offset], dst[start + offset], f"{path}/{start + offset}", operations)
+    for _ in range(src_middle - common):
+        operations.append({"op": "remove", "path": f"{path}/{start + common}"})
+    for offset in range(common, dst_middle):
+        operations.append({"op": "add", "path": f"{path}/{start + offset}", "value": copy.deepcopy(dst[start + offset])})
+
+
+def _parse_pointer(pointer):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JSONPatchError(f"无效的JSON Pointer: {pointer}")
+    return [unescape_token(token) for token in pointer[1:].split("/")]
+
+
+def _resolve(doc, tokens, pointer):
+    """返回tokens最后一段的父容器"""
+    node = doc
+    for token in tokens[:-1]:
+        try:
+            node = node[int(token)] if isinstance(node, list) else node[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise JSONPatchError(f"路径不存在: {pointer}")
+    return node
+
+
+def _list_index(container, token, pointer, allow_end=False):
+    if token == "-" and allow_end:
+        return len(container)
+    try:
+        index = int(token)
+    except ValueError:
+        raise JSONPatchError(f"无效的数组下标: {pointer}")
+    limit = len(container) if allow_end else len(container) - 1
+    if index < 0 or index > limit:
+        raise JSONPatchError(f"数组下标越界: {pointer}")
+    return index
+
+
+def _get(doc, pointer):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return doc
+    parent = _resolve(doc, tokens, pointer)
+    if isinstance(parent, list):
+        return parent[_list_index(parent, tokens[-1], pointer)]
+    if not isinstance(parent, dict) or tokens[-1] not in parent:
+        raise JSONPatchError(f"路径不存在: {pointer}")
+    return parent[tokens[-1]]
+
+
+def _add(doc, pointer, value):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens, pointer)
+    if isinstance(parent, list):
+        parent.insert(_list_index(parent, tokens[-1], pointer, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        raise JSONPatchError(f"路径不存在: {pointer}")
+    return doc
+
+
+def _remove(doc, pointer):
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise JSONPatchError("不能删除整个文档")
+    parent = _resolve(doc, tokens, pointer)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, tokens[-1], pointer))
+    if not isinstance(parent, dict) or tokens[-1] not in parent:
+        raise JSONPatchError(f"路径不存在: {pointer}")
+    return parent.pop(tokens[-1])
+
+
+def apply(doc, patch, in_place=False):
+    """
+    把JSON Patch应用到文档上
+
+    Args:
+        doc: 原文档
+        patch (list): RFC 6902 操作列表
+        in_place (bool): 是否直接修改原文档
+
+    Returns:
+        应用补丁后的文档
+    """
+    if not in_place:
+        doc = copy.deepcopy(doc)
+    for operation in patch:
+        op = operation.get("op")
+        pointer = operation.get("path", "")
+        if op == "add":
+            doc = _add(doc, pointer, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(doc, pointer)
+        elif op == "replace":
+            if not _parse_pointer(pointer):
+                doc = copy.deepcopy(operation["value"])
+                continue
+            _remove(doc, pointer)
+            doc = _add(doc, pointer, copy.deepcopy(operation["value"]))
+        elif op == "move":
+            value = _remove(doc, operation["from"])
+            doc = _add(doc, pointer, value)
+        elif op == "copy":
+            doc = _add(doc, pointer, copy.deepcopy(_get(doc, operation["from"])))
+        elif op == "test":
+            if not _same(_get(doc, pointer), operation["value"]):
+                raise JSONPatchError(f"test操作失败: {pointer}")
+        else:
+            raise JSONPatchError(f"未知的操作: {op}")
+    return doc